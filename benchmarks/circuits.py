@@ -0,0 +1,191 @@
+"""Parameterized circuits built from the shipped components, sized by their amount of ports."""
+
+from dataclasses import dataclass
+from math import log2, sqrt
+from typing import Callable, MutableSequence
+from lumen_photonics import (Coupler, MachZehnderInterferometer, PhaseShifter, PhotonicCircuit, PolarizationBeamSplitter,
+                             PortRef)
+
+CENTRAL_WAVELENGTH = 1550e-9
+
+@dataclass(frozen=True, slots=True)
+class BenchmarkCircuit:
+    """A generated circuit, with the ports that lasers can be set on.
+
+    :param photonic_circuit: The circuit, with its outputs set and no inputs
+    :type photonic_circuit: PhotonicCircuit
+    :param input_refs: Input ports that lasers are set on, at least two
+    :type input_refs: MutableSequence[PortRef]
+    :param output_refs: The circuit outputs
+    :type output_refs: MutableSequence[PortRef]
+    """
+
+    photonic_circuit: PhotonicCircuit
+    input_refs: MutableSequence[PortRef]
+    output_refs: MutableSequence[PortRef]
+
+    @property
+    def num_ports(self) -> int:
+        return sum(len(component.ports) for component in self.photonic_circuit.components)
+
+def _get_coupler(name: str) -> Coupler:
+    """Creates a lossy directional coupler. Helper function.
+
+    :param name: Name of the coupler
+    :type name: str
+    :return: The coupler
+    :rtype: Coupler
+    """
+
+    return Coupler(name=name, central_wavelength_H=CENTRAL_WAVELENGTH, central_wavelength_V=CENTRAL_WAVELENGTH,
+                   central_coupling_strength_H=1e4, central_coupling_strength_V=2e4, coupling_gradient_H=1e8,
+                   length=5e-5, insertion_loss_db=0.1)
+
+def _get_phase_shifter(name: str, index: int) -> PhaseShifter:
+    """Creates a birefringent, dispersive phase shifter, whose length depends on its index so that
+    no two have the same phase. Helper function.
+
+    :param name: Name of the phase shifter
+    :type name: str
+    :param index: Index of the phase shifter
+    :type index: int
+    :return: The phase shifter
+    :rtype: PhaseShifter
+    """
+
+    return PhaseShifter(name=name, nH=2, nV=2.05, central_wavelength_H=CENTRAL_WAVELENGTH,
+                        central_wavelength_V=CENTRAL_WAVELENGTH, nH_gradient=1e4, nV_gradient=2e4,
+                        length=1e-4*(1 + 0.01*(index % 97)), power_ratio_H=0.999, power_ratio_V=0.998)
+
+def phase_shifter_chain(num_ports: int) -> BenchmarkCircuit:
+    """A chain of phase shifters behind a coupler, which the simulation condenses into one
+    component. The coupler gives the chain two inputs.
+
+    :param num_ports: Approximate amount of ports of the circuit
+    :type num_ports: int
+    :return: The circuit
+    :rtype: BenchmarkCircuit
+    """
+
+    photonic_circuit = PhotonicCircuit()
+    photonic_circuit.add(_get_coupler("coupler"))
+    num_phase_shifters = max(2, (num_ports - 4) // 2)
+    for index in range(num_phase_shifters):
+        photonic_circuit.add(_get_phase_shifter(f"ps_{index}", index))
+
+    photonic_circuit.connect(source=PortRef("coupler", 3), destination=PortRef("ps_0", 1))
+    for index in range(1, num_phase_shifters):
+        photonic_circuit.connect(source=PortRef(f"ps_{index - 1}", 2), destination=PortRef(f"ps_{index}", 1))
+
+    output_refs = [PortRef(f"ps_{num_phase_shifters - 1}", 2), PortRef("coupler", 4)]
+    for output_ref in output_refs:
+        photonic_circuit.set_circuit_output(port_ref=output_ref)
+    return BenchmarkCircuit(photonic_circuit, [PortRef("coupler", 1), PortRef("coupler", 2)], output_refs)
+
+def clements_mesh(num_ports: int) -> BenchmarkCircuit:
+    """A rectangular Clements mesh of couplers, with a Mach-Zehnder interferometer as the phase
+    shifter on the upper output of every coupler. Every mode of the mesh is an output.
+
+    :param num_ports: Approximate amount of ports of the circuit
+    :type num_ports: int
+    :return: The circuit
+    :rtype: BenchmarkCircuit
+    """
+
+    # every cell has 6 ports, and a mesh of N modes has N(N - 1)/2 cells
+    num_modes = max(2, round((1 + sqrt(1 + 4*num_ports/3))/2))
+
+    photonic_circuit = PhotonicCircuit()
+    # the port that the light of every mode leaves from, or None before the mode's first cell
+    mode_sources = [None]*num_modes
+    input_refs = []
+    for column in range(num_modes):
+        for mode in range(column % 2, num_modes - 1, 2):
+            coupler_name, mzi_name = f"coupler_{column}_{mode}", f"mzi_{column}_{mode}"
+            photonic_circuit.add(_get_coupler(coupler_name))
+            photonic_circuit.add(MachZehnderInterferometer(name=mzi_name, arm_length=1e-4*(1 + 0.01*mode), nH=2,
+                                                           nV=2.05, nH_gradient=1e4,
+                                                           central_wavelength_H=CENTRAL_WAVELENGTH,
+                                                           central_wavelength_V=CENTRAL_WAVELENGTH))
+            for offset in range(2):
+                destination = PortRef(coupler_name, 1 + offset)
+                if mode_sources[mode + offset] is not None:
+                    photonic_circuit.connect(source=mode_sources[mode + offset], destination=destination)
+                elif mode + offset < 2:
+                    input_refs.append(destination)
+
+            photonic_circuit.connect(source=PortRef(coupler_name, 3), destination=PortRef(mzi_name, 1))
+            mode_sources[mode] = PortRef(mzi_name, 2)
+            mode_sources[mode + 1] = PortRef(coupler_name, 4)
+
+    for output_ref in mode_sources:
+        photonic_circuit.set_circuit_output(port_ref=output_ref)
+    return BenchmarkCircuit(photonic_circuit, input_refs, mode_sources)
+
+def polarization_beam_splitter_tree(num_ports: int) -> BenchmarkCircuit:
+    """A binary tree of polarization beam splitters, whose leaves' outputs are all outputs of
+    the circuit.
+
+    :param num_ports: Approximate amount of ports of the circuit
+    :type num_ports: int
+    :return: The circuit
+    :rtype: BenchmarkCircuit
+    """
+
+    # a tree of depth d has 2^d - 1 splitters with 4 ports each
+    depth = max(1, round(log2(num_ports/4 + 1)))
+
+    photonic_circuit = PhotonicCircuit()
+    num_splitters = 2**depth - 1
+    for index in range(num_splitters):
+        photonic_circuit.add(PolarizationBeamSplitter(name=f"pbs_{index}", ER_db=30, insertion_loss_db=0.1))
+
+    output_refs = []
+    for index in range(num_splitters):
+        for offset in range(2):
+            child = 2*index + 1 + offset
+            if child < num_splitters:
+                photonic_circuit.connect(source=PortRef(f"pbs_{index}", 3 + offset),
+                                         destination=PortRef(f"pbs_{child}", 1))
+            else:
+                output_refs.append(PortRef(f"pbs_{index}", 3 + offset))
+
+    for output_ref in output_refs:
+        photonic_circuit.set_circuit_output(port_ref=output_ref)
+    return BenchmarkCircuit(photonic_circuit, [PortRef("pbs_0", 1), PortRef("pbs_0", 2)], output_refs)
+
+def feedback_loops(num_ports: int) -> BenchmarkCircuit:
+    """A bus of ring resonators. Every ring is a coupler whose cross output feeds back into its
+    cross input through a phase shifter, so that the global system has to be solved.
+
+    :param num_ports: Approximate amount of ports of the circuit
+    :type num_ports: int
+    :return: The circuit
+    :rtype: BenchmarkCircuit
+    """
+
+    photonic_circuit = PhotonicCircuit()
+    photonic_circuit.add(_get_coupler("bus"))
+    num_rings = max(1, (num_ports - 4) // 6)
+    for index in range(num_rings):
+        photonic_circuit.add(_get_coupler(f"ring_{index}"))
+        photonic_circuit.add(_get_phase_shifter(f"ps_{index}", index))
+
+    source = PortRef("bus", 3)
+    for index in range(num_rings):
+        photonic_circuit.connect(source=source, destination=PortRef(f"ring_{index}", 1))
+        photonic_circuit.connect(source=PortRef(f"ring_{index}", 4), destination=PortRef(f"ps_{index}", 1))
+        photonic_circuit.connect(source=PortRef(f"ps_{index}", 2), destination=PortRef(f"ring_{index}", 2))
+        source = PortRef(f"ring_{index}", 3)
+
+    output_refs = [source, PortRef("bus", 4)]
+    for output_ref in output_refs:
+        photonic_circuit.set_circuit_output(port_ref=output_ref)
+    return BenchmarkCircuit(photonic_circuit, [PortRef("bus", 1), PortRef("bus", 2)], output_refs)
+
+CIRCUITS: dict[str, Callable[[int], BenchmarkCircuit]] = {
+    "chain": phase_shifter_chain,
+    "mesh": clements_mesh,
+    "pbs_tree": polarization_beam_splitter_tree,
+    "feedback": feedback_loops,
+}
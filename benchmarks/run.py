@@ -0,0 +1,385 @@
+"""Benchmarks of the simulation engine on generated circuits from 10 to 100k ports.
+
+Every benchmark is timed on the checked-out sources in src, so that results of different commits
+can be compared. Run from the repository root:
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --output after.json
+    python -m benchmarks.run --compare before.json after.json
+
+Circuits of 100k ports take minutes to generate and compile, so they are run on their own with a
+lighter workload, for example:
+
+    python -m benchmarks.run --sizes 100000 --times 16 --wavelengths 16 --repeats 1
+
+The wall time of every benchmark is the fastest of its repeats, after one warm-up run. Peak memory
+is measured with tracemalloc in a separate run, which tracks the arrays that numpy allocates, but
+not the internal memory of scipy's sparse factorizations.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, MutableMapping, MutableSequence, Optional
+
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(_REPO_ROOT / "src"), str(_REPO_ROOT)]
+
+import numpy as np
+import scipy
+from lumen_photonics import CompiledCircuit, Laser, Simulation
+from benchmarks.circuits import CENTRAL_WAVELENGTH, CIRCUITS, BenchmarkCircuit
+
+_DEFAULT_SIZES = (10, 100, 1000, 10_000)
+_FORMAT_VERSION = 1
+# wavelength of the second laser of incoherent benchmarks
+_SECOND_WAVELENGTH = CENTRAL_WAVELENGTH + 1e-9
+# range that chirped lasers sweep over the simulated times
+_CHIRP_RANGE = 2e-9
+
+@dataclass(frozen=True, slots=True)
+class BenchmarkSettings:
+    """Settings shared by every benchmark of a run.
+
+    :param num_times: Amount of times that simulate is called with
+    :type num_times: int
+    :param num_wavelengths: Amount of wavelengths that get_s_parameters is called with
+    :type num_wavelengths: int
+    :param repeats: Amount of timed runs of every benchmark
+    :type repeats: int
+    """
+
+    num_times: int
+    num_wavelengths: int
+    repeats: int
+
+def _get_laser(wavelength: float, chirped: bool) -> Laser:
+    """Creates a laser with a constant polarization, at a constant wavelength or chirped over the
+    simulated times. Helper function.
+
+    :param wavelength: Wavelength of the laser at time 0
+    :type wavelength: float
+    :param chirped: Whether the wavelength changes linearly with time
+    :type chirped: bool
+    :return: The laser
+    :rtype: Laser
+    """
+
+    if chirped:
+        return Laser(batch_func=lambda times: (1.0, 0.5j, wavelength + _CHIRP_RANGE*times))
+    return Laser(batch_func=lambda times: (1.0, 0.5j, wavelength))
+
+@lru_cache(maxsize=None)
+def _build(circuit_name: str, size: int, num_lasers: int, chirped: bool) -> BenchmarkCircuit:
+    """Generates a circuit and sets its lasers. Circuits are kept until the next circuit and size
+    are benchmarked, so that the benchmarks of one circuit share it. Helper function.
+
+    :param circuit_name: Name of the circuit generator
+    :type circuit_name: str
+    :param size: Approximate amount of ports of the circuit
+    :type size: int
+    :param num_lasers: Amount of lasers, 1 for coherent light and 2 for incoherent light
+    :type num_lasers: int
+    :param chirped: Whether the lasers are chirped
+    :type chirped: bool
+    :return: The circuit
+    :rtype: BenchmarkCircuit
+    """
+
+    benchmark_circuit = CIRCUITS[circuit_name](size)
+    for input_ref, wavelength in zip(benchmark_circuit.input_refs[:num_lasers],
+                                     (CENTRAL_WAVELENGTH, _SECOND_WAVELENGTH)):
+        benchmark_circuit.photonic_circuit.set_circuit_input(laser=_get_laser(wavelength, chirped),
+                                                             port_ref=input_ref)
+    return benchmark_circuit
+
+@lru_cache(maxsize=None)
+def _get_simulation(circuit_name: str, size: int, num_lasers: int, chirped: bool) -> Simulation:
+    """Creates the simulation of a generated circuit, compiled before any benchmark is timed.
+    Helper function.
+
+    :param circuit_name: Name of the circuit generator
+    :type circuit_name: str
+    :param size: Approximate amount of ports of the circuit
+    :type size: int
+    :param num_lasers: Amount of lasers, 1 for coherent light and 2 for incoherent light
+    :type num_lasers: int
+    :param chirped: Whether the lasers are chirped
+    :type chirped: bool
+    :return: The simulation
+    :rtype: Simulation
+    """
+
+    simulation = Simulation(_build(circuit_name, size, num_lasers, chirped).photonic_circuit)
+    simulation.compiled_circuit
+    return simulation
+
+def _get_times(settings: BenchmarkSettings) -> np.ndarray:
+    return np.linspace(0, 1, settings.num_times)
+
+# every setup generates its circuit, and returns it with the timed function and the simulation
+# whose stats break the time down into phases, if there is one
+
+def _compile(circuit_name: str, size: int, settings: BenchmarkSettings
+             ) -> tuple[BenchmarkCircuit, Callable[[], Any], Optional[Simulation]]:
+    benchmark_circuit = _build(circuit_name, size, 1, False)
+    return benchmark_circuit, lambda: CompiledCircuit(benchmark_circuit.photonic_circuit), None
+
+def _condense(circuit_name: str, size: int, settings: BenchmarkSettings
+              ) -> tuple[BenchmarkCircuit, Callable[[], Any], Optional[Simulation]]:
+    benchmark_circuit = _build(circuit_name, size, 1, False)
+    compiled_circuit = CompiledCircuit(benchmark_circuit.photonic_circuit)
+    return benchmark_circuit, compiled_circuit._condense_circuit, None
+
+def _simulate(num_lasers: int, chirped: bool, incoherent_mode: str = "jones"):
+    """Creates the setup of a simulate benchmark. The simulation is compiled before it is timed.
+    Helper function.
+
+    :param num_lasers: Amount of lasers, 1 for coherent light and 2 for incoherent light
+    :type num_lasers: int
+    :param chirped: Whether the lasers are chirped
+    :type chirped: bool
+    :param incoherent_mode: How incoherent light states are stored, defaults to 'jones'
+    :type incoherent_mode: str
+    :return: The setup
+    :rtype: Callable
+    """
+
+    def setup(circuit_name: str, size: int, settings: BenchmarkSettings
+              ) -> tuple[BenchmarkCircuit, Callable[[], Any], Optional[Simulation]]:
+        benchmark_circuit = _build(circuit_name, size, num_lasers, chirped)
+        simulation = _get_simulation(circuit_name, size, num_lasers, chirped)
+        times = _get_times(settings)
+        return benchmark_circuit, lambda: simulation.simulate(times, incoherent_mode), simulation
+
+    return setup
+
+def _get_s_parameters(circuit_name: str, size: int, settings: BenchmarkSettings
+                      ) -> tuple[BenchmarkCircuit, Callable[[], Any], Optional[Simulation]]:
+    benchmark_circuit = _build(circuit_name, size, 1, False)
+    simulation = _get_simulation(circuit_name, size, 1, False)
+    wavelengths = np.linspace(CENTRAL_WAVELENGTH - _CHIRP_RANGE, CENTRAL_WAVELENGTH + _CHIRP_RANGE,
+                              settings.num_wavelengths)
+    return benchmark_circuit, lambda: simulation.get_s_parameters(wavelengths), simulation
+
+def _access(num_lasers: int):
+    """Creates the setup of a benchmark of the result accessors, which read the powers, Stokes
+    vectors, phases and light objects of every output of a chirped simulation. Helper function.
+
+    :param num_lasers: Amount of lasers, 1 for coherent light and 2 for incoherent light
+    :type num_lasers: int
+    :return: The setup
+    :rtype: Callable
+    """
+
+    def setup(circuit_name: str, size: int, settings: BenchmarkSettings
+              ) -> tuple[BenchmarkCircuit, Callable[[], Any], Optional[Simulation]]:
+        benchmark_circuit = _build(circuit_name, size, num_lasers, True)
+        simulation_result = _get_simulation(circuit_name, size, num_lasers, True).simulate(_get_times(settings))
+
+        def access():
+            for output_ref in benchmark_circuit.output_refs:
+                simulation_result.get_power(output_ref)
+                simulation_result.get_stokes(output_ref)
+                simulation_result.get_DOP(output_ref)
+                if num_lasers == 1:
+                    simulation_result.get_phase(output_ref, "horizontal")
+                    simulation_result.get_relative_phase(output_ref)
+            # light objects are created when they are indexed
+            list(simulation_result[benchmark_circuit.output_refs[0]])
+
+        return benchmark_circuit, access, None
+
+    return setup
+
+BENCHMARKS: MutableMapping[str, Callable] = {
+    "compile": _compile,
+    "condense": _condense,
+    "simulate_coherent_constant": _simulate(1, False),
+    "simulate_coherent_chirped": _simulate(1, True),
+    "simulate_incoherent_constant": _simulate(2, False),
+    "simulate_incoherent_chirped": _simulate(2, True),
+    "simulate_incoherent_chirped_coherency": _simulate(2, True, "coherency"),
+    "get_s_parameters": _get_s_parameters,
+    "accessors_coherent": _access(1),
+    "accessors_incoherent": _access(2),
+}
+
+def _measure(benchmark: Callable[[], Any], repeats: int) -> tuple[MutableSequence[float], int]:
+    """Times a benchmark after one warm-up run, and measures its peak memory in one more run.
+    Helper function.
+
+    :param benchmark: The benchmark
+    :type benchmark: Callable[[], Any]
+    :param repeats: Amount of timed runs
+    :type repeats: int
+    :return: The wall time of every timed run [s], and the peak memory above the memory before
+        the run [bytes]
+    :rtype: tuple[MutableSequence[float], int]
+    """
+
+    benchmark()
+    wall_times = []
+    for _ in range(repeats):
+        start = perf_counter()
+        benchmark()
+        wall_times.append(perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        benchmark()
+        peak_memory = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return wall_times, peak_memory
+
+def _get_metadata() -> MutableMapping[str, Any]:
+    """Describes the sources and machine of a run, so that runs can be told apart. Helper function.
+
+    :return: The metadata
+    :rtype: MutableMapping[str, Any]
+    """
+
+    def git(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *args], cwd=_REPO_ROOT, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "format_version": _FORMAT_VERSION,
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+def run(circuit_names: MutableSequence[str], sizes: MutableSequence[int], benchmark_names: MutableSequence[str],
+        settings: BenchmarkSettings) -> MutableMapping[str, Any]:
+    """Runs every benchmark on every circuit and size.
+
+    :param circuit_names: Names of the circuit generators
+    :type circuit_names: MutableSequence[str]
+    :param sizes: Approximate amounts of ports of the circuits
+    :type sizes: MutableSequence[int]
+    :param benchmark_names: Names of the benchmarks
+    :type benchmark_names: MutableSequence[str]
+    :param settings: Settings shared by every benchmark
+    :type settings: BenchmarkSettings
+    :return: The metadata and results of the run, which serialize to JSON
+    :rtype: MutableMapping[str, Any]
+    """
+
+    results = []
+    for circuit_name in circuit_names:
+        for size in sizes:
+            for benchmark_name in benchmark_names:
+                benchmark_circuit, benchmark, simulation = BENCHMARKS[benchmark_name](circuit_name, size, settings)
+                wall_times, peak_memory = _measure(benchmark, settings.repeats)
+                result = {
+                    "circuit": circuit_name,
+                    "size": size,
+                    "num_ports": benchmark_circuit.num_ports,
+                    "benchmark": benchmark_name,
+                    "time_s": min(wall_times),
+                    "median_time_s": statistics.median(wall_times),
+                    "peak_memory_bytes": peak_memory,
+                }
+                # the phases of the last run, from the simulation's own stats
+                if simulation is not None:
+                    result["phases_s"] = {str(phase): phase_stats.wall_time
+                                          for phase, phase_stats in simulation.stats.phases.items()}
+                results.append(result)
+                print(f"{circuit_name:>10s} {benchmark_circuit.num_ports:>8d} ports  {benchmark_name:<40s}"
+                      f"{result['time_s']:>12.6f} s {peak_memory / 2**20:>10.2f} MiB", file=sys.stderr, flush=True)
+            _get_simulation.cache_clear()
+            _build.cache_clear()
+
+    return {
+        "metadata": _get_metadata(),
+        "settings": {"num_times": settings.num_times, "num_wavelengths": settings.num_wavelengths,
+                     "repeats": settings.repeats},
+        "results": results,
+    }
+
+def compare(baseline: MutableMapping[str, Any], candidate: MutableMapping[str, Any], threshold: float) -> bool:
+    """Prints the ratios of the times and peak memory of two runs, for every benchmark that both ran.
+
+    :param baseline: The run compared against
+    :type baseline: MutableMapping[str, Any]
+    :param candidate: The run that is compared
+    :type candidate: MutableMapping[str, Any]
+    :param threshold: Ratio above which a time or peak memory counts as a regression
+    :type threshold: float
+    :return: Whether any benchmark regressed
+    :rtype: bool
+    """
+
+    def key(result):
+        return result["circuit"], result["size"], result["benchmark"]
+
+    baseline_results = {key(result): result for result in baseline["results"]}
+    print(f"baseline  {baseline['metadata']['commit']}\ncandidate {candidate['metadata']['commit']}")
+    print(f"{'circuit':>10s} {'size':>8s}  {'benchmark':<40s}{'time':>10s}{'memory':>10s}")
+
+    regressed = False
+    for result in candidate["results"]:
+        baseline_result = baseline_results.get(key(result))
+        if baseline_result is None:
+            continue
+        time_ratio = result["time_s"] / max(baseline_result["time_s"], 1e-12)
+        memory_ratio = result["peak_memory_bytes"] / max(baseline_result["peak_memory_bytes"], 1)
+        is_regression = time_ratio > threshold or memory_ratio > threshold
+        regressed |= is_regression
+        print(f"{result['circuit']:>10s} {result['size']:>8d}  {result['benchmark']:<40s}"
+              f"{time_ratio:>9.2f}x{memory_ratio:>9.2f}x" + ("  <-- regression" if is_regression else ""))
+    return regressed
+
+def main(argv: Optional[MutableSequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--circuits", nargs="+", choices=list(CIRCUITS), default=list(CIRCUITS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(_DEFAULT_SIZES),
+                        help="approximate amounts of ports of the circuits")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--times", type=int, default=256, help="amount of times that simulate is called with")
+    parser.add_argument("--wavelengths", type=int, default=64,
+                        help="amount of wavelengths that get_s_parameters is called with")
+    parser.add_argument("--repeats", type=int, default=3, help="amount of timed runs of every benchmark")
+    parser.add_argument("--output", type=Path, help="JSON file that the results are written to")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("BASELINE", "CANDIDATE"),
+                        help="compare two result files instead of running the benchmarks")
+    parser.add_argument("--threshold", type=float, default=1.1,
+                        help="ratio above which --compare reports a regression and exits with 1")
+    args = parser.parse_args(argv)
+
+    if args.compare is not None:
+        baseline, candidate = (json.loads(path.read_text()) for path in args.compare)
+        return int(compare(baseline, candidate, args.threshold))
+
+    report = run(args.circuits, args.sizes, args.benchmarks,
+                 BenchmarkSettings(num_times=args.times, num_wavelengths=args.wavelengths, repeats=args.repeats))
+    output = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
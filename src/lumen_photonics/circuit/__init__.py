@@ -1,8 +1,9 @@
 from .component import Component, PortRef
-from .circuit_exceptions import DuplicateComponentException, DuplicateAliasException, MissingAliasException, MissingPortException, MissingComponentException
+from .circuit_exceptions import DuplicateComponentException, DuplicateAliasException, MissingAliasException, MissingPortException, MissingComponentException, MissingParameterException
+from .laser import Laser
 from .photonic_circuit import PhotonicCircuit
 from .components import *
 
 
-__all__ = ['Component', 'DuplicateComponentException', 'DuplicateAliasException', 'MissingAliasException',
-           'MissingPortException', 'MissingComponentException', 'PhotonicCircuit', 'PortRef', *components.__all__]
+__all__ = ['Component', 'DuplicateComponentException', 'DuplicateAliasException', 'Laser', 'MissingAliasException',
+           'MissingPortException', 'MissingComponentException', 'MissingParameterException', 'PhotonicCircuit', 'PortRef', *components.__all__]
@@ -193,6 +193,43 @@ class MissingComponentException(Exception):
     def __repr__(self):
         return f"{self.__class__.__name__}(component={self.component!r}, message={self.message!r})"
         
+class MissingParameterException(Exception):
+    """Exception thrown when a component has no tunable parameter with the name referred to.
+    
+    :param component: The component that the parameter was looked up on
+    :type component: Component
+    :param parameter: The name of the parameter that does not exist
+    :type parameter: str
+    :param message: A message printed when the exception is thrown. If no message
+        is given, a default message is printed
+    :type message: optional str
+    """
+    
+    __slots__ = "component", "parameter", "message"
+    
+    def __init__(self, component: Component, parameter: str, message: Optional[str] = None):
+        super().__init__(component, parameter, message)
+        self.component = component
+        self.parameter = parameter
+        self.message = message
+        
+    def __str__(self):
+        """Method that defines the message printed when the exception is thrown.
+        Either a custom message passed into the constructor or the default message.
+        
+        :return: A message to be printed when the exception is thrown
+        :rtype: str
+        """
+        
+        if self.message is None:
+            return (f"{self.component._name} has no tunable parameter '{self.parameter}'. "
+                    f"Tunable parameters: {', '.join(self.component._PARAMETERS) or 'none'}")
+        return self.message
+    
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(component={self.component!r}, "
+                f"parameter={self.parameter!r}, message={self.message!r})")
+        
 class PassivityException(Exception):
     """Exception thrown when a passive component in a circuit produces energy.
     
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from collections.abc import Iterator
+from copy import copy
 from dataclasses import dataclass
 import numpy as np
 from numpy.typing import NDArray
@@ -50,6 +51,14 @@ class Component(ABC):
 
     __slots__ = ("_id", "_name", "_photonic_circuit", "_num_inputs", "_num_outputs",
                  "_ports", "_port_aliases", "_port_ids", "_in_degree", "_out_degree")
+    
+    # names of the tunable parameters of the component. Each is stored in the attribute of the
+    # same name with a leading underscore
+    _PARAMETERS: tuple[str, ...] = ()
+    
+    # whether the component's S matrix does not depend on wavelength, so that get_s_matrix_batch
+    # evaluates it once for every wavelength
+    _WAVELENGTH_INDEPENDENT: bool = False
 
     def __init__(self, name: str, num_inputs: int, num_outputs: int):
         self._id = uuid4()
@@ -111,6 +120,61 @@ class Component(ABC):
     @property
     def ports(self):
         return self._ports
+    
+    @property
+    def parameters(self) -> tuple[str, ...]:
+        return self._PARAMETERS
+    
+    def get_parameter(self, name: str) -> float:
+        """Returns the value of one of the component's tunable parameters.
+        
+        :param name: Name of the parameter, as in the component's constructor
+        :type name: str
+        :raises MissingParameterException: The component has no tunable parameter with that name
+        :return: The value of the parameter
+        :rtype: float
+        """
+        
+        from .circuit_exceptions import MissingParameterException
+        
+        if name not in self._PARAMETERS:
+            raise MissingParameterException(self, name)
+        return getattr(self, f"_{name}")
+    
+    def set_parameter(self, name: str, value: float) -> None:
+        """Sets the value of one of the component's tunable parameters. The circuit's topology
+        does not change, so compiled simulations pick up the new value.
+        
+        :param name: Name of the parameter, as in the component's constructor
+        :type name: str
+        :param value: The new value of the parameter
+        :type value: float
+        :raises MissingParameterException: The component has no tunable parameter with that name
+        """
+        
+        from .circuit_exceptions import MissingParameterException
+        
+        if name not in self._PARAMETERS:
+            raise MissingParameterException(self, name)
+        setattr(self, f"_{name}", value)
+    
+    def _get_detached_copy(self) -> "Component":
+        """Returns a copy of the component with the same parameters and unconnected ports, outside
+        of any circuit. The copy does not refer to the circuit or its lasers, so it can be pickled
+        and sent to other processes. Helper function.
+        
+        :return: The detached copy of the component
+        :rtype: Component
+        """
+        
+        detached_component = copy(self)
+        detached_component._photonic_circuit = None
+        detached_component._ports = [Port(detached_component, port._port_type) for port in self._ports]
+        detached_component._port_aliases = {}
+        detached_component._port_ids = {port._id: port for port in detached_component._ports}
+        detached_component._in_degree = 0
+        detached_component._out_degree = 0
+        return detached_component
 
     @abstractmethod
     def get_s_matrix(self, wavelength: float) -> NDArray[np.complex128]:
@@ -122,6 +186,30 @@ class Component(ABC):
         :rtype: NDArray[np.complex128]
         """
         pass
+    
+    def get_s_matrix_batch(self, wavelengths: NDArray[np.float64]) -> NDArray[np.complex128]:
+        """Returns the modified S matrices that mathematically represent the component for an array
+        of wavelengths. Components override this with a vectorized implementation. By default,
+        get_s_matrix is evaluated once per wavelength, or once for every wavelength if the
+        component is wavelength independent, in which case every wavelength shares one read-only
+        matrix.
+        
+        :param wavelengths: Wavelengths of the light going through the component
+        :type wavelengths: NDArray[np.float64]
+        :return: The modified S matrices, with shape (len(wavelengths), 2N, 2N) for an N port component
+        :rtype: NDArray[np.complex128]
+        """
+        
+        if self._WAVELENGTH_INDEPENDENT:
+            # the wavelength passed in is unused by get_s_matrix
+            s_matrix = np.asarray(self.get_s_matrix(np.nan), dtype=complex)
+            return np.broadcast_to(s_matrix, (len(wavelengths), *s_matrix.shape))
+        
+        dimension = 2 * len(self._ports)
+        s_matrices = np.empty((len(wavelengths), dimension, dimension), dtype=complex)
+        for wavelength_index, wavelength in enumerate(wavelengths):
+            s_matrices[wavelength_index] = self.get_s_matrix(wavelength)
+        return s_matrices
         
 
     def search_by_alias(self, alias: str) -> Port:
@@ -173,10 +261,11 @@ class Component(ABC):
         if port1._connection is None:
             if port1._port_type == PortType.INPUT:
                 self._in_degree += 1
-            elif port2._port_type == PortType.OUTPUT:
+            elif port1._port_type == PortType.OUTPUT:
                 self._out_degree += 1
 
         port1._connection = PortConnection(port2)
+        self._photonic_circuit._topology_version += 1
 
     def disconnect_port(self, port_name: int | str) -> None:
         """Disconnects the specified input.
@@ -192,6 +281,7 @@ class Component(ABC):
             elif port._port_type == PortType.OUTPUT:
                 self._out_degree -= 1
         port._connection = None
+        self._photonic_circuit._topology_version += 1
         
     def _disconnect_by_port(self, port: Port) -> None:
         if port._connection is not None:
@@ -200,6 +290,8 @@ class Component(ABC):
             elif port._port_type == PortType.OUTPUT:
                 self._out_degree -= 1
         port._connection = None
+        if self._photonic_circuit is not None:
+            self._photonic_circuit._topology_version += 1
 
     def _get_port_from_ref(self, *, port_ref: PortRef) -> Port:
         """Gets the input port specified by the port reference passed in.
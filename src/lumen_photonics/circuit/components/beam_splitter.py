@@ -33,6 +33,8 @@ class BeamSplitter(Component):
     __slots__ = ("id", "name", "_num_inputs", "_num_outputs", "_ports", "_port_aliases",
                  "_port_ids", "_in_degree", "_out_degree")
     
+    _WAVELENGTH_INDEPENDENT = True
+    
     def __init__(self, *, name: str):
         super().__init__(name, 2, 2)
         
@@ -1,43 +1,100 @@
+from collections import OrderedDict
+from collections.abc import Callable, MutableSequence
 import numpy as np
 from numpy.typing import NDArray
 from ..component import Component
 
 class _CondensedComponent(Component):
     """Class representing a chain of sequential components condensed into a single component.
-    Used only for the simulation algorithm.
-    
-    :param s_matrix: the modified S matrix of condensed component, a result of combining the
-        modified S matrices of each constituent component
-    :type s_matrix: np.ndarray[np.complex128]
+    Used only for the simulation algorithm. The modified S matrix of the chain is computed lazily
+    for each wavelength it is requested at and memoized in a bounded cache keyed on wavelength.
+
+    :param sequential_chain: the chain of sequential components that the component represents
+    :type sequential_chain: MutableSequence[Component]
+    :param condense_func: function combining the modified S matrices of each constituent component
+        into the modified S matrices of the whole chain, for an array of wavelengths
+    :type condense_func: Callable[[MutableSequence[Component], NDArray], NDArray]
     """
-    
+
     __slots__ = ("id", "name", "_num_inputs", "_num_outputs", "_ports", "_port_aliases",
-                 "_port_ids", "_in_degree", "_out_degree", "_s_matrix")
-    
+                 "_port_ids", "_in_degree", "_out_degree", "_sequential_chain", "_condense_func",
+                 "_s_matrix_cache")
+
     _COMPONENT_NAME = "CONDENSED_COMPONENT"
 
-    def __init__(self, s_matrix: NDArray[np.complex128]):
+    # maximum amount of wavelengths whose S matrices are memoized
+    _CACHE_SIZE = 4096
+
+    def __init__(self, sequential_chain: MutableSequence[Component],
+                 condense_func: Callable[[MutableSequence[Component], NDArray[np.float64]],
+                                         NDArray[np.complex128]]):
         super().__init__(self._COMPONENT_NAME, 1, 1)
-        self._s_matrix = s_matrix
-        
+        self._sequential_chain = sequential_chain
+        self._condense_func = condense_func
+        self._s_matrix_cache: OrderedDict[float, NDArray[np.complex128]] = OrderedDict()
+
     def __str__(self):
-        rows, cols = self._s_matrix.shape
         return (
             f"Condensed Simulation Node ({self._name}):\n"
-            f"  - Matrix Size: {rows}x{cols}\n"
+            f"  - Chain Length: {len(self._sequential_chain)}\n"
+            f"  - Cached Wavelengths: {len(self._s_matrix_cache)}\n"
             f"  - Status: Mathematical abstraction of sequential components"
         )
-        
+
     def __repr__(self):
-        return f"{self.__class__.__name__}(s_matrix={self._s_matrix!r})"
-    
+        return f"{self.__class__.__name__}(sequential_chain={self._sequential_chain!r})"
+
+    @property
+    def sequential_chain(self) -> MutableSequence[Component]:
+        return self._sequential_chain
+
+    def clear_cache(self) -> None:
+        """Clears the memoized S matrices, so that they are recomputed from the constituent
+        components the next time they are requested.
+        """
+
+        self._s_matrix_cache.clear()
+
     def get_s_matrix(self, wavelength: float) -> NDArray[np.complex128]:
         """Returns the modified S matrix that mathematically represents the component
-        
+
         :param wavelength: Wavelength of the light going through the component
         :type wavelength: float
         :return: The modified S matrix
         :rtype: NDArray[np.complex128]
         """
-        
-        return self._s_matrix
\ No newline at end of file
+
+        return self.get_s_matrix_batch(np.array([wavelength], dtype=float))[0]
+
+    def get_s_matrix_batch(self, wavelengths: NDArray[np.float64]) -> NDArray[np.complex128]:
+        """Returns the modified S matrices that mathematically represent the component for an array
+        of wavelengths. Only the wavelengths missing from the cache are condensed, all in one batch.
+
+        :param wavelengths: Wavelengths of the light going through the component
+        :type wavelengths: NDArray[np.float64]
+        :return: The modified S matrices, with shape (len(wavelengths), 4, 4)
+        :rtype: NDArray[np.complex128]
+        """
+
+        wavelengths = np.asarray(wavelengths, dtype=float)
+
+        # sweeps larger than the cache would only evict each other, so they bypass it
+        if len(wavelengths) > self._CACHE_SIZE:
+            return self._condense_func(self._sequential_chain, wavelengths)
+
+        keys = wavelengths.tolist()
+        missing_keys = [key for key in dict.fromkeys(keys) if key not in self._s_matrix_cache]
+        if missing_keys:
+            s_matrices = self._condense_func(self._sequential_chain, np.array(missing_keys, dtype=float))
+            for key, s_matrix in zip(missing_keys, s_matrices):
+                self._s_matrix_cache[key] = s_matrix
+
+        s_matrices = np.empty((len(keys), 4, 4), dtype=complex)
+        for index, key in enumerate(keys):
+            s_matrices[index] = self._s_matrix_cache[key]
+            self._s_matrix_cache.move_to_end(key)
+
+        # least recently used wavelengths are evicted first
+        while len(self._s_matrix_cache) > self._CACHE_SIZE:
+            self._s_matrix_cache.popitem(last=False)
+        return s_matrices
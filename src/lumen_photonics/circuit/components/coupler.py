@@ -40,6 +40,10 @@ class Coupler(Component):
                  "_central_wavelength_V", "_central_coupling_strength_H", "_central_coupling_strength_V",
                  "_coupling_gradient_H", "_coupling_gradient_V", "_length", "_insertion_loss_db")
     
+    _PARAMETERS = ("central_wavelength_H", "central_wavelength_V", "central_coupling_strength_H",
+                   "central_coupling_strength_V", "coupling_gradient_H", "coupling_gradient_V",
+                   "length", "insertion_loss_db")
+    
     _EPSILON = 1e-5
 
     def __init__(self, *, name: str, central_wavelength_H: float, central_wavelength_V: float,
@@ -150,4 +154,39 @@ class Coupler(Component):
             [       0,   tau_V,       0, kappa_V,       0,       0,       0,       0],
             [ kappa_H,       0,   tau_H,       0,       0,       0,       0,       0],
             [       0, kappa_V,       0,   tau_V,       0,       0,       0,       0]
-        ], dtype=complex)
\ No newline at end of file
+        ], dtype=complex)
+    
+    def get_s_matrix_batch(self, wavelengths: NDArray[np.float64]) -> NDArray[np.complex128]:
+        """Returns the modified S matrices that mathematically represent the component for an array
+        of wavelengths
+        
+        :param wavelengths: Wavelengths of the light going through the component
+        :type wavelengths: NDArray[np.float64]
+        :return: The modified S matrices, with shape (len(wavelengths), 8, 8)
+        :rtype: NDArray[np.complex128]
+        """
+        
+        wavelengths = np.asarray(wavelengths, dtype=float)
+        
+        alpha = 10 ** (-self._insertion_loss_db / 20)
+        
+        kH = self._central_coupling_strength_H + \
+            self._coupling_gradient_H * (wavelengths - self._central_wavelength_H)
+
+        kV = self._central_coupling_strength_V + \
+            self._coupling_gradient_V * (wavelengths - self._central_wavelength_V)
+                
+        tau_H = alpha * np.cos(kH * self._length)
+        tau_V = alpha * np.cos(kV * self._length)
+        
+        kappa_H = alpha * 1j * np.sin(kH * self._length)
+        kappa_V = alpha * 1j * np.sin(kV * self._length)
+        
+        s_matrices = np.zeros((len(wavelengths), 8, 8), dtype=complex)
+        # through paths: port 1 <-> port 3 and port 2 <-> port 4
+        s_matrices[:, 0, 4] = s_matrices[:, 2, 6] = s_matrices[:, 4, 0] = s_matrices[:, 6, 2] = tau_H
+        s_matrices[:, 1, 5] = s_matrices[:, 3, 7] = s_matrices[:, 5, 1] = s_matrices[:, 7, 3] = tau_V
+        # cross paths: port 1 <-> port 4 and port 2 <-> port 3
+        s_matrices[:, 0, 6] = s_matrices[:, 2, 4] = s_matrices[:, 4, 2] = s_matrices[:, 6, 0] = kappa_H
+        s_matrices[:, 1, 7] = s_matrices[:, 3, 5] = s_matrices[:, 5, 3] = s_matrices[:, 7, 1] = kappa_V
+        return s_matrices
\ No newline at end of file
@@ -25,6 +25,9 @@ class HalfWavePlate(Component):
     __slots__ = ("id", "name", "_num_inputs", "_num_outputs", "_ports", "_port_aliases",
                  "_port_ids", "_in_degree", "_out_degree", "_angle")
     
+    _PARAMETERS = ("angle",)
+    _WAVELENGTH_INDEPENDENT = True
+    
     def __init__(self, *, name: str, angle: float):
         super().__init__(name, 1, 1)
         self._angle = angle
@@ -39,6 +39,9 @@ class MachZehnderInterferometer(Component):
                  "_port_ids", "_in_degree", "_out_degree", "_arm_length", "_central_wavelength_H",
                  "_central_wavelength_V", "_nH", "_nV", "_nH_gradient", "_nV_gradient")
     
+    _PARAMETERS = ("arm_length", "nH", "nV", "nH_gradient", "nV_gradient",
+                   "central_wavelength_H", "central_wavelength_V")
+    
     def __init__(self, *, name: str, arm_length: float, nH: float, nV: float, nH_gradient: float = 0,
                  nV_gradient: float = 0, central_wavelength_H: float, central_wavelength_V: float):
         super().__init__(name, 1, 1)
@@ -134,4 +137,29 @@ class MachZehnderInterferometer(Component):
                          [0, 0, 0, np.exp(1j * phi_V / 2) * np.sin(phi_V / 2)],
                          [np.exp(1j * phi_H / 2) * np.cos(phi_H / 2), 0, 0, 0],
                          [0, np.exp(1j * phi_V / 2) * np.cos(phi_V / 2), 0, 0]
-                         ], dtype=complex)
\ No newline at end of file
+                         ], dtype=complex)
+    
+    def get_s_matrix_batch(self, wavelengths: NDArray[np.float64]) -> NDArray[np.complex128]:
+        """Returns the modified S matrices that mathematically represent the component for an array
+        of wavelengths
+        
+        :param wavelengths: Wavelengths of the light going through the component
+        :type wavelengths: NDArray[np.float64]
+        :return: The modified S matrices, with shape (len(wavelengths), 4, 4)
+        :rtype: NDArray[np.complex128]
+        """
+        
+        wavelengths = np.asarray(wavelengths, dtype=float)
+    
+        nH_group = self._nH + (self._nH_gradient * (wavelengths - self._central_wavelength_H))
+        nV_group = self._nV + (self._nV_gradient * (wavelengths - self._central_wavelength_V))
+        
+        phi_H = (2 * np.pi * nH_group * self._arm_length) / wavelengths
+        phi_V = (2 * np.pi * nV_group * self._arm_length) / wavelengths
+        
+        s_matrices = np.zeros((len(wavelengths), 4, 4), dtype=complex)
+        s_matrices[:, 0, 2] = 1j * np.exp(1j * phi_H / 2) * np.sin(phi_H / 2)
+        s_matrices[:, 1, 3] = 1j * np.exp(1j * phi_V / 2) * np.sin(phi_V / 2)
+        s_matrices[:, 2, 0] = 1j * np.exp(1j * phi_H / 2) * np.cos(phi_H / 2)
+        s_matrices[:, 3, 1] = 1j * np.exp(1j * phi_V / 2) * np.cos(phi_V / 2)
+        return s_matrices
\ No newline at end of file
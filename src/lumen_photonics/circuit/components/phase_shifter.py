@@ -36,6 +36,9 @@ class PhaseShifter(Component):
                  "_port_ids", "_in_degree", "_out_degree", "_nH", "_nH_gradient", "_central_wavelength_H",
                  "_nV", "_nV_gradient", "_central_wavelength_V", "_length", "_power_ratio_H", "_power_ratio_V")
     
+    _PARAMETERS = ("nH", "nV", "nH_gradient", "nV_gradient", "central_wavelength_H",
+                   "central_wavelength_V", "length", "power_ratio_H", "power_ratio_V")
+    
 
     def __init__(self, *, name: str, nH: float, nV: float, 
                  central_wavelength_H: float, central_wavelength_V: float,
@@ -147,4 +150,32 @@ class PhaseShifter(Component):
             [ 0, 0, 0, a_V * np.exp(-1j * phase_V)],
             [ a_H * np.exp(-1j * phase_H), 0, 0, 0],
             [ 0, a_V * np.exp(-1j * phase_V), 0, 0]
-        ])
\ No newline at end of file
+        ])
+    
+    def get_s_matrix_batch(self, wavelengths: NDArray[np.float64]) -> NDArray[np.complex128]:
+        """Returns the modified S matrices that mathematically represent the component for an array
+        of wavelengths
+        
+        :param wavelengths: Wavelengths of the light going through the component
+        :type wavelengths: NDArray[np.float64]
+        :return: The modified S matrices, with shape (len(wavelengths), 4, 4)
+        :rtype: NDArray[np.complex128]
+        """
+        
+        wavelengths = np.asarray(wavelengths, dtype=float)
+        
+        nH_group = self._nH - (wavelengths - self._central_wavelength_H) * self._nH_gradient
+        nV_group = self._nV - (wavelengths - self._central_wavelength_V) * self._nV_gradient
+        
+        phase_H = (2 * np.pi * nH_group * self._length) / wavelengths
+        phase_V = (2 * np.pi * nV_group * self._length) / wavelengths
+        a_H = 10 ** ((-self._power_ratio_H * self._length) / 20)
+        a_V = 10 ** ((-self._power_ratio_V * self._length) / 20)
+        
+        t_H = a_H * np.exp(-1j * phase_H)
+        t_V = a_V * np.exp(-1j * phase_V)
+        
+        s_matrices = np.zeros((len(wavelengths), 4, 4), dtype=complex)
+        s_matrices[:, 0, 2] = s_matrices[:, 2, 0] = t_H
+        s_matrices[:, 1, 3] = s_matrices[:, 3, 1] = t_V
+        return s_matrices
\ No newline at end of file
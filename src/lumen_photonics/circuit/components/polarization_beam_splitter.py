@@ -45,6 +45,9 @@ class PolarizationBeamSplitter(Component):
                  "_port_ids", "_in_degree", "_out_degree", "_ER_db", "_insertion_loss_db",
                  "_phase_t", "_phase_e")
     
+    _PARAMETERS = ("ER_db", "insertion_loss_db", "phase_t", "phase_e")
+    _WAVELENGTH_INDEPENDENT = True
+    
 
     def __init__(self, *, name: str, ER_db: float | Literal["ideal"] = Literal["ideal"],
                  insertion_loss_db: float = 0, phase_t: float = 0, phase_e: float = 0):
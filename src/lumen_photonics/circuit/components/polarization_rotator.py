@@ -22,6 +22,8 @@ class PolarizationRotator(Component):
     __slots__ = ("id", "name", "_num_inputs", "_num_outputs", "_ports", "_port_aliases",
                  "_port_ids", "_in_degree", "_out_degree")
     
+    _WAVELENGTH_INDEPENDENT = True
+    
 
     def __init__(self, name: str):
         super().__init__(name, 1, 1)
@@ -1,37 +1,128 @@
 from collections.abc import Callable
+from typing import Optional
+import numpy as np
+from numpy.typing import NDArray
 from ..circuit.circuit_exceptions import InvalidLightFunctionException
 from ..models.light import CoherentLight, Light
 
 class Laser:
-    """Representation of a laser input into the circuit
-    
+    """Representation of a laser input into the circuit. The laser can be described by a light
+    function that is evaluated one time at a time, by a batch function that is evaluated for a
+    whole array of times at once, or by both.
+
     :param light_func: a function mapping a time to a light state
     :type light_func: Callable[float] -> CoherentLight
+    :param batch_func: a vectorized function mapping an array of times to arrays of the horizontal
+        Jones components, vertical Jones components and wavelengths at those times
+    :type batch_func: Callable[NDArray] -> tuple[NDArray, NDArray, NDArray]
     """
 
     # add more parameters
-    __slots__ = "_light_func",
-    
-    def __init__(self, *, light_func: Callable[[float], CoherentLight]):
+    __slots__ = "_light_func", "_batch_func"
+
+    def __init__(self, *, light_func: Optional[Callable[[float], CoherentLight]] = None,
+                 batch_func: Optional[Callable[[NDArray[np.float64]],
+                                               tuple[NDArray, NDArray, NDArray]]] = None):
+        if light_func is None and batch_func is None:
+            raise ValueError("Either 'light_func' or 'batch_func' must be given.")
         self._light_func = light_func
-        
+        self._batch_func = batch_func
+
     def __str__(self):
-        func_name = getattr(self._light_func, "__name__", "custom_profile")
+        func_name = getattr(self._light_func or self._batch_func, "__name__", "custom_profile")
         return f"Laser Source using function: {func_name}"
-        
+
     def __repr__(self):
-        func_name = getattr(self._light_func, "__name__", str(self._light_func))
-        return f"{self.__class__.__name__}(light_func={func_name})"
-    
+        light_func_name = getattr(self._light_func, "__name__", str(self._light_func))
+        batch_func_name = getattr(self._batch_func, "__name__", str(self._batch_func))
+        return f"{self.__class__.__name__}(light_func={light_func_name}, batch_func={batch_func_name})"
+
     def __call__(self, t: float) -> CoherentLight:
         """Makes the class's light function callable directly through the class
-        
+
         :param t: time
         :type t: float
         :return: The value of the light function at the specified time
         :rtype: CoherentLight
         """
+
+        if self._light_func is None:
+            jones, wavelengths = self.sample(np.array([t], dtype=float))
+            return CoherentLight.from_jones(eh=jones[0, 0], ev=jones[0, 1], wavelength=wavelengths[0])
+
         result = self._light_func(t)
         if isinstance(result, Light):
             return result
-        raise InvalidLightFunctionException(self)
\ No newline at end of file
+        raise InvalidLightFunctionException(self)
+
+    @classmethod
+    def from_waveform(cls, *, times: NDArray[np.float64], eh: NDArray[np.complex128],
+                      ev: NDArray[np.complex128], wavelengths: NDArray[np.float64]):
+        """Constructs a laser from a precomputed waveform table. Between the tabulated times,
+        the Jones components and wavelength are linearly interpolated. Outside of the tabulated
+        times, the first or last values are held.
+
+        :param times: Increasing times at which the waveform is tabulated
+        :type times: NDArray[np.float64]
+        :param eh: Horizontal Jones component at each tabulated time
+        :type eh: NDArray[np.complex128]
+        :param ev: Vertical Jones component at each tabulated time
+        :type ev: NDArray[np.complex128]
+        :param wavelengths: Wavelength at each tabulated time
+        :type wavelengths: NDArray[np.float64]
+        :return: A new laser backed by the waveform table
+        :rtype: Laser
+        """
+
+        table_times = np.asarray(times, dtype=float)
+        table_eh = np.asarray(eh, dtype=complex)
+        table_ev = np.asarray(ev, dtype=complex)
+        table_wavelengths = np.asarray(wavelengths, dtype=float)
+
+        def waveform(sample_times: NDArray[np.float64]) -> tuple[NDArray, NDArray, NDArray]:
+            # np.interp only handles real values, so real and imaginary parts are interpolated separately
+            sample_eh = np.interp(sample_times, table_times, table_eh.real) \
+                + 1j * np.interp(sample_times, table_times, table_eh.imag)
+            sample_ev = np.interp(sample_times, table_times, table_ev.real) \
+                + 1j * np.interp(sample_times, table_times, table_ev.imag)
+            return sample_eh, sample_ev, np.interp(sample_times, table_times, table_wavelengths)
+
+        return cls(batch_func=waveform)
+
+    @property
+    def light_func(self):
+        return self._light_func
+
+    @property
+    def batch_func(self):
+        return self._batch_func
+
+    def sample(self, times: NDArray[np.float64]) -> tuple[NDArray[np.complex128], NDArray[np.float64]]:
+        """Evaluates the laser at every time in an array. If the laser has a batch function, it
+        is evaluated once for the whole array. Otherwise, the light function is evaluated once
+        per time.
+
+        :param times: Array of times at which the laser is evaluated
+        :type times: NDArray[np.float64]
+        :return: The Jones vector at every time, with shape (len(times), 2), and the wavelength
+            at every time, with shape (len(times),)
+        :rtype: tuple[NDArray[np.complex128], NDArray[np.float64]]
+        """
+
+        times = np.asarray(times, dtype=float)
+        num_times = len(times)
+
+        jones = np.empty((num_times, 2), dtype=complex)
+        if self._batch_func is not None:
+            eh, ev, wavelengths = self._batch_func(times)
+            # scalars returned by the batch function are broadcast across all times
+            jones[:, 0] = eh
+            jones[:, 1] = ev
+            return jones, np.broadcast_to(np.asarray(wavelengths, dtype=float), (num_times,)).copy()
+
+        wavelengths = np.empty(num_times, dtype=float)
+        for time_index, time in enumerate(times):
+            light = self(time)
+            jones[time_index] = light._e
+            wavelengths[time_index] = light._wavelength
+        return jones, wavelengths
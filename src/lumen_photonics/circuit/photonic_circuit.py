@@ -1,6 +1,7 @@
-from collections.abc import MutableMapping, MutableSequence
+from collections.abc import Callable, MutableMapping, MutableSequence
 from uuid import UUID, uuid4 
 from ..circuit.laser import Laser
+from ..models.light import CoherentLight
 from ..models.port import InputConnection, OutputConnection, Port, PortConnection
 from .component import Component, PortRef
 from .circuit_exceptions import ConflictingConnectionException, DuplicateComponentException, DuplicateComponentNameException, MissingComponentException, SelfConnectionException
@@ -11,7 +12,8 @@ class PhotonicCircuit:
     functional circuit.
     """
 
-    __slots__ = "_id", "_components", "_names_to_components", "_circuit_inputs", "_circuit_outputs"
+    __slots__ = ("_id", "_components", "_names_to_components", "_circuit_inputs", "_circuit_outputs",
+                 "_topology_version")
 
     _DEFAULT_BACKGROUND_COLOR = "#E6E6E6"
     _DEFAULT_COMPONENT_COLOR = "#717171"
@@ -28,6 +30,8 @@ class PhotonicCircuit:
         self._circuit_inputs: MutableMapping[Port, Laser] = {}
         # the ports at which the final state is desired
         self._circuit_outputs: MutableSequence[Port] = []
+        # incremented on every change to the topology. Used to invalidate compiled simulation plans
+        self._topology_version = 0
         
     def __str__(self):
         comp_list = ", ".join([c._name for c in self._components]) if self._components else "Empty"
@@ -65,22 +69,29 @@ class PhotonicCircuit:
     def circuit_inputs(self) -> MutableSequence[Port]:
         return self._circuit_outputs
 
-    def set_circuit_input(self, *, laser: Laser, port_ref: PortRef) -> None:
+    def set_circuit_input(self, *, laser: Laser | Callable[[float], CoherentLight],
+                          port_ref: PortRef) -> None:
         """Sets a port that laser light source inputs to.
 
-        :param laser: The laser used as input at that port
-        :type laser: Laser
+        :param laser: The laser used as input at that port. A plain light function is wrapped
+            in a laser
+        :type laser: Laser | Callable[[float], CoherentLight]
         :param port_ref: The component and input port that the laser light inputs to
         :type port_ref: PortRef
         """
 
         port = self._get_port_from_ref(port_ref=port_ref)
         
+        # plain light functions are wrapped so every circuit input supports batched sampling
+        if not isinstance(laser, Laser):
+            laser = Laser(light_func=laser)
+        
         # ports cannot be inputs and outputs at the same time
         if port in self._circuit_outputs:
             raise ConflictingConnectionException(self, port_ref, "output")
         
         self._circuit_inputs[port] = laser
+        self._topology_version += 1
 
         if port._connection is None:
             port._component._in_degree += 1
@@ -95,6 +106,7 @@ class PhotonicCircuit:
 
         port = self._get_port_from_ref(port_ref=port_ref)
         self._circuit_outputs.append(port)
+        self._topology_version += 1
         
         # ports cannot be inputs and outputs at the same time
         if port in self._circuit_inputs:
@@ -119,6 +131,7 @@ class PhotonicCircuit:
         component._photonic_circuit = self
         self._components.append(component)
         self._names_to_components[component._name] = component
+        self._topology_version += 1
         
     def remove(self, component: Component) -> None:
         """Adds a component to the circuit.
@@ -130,6 +143,7 @@ class PhotonicCircuit:
         component._photonic_circuit = None
         self._components.remove(component)
         self._names_to_components.pop(component._name)
+        self._topology_version += 1
 
     def connect(self, *, source: PortRef, destination: PortRef) -> None:
         """Connect the specified port of one component in the circuit to the
@@ -175,6 +189,7 @@ class PhotonicCircuit:
         
         port1._connection = PortConnection(port2)
         port2._connection = PortConnection(port1)
+        self._topology_version += 1
 
     def disconnect(self, *, port_ref: PortRef) -> None:
         """Disconnects a component's input from another component's output and vice versa.
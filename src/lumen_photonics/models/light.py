@@ -205,7 +205,7 @@ class IncoherentLight(Light):
         s = self.stokes_vector()
         return (
             f"--- Incoherent Light ---\n"
-            f"  Total Intensity: {self.intensity():.4e}\n"
+            f"  Total Intensity: {self.intensity:.4e}\n"
             f"  DOP:             {self.DOP()*100:.1f}%\n"
             f"  Sub-states:      {len(self.coherent_lights)}\n"
             f"  Stokes:          ({s.S0:.2f}, {s.S1:.2f}, {s.S2:.2f}, {s.S3:.2f})"
@@ -222,16 +222,14 @@ class IncoherentLight(Light):
         :type coherent_lights: Sequence[CoherentLight]
         """
         
-        return cls(coherent_lights)
+        return cls(coherent_lights=coherent_lights)
     
     @classmethod
-    def from_stokes(cls, stokes: Stokes, wavelength: float):
+    def from_stokes(cls, *, stokes: Stokes, wavelength: float):
         """Constructs a Incoherent Light instance from a Stokes vector.
         
         :param stokes: The Stokes parameters (S0, S1, S2, S3)
         :type stokes: Stokes
-        :param global_phase: Absolute phase offset in radians, defaults to 0
-        :type global_phase: float
         :param wavelength: The wavelength of the light
         :type wavelength: float
         :return: A new Light instance with the calculated Jones vector
@@ -248,7 +246,7 @@ class IncoherentLight(Light):
             # construct a pure Stokes vector for the polarized part
             pure_stokes = Stokes(pure_S0, S1, S2, S3)
             # Use your existing from_jones logic (DOP=1 here)
-            polarized_part = CoherentLight.from_stokes(pure_stokes, wavelength)
+            polarized_part = CoherentLight.from_stokes(stokes=pure_stokes, wavelength=wavelength)
         else:
             polarized_part = None
 
@@ -269,7 +267,7 @@ class IncoherentLight(Light):
         else:
             parts = unpolarized_part
             
-        return cls(parts)
+        return cls(coherent_lights=parts)
 
     def stokes_parameter(self, parameter: StokesParameters, /) -> float:
         """Gets the specified Stokes parameter associated with the light.
@@ -0,0 +1,186 @@
+from collections.abc import Sequence
+from typing import MutableSequence, Optional
+import numpy as np
+from numpy.typing import NDArray
+from typing import TYPE_CHECKING
+from ..models.port import Port
+from ..circuit.component import PortRef
+
+# avoids circular import errors from type hinting
+if TYPE_CHECKING:
+    from ..circuit.photonic_circuit import PhotonicCircuit
+
+class MonteCarloResult:
+    """The parameter values and output powers of the circuit instances of a Monte Carlo analysis.
+    Only the powers of the H and V states at every output are kept, with shape (num_samples,
+    num_wavelengths, num_outputs, 2), from which the statistics are computed.
+
+    Parameters are labeled 'component_name.parameter_name'.
+
+    :param photonic_circuit: The photonic circuit that was analysed
+    :type photonic_circuit: PhotonicCircuit
+    :param parameters: The labels of the varied parameters, in the order of the parameter axis
+    :type parameters: MutableSequence[str]
+    :param samples: The parameter values of every instance, with shape (num_samples, num_parameters)
+    :type samples: NDArray[np.float64]
+    :param output_ports: The circuit outputs, in the order of the output axis
+    :type output_ports: MutableSequence[Port]
+    :param wavelengths: The wavelengths that the instances were simulated at
+    :type wavelengths: NDArray[np.float64]
+    :param powers: The powers of the H and V states at every output of every instance
+    :type powers: NDArray[np.float64]
+    """
+
+    __slots__ = "_photonic_circuit", "_parameters", "_samples", "_output_ports", "_output_port_to_index", \
+        "_wavelengths", "_powers"
+
+    def __init__(self, photonic_circuit: "PhotonicCircuit", *, parameters: MutableSequence[str],
+                 samples: NDArray[np.float64], output_ports: MutableSequence[Port],
+                 wavelengths: NDArray[np.float64], powers: NDArray[np.float64]):
+        self._photonic_circuit = photonic_circuit
+        self._parameters = list(parameters)
+        self._samples = samples
+        self._output_ports = list(output_ports)
+        self._output_port_to_index = {port: index for index, port in enumerate(self._output_ports)}
+        self._wavelengths = wavelengths
+        self._powers = powers
+
+    def __str__(self):
+        port_summary = []
+        if len(self) > 0:
+            total_powers = self._powers.sum(axis=-1)
+            for port, mean_power, std_power in zip(self._output_ports, total_powers.mean(axis=(0, 1)),
+                                                   total_powers.std(axis=(0, 1))):
+                port_summary.append(f"    - {port.component._name} (Port {port._id.hex[:4]}): "
+                                    f"Mean Power: {mean_power:.2e}, Std: {std_power:.2e}")
+
+        summary_text = "\n".join(port_summary) if port_summary else "    (No samples recorded)"
+
+        return (
+            f"--- Monte Carlo Results ---\n"
+            f"  Samples:           {len(self)}\n"
+            f"  Varied Parameters: {len(self._parameters)}\n"
+            f"  Wavelengths:       {len(self._wavelengths)}\n"
+            f"  Port Statistics:\n{summary_text}"
+        )
+
+    def __repr__(self):
+        return (f"MonteCarloResult(parameters={self._parameters!r}, "
+                f"num_samples={len(self)!r})")
+
+    def __len__(self):
+        return len(self._samples)
+
+    @property
+    def photonic_circuit(self):
+        return self._photonic_circuit
+
+    @property
+    def parameters(self) -> MutableSequence[str]:
+        return self._parameters
+
+    @property
+    def samples(self) -> NDArray[np.float64]:
+        return self._samples
+
+    @property
+    def output_ports(self) -> MutableSequence[Port]:
+        return self._output_ports
+
+    @property
+    def wavelengths(self) -> NDArray[np.float64]:
+        return self._wavelengths
+
+    @property
+    def powers(self) -> NDArray[np.float64]:
+        return self._powers
+
+    def get_power(self, port_ref: PortRef) -> NDArray[np.float64]:
+        """Returns the power at an output port for every instance.
+
+        :param port_ref: The port reference that specifies the output port
+        :type port_ref: PortRef
+        :return: The powers, with shape (num_samples, num_wavelengths)
+        :rtype: NDArray[np.float64]
+        """
+
+        return self._powers[:, :, self._get_output_index(port_ref)].sum(axis=-1)
+
+    def get_power_percentiles(self, port_ref: PortRef, percentiles: Sequence[float] = (5, 50, 95)
+                              ) -> NDArray[np.float64]:
+        """Returns percentiles of the power at an output port over the instances.
+
+        :param port_ref: The port reference that specifies the output port
+        :type port_ref: PortRef
+        :param percentiles: The percentiles, between 0 and 100, defaults to (5, 50, 95)
+        :type percentiles: Sequence[float]
+        :return: The percentiles, with shape (len(percentiles), num_wavelengths)
+        :rtype: NDArray[np.float64]
+        """
+
+        return np.percentile(self.get_power(port_ref), percentiles, axis=0)
+
+    def get_extinction_ratio(self, port_ref: PortRef, leakage_port_ref: Optional[PortRef] = None
+                             ) -> NDArray[np.float64]:
+        """Returns the extinction ratio of every instance, either between the power at an output
+        port and the power leaking to another one, or between the stronger and the weaker
+        polarization at one output port.
+
+        :param port_ref: The port reference that specifies the output port
+        :type port_ref: PortRef
+        :param leakage_port_ref: The port reference that specifies the port that the power leaks
+            to, defaults to None, which compares the H and V powers at the output port
+        :type leakage_port_ref: Optional[PortRef]
+        :return: The extinction ratios [dB], with shape (num_samples, num_wavelengths)
+        :rtype: NDArray[np.float64]
+        """
+
+        if leakage_port_ref is None:
+            polarization_powers = self._powers[:, :, self._get_output_index(port_ref)]
+            intended_powers = polarization_powers.max(axis=-1)
+            leaked_powers = polarization_powers.min(axis=-1)
+        else:
+            intended_powers = self.get_power(port_ref)
+            leaked_powers = self.get_power(leakage_port_ref)
+
+        with np.errstate(divide="ignore"):
+            return 10*np.log10(intended_powers / leaked_powers)
+
+    def get_yield(self, port_ref: PortRef, *, min_power: Optional[float] = None,
+                  max_power: Optional[float] = None) -> float:
+        """Returns the fraction of instances whose power at an output port stays within bounds at
+        every wavelength.
+
+        :param port_ref: The port reference that specifies the output port
+        :type port_ref: PortRef
+        :param min_power: The lowest allowed power, defaults to None, which has no lower bound
+        :type min_power: Optional[float]
+        :param max_power: The highest allowed power, defaults to None, which has no upper bound
+        :type max_power: Optional[float]
+        :return: The fraction of instances within the bounds
+        :rtype: float
+        """
+
+        powers = self.get_power(port_ref)
+        within_bounds = np.ones(powers.shape, dtype=bool)
+        if min_power is not None:
+            within_bounds &= powers >= min_power
+        if max_power is not None:
+            within_bounds &= powers <= max_power
+        return float(within_bounds.all(axis=1).mean()) if len(self) > 0 else 0.0
+
+    def _get_output_index(self, port_ref: PortRef) -> int:
+        """Helper function to get the index of the specified output port in the stored arrays.
+
+        :param port_ref: Port reference that specifies output port
+        :type port_ref: PortRef
+        :return: The index of the output port
+        :rtype: int
+        """
+
+        from ..circuit.circuit_exceptions import MissingPortException
+
+        output_port = self._photonic_circuit._get_port_from_ref(port_ref)
+        if output_port not in self._output_port_to_index:
+            raise MissingPortException(output_port, f"{port_ref} is not an output of the analysis")
+        return self._output_port_to_index[output_port]
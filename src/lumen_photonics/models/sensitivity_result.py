@@ -0,0 +1,152 @@
+from typing import MutableSequence
+import numpy as np
+from numpy.typing import NDArray
+from typing import TYPE_CHECKING
+from ..models.port import Port
+from ..circuit.component import PortRef
+
+# avoids circular import errors from type hinting
+if TYPE_CHECKING:
+    from ..circuit.photonic_circuit import PhotonicCircuit
+
+class SensitivityResult:
+    """The derivatives of a circuit's external S matrix with respect to the tunable parameters of
+    its components. The external S matrices have shape (num_wavelengths, 2*num_outputs,
+    2*num_inputs), with the H and V states of every port interleaved, and the derivatives have
+    shape (num_wavelengths, num_parameters, 2*num_outputs, 2*num_inputs).
+
+    Parameters are labeled 'component_name.parameter_name'.
+
+    :param photonic_circuit: The photonic circuit that was analysed
+    :type photonic_circuit: PhotonicCircuit
+    :param parameters: The labels of the parameters, in the order of the parameter axis
+    :type parameters: MutableSequence[str]
+    :param input_ports: The circuit inputs, in the order of the input axis
+    :type input_ports: MutableSequence[Port]
+    :param output_ports: The circuit outputs, in the order of the output axis
+    :type output_ports: MutableSequence[Port]
+    :param wavelengths: The wavelengths that the circuit was analysed at
+    :type wavelengths: NDArray[np.float64]
+    :param s_parameters: The external S matrices of the circuit
+    :type s_parameters: NDArray[np.complex128]
+    :param derivatives: The derivatives of the external S matrices
+    :type derivatives: NDArray[np.complex128]
+    """
+
+    __slots__ = "_photonic_circuit", "_parameters", "_parameter_to_index", "_input_ports", \
+        "_output_ports", "_output_port_to_index", "_wavelengths", "_s_parameters", "_derivatives"
+
+    def __init__(self, photonic_circuit: "PhotonicCircuit", *, parameters: MutableSequence[str],
+                 input_ports: MutableSequence[Port], output_ports: MutableSequence[Port],
+                 wavelengths: NDArray[np.float64], s_parameters: NDArray[np.complex128],
+                 derivatives: NDArray[np.complex128]):
+        self._photonic_circuit = photonic_circuit
+        self._parameters = list(parameters)
+        self._parameter_to_index = {parameter: index for index, parameter in enumerate(self._parameters)}
+        self._input_ports = list(input_ports)
+        self._output_ports = list(output_ports)
+        self._output_port_to_index = {port: index for index, port in enumerate(self._output_ports)}
+        self._wavelengths = wavelengths
+        self._s_parameters = s_parameters
+        self._derivatives = derivatives
+
+    def __str__(self):
+        return (
+            f"--- Sensitivity Results ---\n"
+            f"  Parameters:  {len(self._parameters)}\n"
+            f"  Wavelengths: {len(self._wavelengths)}\n"
+            f"  Inputs:      {len(self._input_ports)}\n"
+            f"  Outputs:     {len(self._output_ports)}"
+        )
+
+    def __repr__(self):
+        return (f"SensitivityResult(parameters={self._parameters!r}, "
+                f"wavelengths={self._wavelengths!r})")
+
+    def __len__(self):
+        return len(self._wavelengths)
+
+    @property
+    def photonic_circuit(self):
+        return self._photonic_circuit
+
+    @property
+    def parameters(self) -> MutableSequence[str]:
+        return self._parameters
+
+    @property
+    def input_ports(self) -> MutableSequence[Port]:
+        return self._input_ports
+
+    @property
+    def output_ports(self) -> MutableSequence[Port]:
+        return self._output_ports
+
+    @property
+    def wavelengths(self) -> NDArray[np.float64]:
+        return self._wavelengths
+
+    @property
+    def s_parameters(self) -> NDArray[np.complex128]:
+        return self._s_parameters
+
+    @property
+    def derivatives(self) -> NDArray[np.complex128]:
+        return self._derivatives
+
+    def get_derivatives(self, parameter: str) -> NDArray[np.complex128]:
+        """Returns the derivatives of the external S matrices with respect to one parameter, as a
+        view of the stored array.
+
+        :param parameter: The label of the parameter, 'component_name.parameter_name'
+        :type parameter: str
+        :raises KeyError: The parameter was not analysed
+        :return: The derivatives, with shape (num_wavelengths, 2*num_outputs, 2*num_inputs)
+        :rtype: NDArray[np.complex128]
+        """
+
+        if parameter not in self._parameter_to_index:
+            raise KeyError(f"{parameter} was not analysed. Analysed parameters: {', '.join(self._parameters)}")
+        return self._derivatives[:, self._parameter_to_index[parameter]]
+
+    def get_gradient(self, objective_gradient: NDArray[np.complex128]) -> NDArray[np.float64]:
+        """Returns the gradient of a real objective f of the external S matrix T with respect to
+        every parameter, by the chain rule df/dp = 2 Re(sum(df/dT * dT/dp)).
+
+        :param objective_gradient: The Wirtinger derivative df/dT of the objective, with shape
+            (2*num_outputs, 2*num_inputs), or with one such matrix per wavelength
+        :type objective_gradient: NDArray[np.complex128]
+        :return: The gradient, with shape (num_wavelengths, num_parameters)
+        :rtype: NDArray[np.float64]
+        """
+
+        objective_gradient = np.broadcast_to(objective_gradient, self._s_parameters.shape)
+        return 2*np.einsum("woi,wpoi->wp", objective_gradient, self._derivatives).real
+
+    def get_power_gradient(self, port_ref: PortRef, input_jones: NDArray[np.complex128]) -> NDArray[np.float64]:
+        """Returns the gradient of the power at an output port with respect to every parameter,
+        for coherent light with the same wavelength at every input.
+
+        :param port_ref: The port reference that specifies the output port
+        :type port_ref: PortRef
+        :param input_jones: The Jones vectors of the light at every input, in the order of the
+            input ports, with shape (num_inputs, 2)
+        :type input_jones: NDArray[np.complex128]
+        :return: The gradient, with shape (num_wavelengths, num_parameters)
+        :rtype: NDArray[np.float64]
+        """
+
+        from ..circuit.circuit_exceptions import MissingPortException
+
+        output_port = self._photonic_circuit._get_port_from_ref(port_ref)
+        if output_port not in self._output_port_to_index:
+            raise MissingPortException(output_port, f"{port_ref} is not an output of the analysis")
+        output_states = slice(2*self._output_port_to_index[output_port],
+                              2*self._output_port_to_index[output_port] + 2)
+
+        # the power |T a|^2 of the port's states has the derivative conj(T a) a^T
+        input_vector = np.asarray(input_jones, dtype=complex).ravel()
+        output_jones = self._s_parameters[:, output_states] @ input_vector
+        objective_gradient = np.zeros(self._s_parameters.shape, dtype=complex)
+        objective_gradient[:, output_states] = output_jones.conj()[:, :, None] * input_vector
+        return self.get_gradient(objective_gradient)
@@ -1,5 +1,5 @@
-from collections import defaultdict
-from typing import Literal, MutableSequence
+from collections.abc import Sequence
+from typing import Literal, MutableSequence, Optional
 import numpy as np
 from numpy.typing import NDArray
 from typing import TYPE_CHECKING
@@ -7,66 +7,199 @@ from ..models.model_exceptions import InvalidLightTypeException
 from ..simulation.simulation import Coherence
 from ..models.port import Port
 from ..circuit.component import PortRef
-from ..models.light import IncoherentLight, Light
+from ..models.light import CoherentLight, IncoherentLight, Light
+from ..models.stokes import Stokes
 
 # avoids circular import errors from type hinting
 if TYPE_CHECKING:
     from ..circuit.photonic_circuit import PhotonicCircuit
+    from ..simulation.solver_options import SolverChoice
+    from ..simulation.simulation_stats import SimulationStats
 
 class SimulationResult:
-    """The resulting light states of a simulation. Used to map ports to lists
-    of light states
+    """The resulting light states of a simulation. The Jones vectors of every output are stored in
+    one contiguous array, and light objects are only created when they are accessed.
     
+    For a coherent result, the Jones vectors have shape (num_times, num_outputs, 2) and the
+    wavelengths have shape (num_times,). For an incoherent result, every source contributes one
+    coherent part, so the Jones vectors have shape (num_times, num_outputs, num_sources, 2) and the
+    wavelengths have shape (num_times, num_sources).
+    
+    Incoherent results can instead store one 2x2 coherency matrix <e e^H> per output state, with
+    shape (num_times, num_outputs, 2, 2), whose size does not depend on the amount of sources. The
+    wavelengths then have shape (num_times,) and hold the mean wavelength of the sources.
+    
+    :param photonic_circuit: The photonic circuit that was simulated
+    :type photonic_circuit: PhotonicCircuit
     :param coherence: The coherence state of the simulation result's light states
     :type coherence: Coherence
+    :param output_ports: The output ports, in the order of the output axis of the Jones vectors
+    :type output_ports: MutableSequence[Port]
+    :param wavelengths: The wavelengths of the output light states
+    :type wavelengths: NDArray[np.float64]
+    :param jones: The Jones vectors of the output light states
+    :type jones: NDArray[np.complex128], optional
+    :param coherency: The coherency matrices of the output light states, given instead of the
+        Jones vectors for incoherent results
+    :type coherency: NDArray[np.complex128], optional
+    :param solver_choices: The solver that every partition of the circuit was solved with, and
+        why it was chosen
+    :type solver_choices: MutableSequence[SolverChoice], optional
+    :param stats: The wall times, call counts, matrix sizes and memory estimates of every phase of
+        the simulation
+    :type stats: SimulationStats, optional
     """
     
-    def __init__(self, photonic_circuit: "PhotonicCircuit", coherence: Coherence):
+    __slots__ = "_photonic_circuit", "_coherence", "_output_ports", "_output_port_to_index", \
+        "_jones", "_wavelengths", "_coherency", "_solver_choices", "_stats"
+    
+    def __init__(self, photonic_circuit: "PhotonicCircuit", coherence: Coherence, *,
+                 output_ports: MutableSequence[Port], wavelengths: NDArray[np.float64],
+                 jones: Optional[NDArray[np.complex128]] = None,
+                 coherency: Optional[NDArray[np.complex128]] = None,
+                 solver_choices: Optional[MutableSequence["SolverChoice"]] = None,
+                 stats: Optional["SimulationStats"] = None):
+        if (jones is None) == (coherency is None):
+            raise ValueError("Exactly one of 'jones' or 'coherency' must be given.")
+        
         self._photonic_circuit = photonic_circuit
-        self._port_to_output_lights = defaultdict(list)
         self._coherence = coherence
-        
+        self._output_ports = list(output_ports)
+        self._output_port_to_index = {port: index for index, port in enumerate(self._output_ports)}
+        self._jones = jones
+        self._wavelengths = wavelengths
+        self._coherency = coherency
+        self._solver_choices = list(solver_choices) if solver_choices is not None else []
+        self._stats = stats
+    
     def __str__(self):
-        port_count = len(self._port_to_output_lights)
+        port_count = len(self._output_ports)
         
         port_summary = []
-        for port, lights in self._port_to_output_lights.items():
-            if lights:
-                avg_p = np.mean([l.intensity if hasattr(l, 'intensity') else l.intensity() for l in lights])
-                port_summary.append(f"    - {port.component._name} (Port {port._id.hex[:4]}): {len(lights)} states, Avg Power: {avg_p:.2e}")
-
+        if len(self) > 0:
+            average_powers = self._get_stokes_array(slice(None))[..., 0].mean(axis=0)
+            for port, average_power in zip(self._output_ports, average_powers):
+                port_summary.append(f"    - {port.component._name} (Port {port._id.hex[:4]}): "
+                                    f"{len(self)} states, Avg Power: {average_power:.2e}")
+        
         summary_text = "\n".join(port_summary) if port_summary else "    (No output data recorded)"
-
+        
         return (
             f"--- Simulation Results [{self._coherence.name}] ---\n"
             f"  Total Active Ports: {port_count}\n"
             f"  Port Data Breakdown:\n{summary_text}"
         )
-
+    
     def __repr__(self):
         return (f"SimulationResult(coherence={self._coherence!r}, "
-                f"recorded_ports={list(self._port_to_output_lights.keys())!r})")
+                f"recorded_ports={self._output_ports!r})")
+    
+    def __len__(self):
+        return len(self._wavelengths)
     
-    def __getitem__(self, port_ref: PortRef) -> MutableSequence[Light]:
-        """Returns list of lights corresponding to a port reference. Makes class itself callable
+    def __getitem__(self, port_ref: PortRef) -> Sequence[Light]:
+        """Returns the lights corresponding to a port reference. Makes class itself callable.
+        The light objects are created when they are indexed.
         
         :param port_ref: The port reference used to specify the desired output states
         :type port_ref: PortRef
-        :return: List of lights that are outputted from that output port
-        :rtype: MutableSequence[Light]
+        :return: Sequence of lights that are outputted from that output port
+        :rtype: Sequence[Light]
         """
-                
-        output_port = self._get_output_port(port_ref)
         
-        return self._port_to_output_lights[output_port]
+        return _OutputLights(self, self._get_output_index(port_ref))
     
     @property
     def photonic_circuit(self):
         return self._photonic_circuit
     
     @property
-    def coherence(self) -> Coherence:        
-        return self.coherence
+    def coherence(self) -> Coherence:
+        return self._coherence
+    
+    @property
+    def output_ports(self) -> MutableSequence[Port]:
+        return self._output_ports
+    
+    @property
+    def jones(self) -> NDArray[np.complex128]:
+        return self._jones
+    
+    @property
+    def wavelengths(self) -> NDArray[np.float64]:
+        return self._wavelengths
+    
+    @property
+    def coherency(self) -> Optional[NDArray[np.complex128]]:
+        return self._coherency
+    
+    @property
+    def solver_choices(self) -> MutableSequence["SolverChoice"]:
+        return self._solver_choices
+    
+    @property
+    def stats(self) -> Optional["SimulationStats"]:
+        return self._stats
+    
+    def get_jones(self, port_ref: PortRef) -> NDArray[np.complex128]:
+        """Returns the Jones vectors at the specified output port for every light state, as a view
+        of the stored array.
+        
+        :param port_ref: The port reference that specifies the port
+        :type port_ref: PortRef
+        :return: The Jones vectors, with shape (num_times, 2) for coherent results and
+            (num_times, num_sources, 2) for incoherent results
+        :rtype: NDArray[np.complex128]
+        """
+        
+        output_index = self._get_output_index(port_ref)
+        if self._jones is None:
+            raise InvalidLightTypeException(self._coherence, "Jones vectors are not stored by "
+                                            "results simulated with coherency matrices.")
+        return self._jones[:, output_index]
+    
+    def get_coherency(self, port_ref: PortRef) -> NDArray[np.complex128]:
+        """Returns the coherency matrix <e e^H> at the specified output port for every light state.
+        For incoherent light stored as Jones vectors, the coherency matrices of the sources are summed.
+        
+        :param port_ref: The port reference that specifies the port
+        :type port_ref: PortRef
+        :return: The coherency matrices, with shape (num_times, 2, 2)
+        :rtype: NDArray[np.complex128]
+        """
+        
+        output_index = self._get_output_index(port_ref)
+        if self._coherency is not None:
+            return self._coherency[:, output_index]
+        
+        jones = self._jones[:, output_index]
+        coherency = jones[..., :, None] * jones[..., None, :].conj()
+        if self._coherence == Coherence.INCOHERENT:
+            return coherency.sum(axis=1)
+        return coherency
+    
+    def get_stokes(self, port_ref: PortRef) -> NDArray[np.float64]:
+        """Returns the Stokes vector at the specified output port for every light state.
+        
+        :param port_ref: The port reference that specifies the port
+        :type port_ref: PortRef
+        :return: The Stokes parameters S0, S1, S2 and S3, with shape (num_times, 4)
+        :rtype: NDArray[np.float64]
+        """
+        
+        return self._get_stokes_array(self._get_output_index(port_ref))
+    
+    def get_DOP(self, port_ref: PortRef) -> NDArray[np.float64]:
+        """Returns the degree of polarization (DOP) at the specified output port for every light state.
+        
+        :param port_ref: The port reference that specifies the port
+        :type port_ref: PortRef
+        :return: The DOP for every light state
+        :rtype: NDArray[np.float64]
+        """
+        
+        stokes = self.get_stokes(port_ref)
+        return np.linalg.norm(stokes[:, 1:], axis=1) / stokes[:, 0]
     
     def get_power(self, port_ref: PortRef) -> NDArray[np.float64]:
         """Returns the power outputted at the specified output port for every light state.
@@ -76,19 +209,9 @@ class SimulationResult:
         :return: The power for every light state
         :rtype: NDArray[np.float64]
         """
-        if self._coherence == Coherence.COHERENT:
-            eh, ev = self._get_arrays(port_ref)
-            return np.abs(eh)**2 + np.abs(ev)**2
-        
-        elif self._coherence == Coherence.INCOHERENT:
-            power_list = []
-            output_port = self._get_output_port(port_ref)
-            light_states = self._port_to_output_lights[output_port]
-            
-            for light in light_states:
-                power_list.append(light.intensity)
-            return np.array(power_list)
         
+        return self.get_stokes(port_ref)[:, 0]
+    
     def get_power_H(self, port_ref: PortRef) -> NDArray[np.float64]:
         """Returns the horizontal power outputted at the specified output port for every light state.
         
@@ -97,18 +220,9 @@ class SimulationResult:
         :return: The power for every light state
         :rtype: NDArray[np.float64]
         """
-        if self._coherence == Coherence.COHERENT:
-            eh, ev = self._get_arrays(port_ref) # TODO: fix
-            return np.abs(eh)**2
-        
-        elif self._coherence == Coherence.INCOHERENT:
-            power_list = []
-            output_port = self._get_output_port(port_ref)
-            light_states = self._port_to_output_lights[output_port]
-            
-            for light in light_states:
-                power_list.append(light.intensity_H)
-            return np.array(power_list)
+        
+        stokes = self.get_stokes(port_ref)
+        return (stokes[:, 0] + stokes[:, 1]) / 2
     
     def get_power_V(self, port_ref: PortRef) -> NDArray[np.float64]:
         """Returns the vertical power outputted at the specified output port for every light state.
@@ -118,31 +232,23 @@ class SimulationResult:
         :return: The power for every light state
         :rtype: NDArray[np.float64]
         """
-        if self._coherence == Coherence.COHERENT:
-            eh, ev = self._get_arrays(port_ref) # TODO: fix
-            return np.abs(ev)**2
-        
-        elif self._coherence == Coherence.INCOHERENT:
-            power_list = []
-            output_port = self._get_output_port(port_ref)
-            light_states = self._port_to_output_lights[output_port]
-            
-            for light in light_states:
-                power_list.append(light.intensity_V)
-            return np.array(power_list)
-
+        
+        stokes = self.get_stokes(port_ref)
+        return (stokes[:, 0] - stokes[:, 1]) / 2
+    
     def get_wavelengths(self, port_ref: PortRef) -> NDArray[np.float64]:
         """Returns the wavelengths of the light.
         
         :param port_ref: The port reference that specifies the port
         :type port_ref: PortRef
         """
-        output_port = self._get_output_port(port_ref)
-        output_lights = self._port_to_output_lights[output_port]
-        if isinstance(output_lights[0], IncoherentLight):
+        
+        self._get_output_index(port_ref)
+        if self._coherence == Coherence.INCOHERENT:
             raise InvalidLightTypeException(Coherence.INCOHERENT)
         
-        return np.array([light.wavelength for light in output_lights])
+        # every output shares the wavelength of the input light
+        return self._wavelengths
     
     def get_average_power(self, port_ref: PortRef) -> float:
         """Returns the average power outputted at the specified output port for every light state.
@@ -153,7 +259,7 @@ class SimulationResult:
         :rtype: float
         """
         return np.mean(self.get_power(port_ref))
-
+    
     def get_phase(self, port_ref: PortRef,
                   mode: Literal["horizontal", "vertical"]) -> NDArray[np.float64]:
         """Returns the phase at the specified output port for every light state
@@ -173,7 +279,7 @@ class SimulationResult:
             return np.angle(ev)
         else:
             raise InvalidLightTypeException(self._coherence)
-            
+    
     
     def get_relative_phase(self, port_ref: PortRef) -> NDArray[np.float64]:
         """Returns the relative phase between the horizontal and vertical modes at the
@@ -183,23 +289,92 @@ class SimulationResult:
         :type port_ref: PortRef
         :return: The phase for every light state
         :rtype: NDArray[np.float64]
-        """    
+        """
         
         return self.get_phase(port_ref, "horizontal") - self.get_phase(port_ref, "vertical")
     
     def _get_arrays(self, port_ref: PortRef) -> tuple[NDArray]:
-        """Helper function to get eh and ev as numpy arrays for speed.
+        """Helper function to get eh and ev as views of the stored Jones vectors.
         
         :param port_ref: The port reference that specifies the port
         :type port_ref: PortRef
         :return: the horizontal E field and the vertical E field
         :rtype: tuple[NDArray]
-        """        
+        """
+        
+        jones = self.get_jones(port_ref)
+        return jones[..., 0], jones[..., 1]
+    
+    def _get_stokes_array(self, output_index: int | slice,
+                          time_index: int | slice = slice(None)) -> NDArray[np.float64]:
+        """Helper function to get the Stokes parameters of the stored light states. For incoherent
+        light stored as Jones vectors, the Stokes parameters of the sources are summed.
+        
+        :param output_index: Index or slice of the output ports
+        :type output_index: int | slice
+        :param time_index: Index or slice of the times, defaults to every time
+        :type time_index: int | slice
+        :return: The Stokes parameters S0, S1, S2 and S3 along the last axis
+        :rtype: NDArray[np.float64]
+        """
+        
+        if self._coherency is not None:
+            coherency = self._coherency[time_index, output_index]
+            intensity_H = coherency[..., 0, 0].real
+            intensity_V = coherency[..., 1, 1].real
+            # conj(eh) * ev is the lower off-diagonal entry of <e e^H>
+            cross = coherency[..., 1, 0]
+        else:
+            jones = self._jones[time_index, output_index]
+            intensity_H = jones[..., 0].real**2 + jones[..., 0].imag**2
+            intensity_V = jones[..., 1].real**2 + jones[..., 1].imag**2
+            cross = jones[..., 0].conj() * jones[..., 1]
+        
+        stokes = np.stack((intensity_H + intensity_V, intensity_H - intensity_V,
+                           2*cross.real, 2*cross.imag), axis=-1)
+        if self._coherence == Coherence.INCOHERENT and self._coherency is None:
+            return stokes.sum(axis=-2)
+        return stokes
+    
+    def _get_light(self, time_index: int, output_index: int) -> Light:
+        """Helper function to create the light object of one output at one time.
+        
+        :param time_index: Index of the time of the light state
+        :type time_index: int
+        :param output_index: Index of the output port of the light state
+        :type output_index: int
+        :return: The light state
+        :rtype: Light
+        """
+        
+        wavelengths = self._wavelengths[time_index]
+        if self._coherency is not None:
+            return IncoherentLight.from_stokes(stokes=Stokes(*self._get_stokes_array(output_index, time_index)),
+                                               wavelength=float(wavelengths))
+        
+        jones = self._jones[time_index, output_index]
+        if self._coherence == Coherence.COHERENT:
+            return CoherentLight.from_jones(eh=jones[0], ev=jones[1], wavelength=float(wavelengths))
+        
+        return IncoherentLight(coherent_lights=[
+            CoherentLight.from_jones(eh=source_jones[0], ev=source_jones[1], wavelength=float(wavelength))
+            for source_jones, wavelength in zip(jones, wavelengths)])
+    
+    def _get_output_index(self, port_ref: PortRef) -> int:
+        """Helper function to get the index of the specified output port in the stored arrays.
+        
+        :param port_ref: Port reference that specifies output port
+        :type port_ref: PortRef
+        :return: The index of the output port
+        :rtype: int
+        """
+        
+        from ..circuit.circuit_exceptions import MissingPortException
+        
         output_port = self._get_output_port(port_ref)
-        light_states = self._port_to_output_lights[output_port]
-        eh = np.array([light.e[0] for light in light_states])
-        ev = np.array([light.e[1] for light in light_states])
-        return eh, ev
+        if output_port not in self._output_port_to_index:
+            raise MissingPortException(output_port, f"{port_ref} is not an output of the simulation")
+        return self._output_port_to_index[output_port]
     
     def _get_output_port(self, port_ref: PortRef) -> Port:
         """Helper function to get specified output port from port reference.
@@ -211,13 +386,13 @@ class SimulationResult:
         """
         
         from ..circuit.circuit_exceptions import MissingAliasException, MissingComponentException
-
+        
         component_name, port_name = port_ref
         
         if component_name not in self._photonic_circuit._names_to_components:
             raise MissingComponentException(component_name)
         component = self._photonic_circuit._names_to_components[component_name]
-
+        
         if isinstance(port_name, int):
             port = component._ports[port_name - 1]
         elif isinstance(port_name, str):
@@ -225,4 +400,35 @@ class SimulationResult:
                 port = component._port_aliases[port_name]
             else:
                 raise MissingAliasException(port_name)
-        return port
\ No newline at end of file
+        return port
+
+class _OutputLights(Sequence):
+    """Read-only sequence of the light states at one output port of a simulation result. The light
+    objects are created from the result's arrays when they are indexed.
+    
+    :param simulation_result: The simulation result that stores the light states
+    :type simulation_result: SimulationResult
+    :param output_index: Index of the output port in the simulation result
+    :type output_index: int
+    """
+    
+    __slots__ = "_simulation_result", "_output_index"
+    
+    def __init__(self, simulation_result: SimulationResult, output_index: int):
+        self._simulation_result = simulation_result
+        self._output_index = output_index
+    
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(output_port="
+                f"{self._simulation_result._output_ports[self._output_index]!r}, states={len(self)})")
+    
+    def __len__(self):
+        return len(self._simulation_result)
+    
+    def __getitem__(self, index: int | slice) -> Light | MutableSequence[Light]:
+        if isinstance(index, slice):
+            return [self[time_index] for time_index in range(len(self))[index]]
+        
+        # normalizes negative indices and raises IndexError when out of range
+        time_index = range(len(self))[index]
+        return self._simulation_result._get_light(time_index, self._output_index)
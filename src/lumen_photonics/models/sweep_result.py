@@ -0,0 +1,161 @@
+from collections.abc import Mapping
+from typing import MutableSequence
+import numpy as np
+from numpy.typing import NDArray
+from typing import TYPE_CHECKING
+from ..models.port import Port
+from ..circuit.component import PortRef
+
+# avoids circular import errors from type hinting
+if TYPE_CHECKING:
+    from ..circuit.photonic_circuit import PhotonicCircuit
+
+class SweepResult:
+    """The external S matrices of a circuit on a grid of component parameter values crossed with
+    wavelengths. The S matrices have shape (*grid_shape, num_wavelengths, 2*num_outputs,
+    2*num_inputs), with one grid axis per swept parameter in the order that they were swept, and
+    the H and V states of every port interleaved.
+
+    Parameters are labeled 'component_name.parameter_name'.
+
+    :param photonic_circuit: The photonic circuit that was swept
+    :type photonic_circuit: PhotonicCircuit
+    :param parameters: The labels of the swept parameters, in the order of the grid axes
+    :type parameters: MutableSequence[str]
+    :param values: The values of every swept parameter along its axis
+    :type values: MutableSequence[MutableSequence]
+    :param input_ports: The circuit inputs, in the order of the input axis
+    :type input_ports: MutableSequence[Port]
+    :param output_ports: The circuit outputs, in the order of the output axis
+    :type output_ports: MutableSequence[Port]
+    :param wavelengths: The wavelengths that the circuit was simulated at
+    :type wavelengths: NDArray[np.float64]
+    :param s_parameters: The external S matrices of the circuit at every point of the grid
+    :type s_parameters: NDArray[np.complex128]
+    """
+
+    __slots__ = "_photonic_circuit", "_parameters", "_parameter_to_axis", "_values", "_input_ports", \
+        "_output_ports", "_output_port_to_index", "_wavelengths", "_s_parameters"
+
+    def __init__(self, photonic_circuit: "PhotonicCircuit", *, parameters: MutableSequence[str],
+                 values: MutableSequence[MutableSequence], input_ports: MutableSequence[Port],
+                 output_ports: MutableSequence[Port], wavelengths: NDArray[np.float64],
+                 s_parameters: NDArray[np.complex128]):
+        self._photonic_circuit = photonic_circuit
+        self._parameters = list(parameters)
+        self._parameter_to_axis = {parameter: axis for axis, parameter in enumerate(self._parameters)}
+        self._values = [list(axis_values) for axis_values in values]
+        self._input_ports = list(input_ports)
+        self._output_ports = list(output_ports)
+        self._output_port_to_index = {port: index for index, port in enumerate(self._output_ports)}
+        self._wavelengths = wavelengths
+        self._s_parameters = s_parameters
+
+    def __str__(self):
+        grid_summary = "\n".join(f"    - {parameter}: {len(axis_values)} values"
+                                 for parameter, axis_values in zip(self._parameters, self._values))
+
+        return (
+            f"--- Sweep Results ---\n"
+            f"  Grid Points: {int(np.prod(self.grid_shape))}\n"
+            f"  Wavelengths: {len(self._wavelengths)}\n"
+            f"  Swept Parameters:\n{grid_summary or '    (none)'}"
+        )
+
+    def __repr__(self):
+        return (f"SweepResult(parameters={self._parameters!r}, "
+                f"grid_shape={self.grid_shape!r})")
+
+    @property
+    def photonic_circuit(self):
+        return self._photonic_circuit
+
+    @property
+    def parameters(self) -> MutableSequence[str]:
+        return self._parameters
+
+    @property
+    def values(self) -> MutableSequence[MutableSequence]:
+        return self._values
+
+    @property
+    def dims(self) -> tuple[str, ...]:
+        return (*self._parameters, "wavelength", "output_state", "input_state")
+
+    @property
+    def grid_shape(self) -> tuple[int, ...]:
+        return self._s_parameters.shape[:len(self._parameters)]
+
+    @property
+    def input_ports(self) -> MutableSequence[Port]:
+        return self._input_ports
+
+    @property
+    def output_ports(self) -> MutableSequence[Port]:
+        return self._output_ports
+
+    @property
+    def wavelengths(self) -> NDArray[np.float64]:
+        return self._wavelengths
+
+    @property
+    def s_parameters(self) -> NDArray[np.complex128]:
+        return self._s_parameters
+
+    def get_axis(self, parameter: str) -> int:
+        """Returns the grid axis of a swept parameter.
+
+        :param parameter: The label of the parameter, 'component_name.parameter_name'
+        :type parameter: str
+        :raises KeyError: The parameter was not swept
+        :return: The axis of the parameter
+        :rtype: int
+        """
+
+        if parameter not in self._parameter_to_axis:
+            raise KeyError(f"{parameter} was not swept. Swept parameters: {', '.join(self._parameters)}")
+        return self._parameter_to_axis[parameter]
+
+    def select(self, values: Mapping[str, object]) -> NDArray[np.complex128]:
+        """Returns the S matrices at given values of some of the swept parameters, as a view of the
+        stored array. The axes of the selected parameters are dropped.
+
+        :param values: The value of every selected parameter, keyed by its label
+        :type values: Mapping[str, object]
+        :raises KeyError: A parameter was not swept
+        :raises ValueError: A parameter was not swept over the value
+        :return: The S matrices, with the axes of every parameter that is not selected
+        :rtype: NDArray[np.complex128]
+        """
+
+        index = [slice(None)] * self._s_parameters.ndim
+        for parameter, value in values.items():
+            axis = self.get_axis(parameter)
+            if value not in self._values[axis]:
+                raise ValueError(f"{parameter} was not swept over {value!r}")
+            index[axis] = self._values[axis].index(value)
+        return self._s_parameters[tuple(index)]
+
+    def get_power(self, port_ref: PortRef, input_jones: NDArray[np.complex128]) -> NDArray[np.float64]:
+        """Returns the power at an output port at every point of the grid, for coherent light with
+        the same wavelength at every input.
+
+        :param port_ref: The port reference that specifies the output port
+        :type port_ref: PortRef
+        :param input_jones: The Jones vectors of the light at every input, in the order of the
+            input ports, with shape (num_inputs, 2)
+        :type input_jones: NDArray[np.complex128]
+        :return: The powers, with shape (*grid_shape, num_wavelengths)
+        :rtype: NDArray[np.float64]
+        """
+
+        from ..circuit.circuit_exceptions import MissingPortException
+
+        output_port = self._photonic_circuit._get_port_from_ref(port_ref)
+        if output_port not in self._output_port_to_index:
+            raise MissingPortException(output_port, f"{port_ref} is not an output of the sweep")
+        output_states = slice(2*self._output_port_to_index[output_port],
+                              2*self._output_port_to_index[output_port] + 2)
+
+        output_jones = self._s_parameters[..., output_states, :] @ np.asarray(input_jones, dtype=complex).ravel()
+        return np.sum(np.abs(output_jones)**2, axis=-1)
@@ -1,4 +1,15 @@
+from .compiled_circuit import CompiledCircuit
 from .simulation import Simulation, MatrixSolver
-from .simulation_exceptions import EmptyInterfaceException
+from .solver_options import SolverOptions, SolverChoice
+from .solver_profile import SolverProfile
+from .simulation_stats import SimulationStats, SimulationPhase, SimulationEvent, PhaseStats
+from .incremental_simulation import IncrementalSimulation
+from .sensitivity_analysis import SensitivityAnalysis
+from .monte_carlo_analysis import MonteCarloAnalysis, NormalVariation, UniformVariation
+from .simulation_exceptions import EmptyInterfaceException, ConvergenceException, \
+    InapplicableSolverException
 
-__all__ = ['Simulation', 'MatrixSolver', 'EmptyInterfaceException']
\ No newline at end of file
+__all__ = ['CompiledCircuit', 'Simulation', 'MatrixSolver', 'SolverOptions', 'SolverChoice', 'SolverProfile',
+           'SimulationStats', 'SimulationPhase', 'SimulationEvent', 'PhaseStats',
+           'IncrementalSimulation', 'SensitivityAnalysis', 'MonteCarloAnalysis', 'NormalVariation', 'UniformVariation',
+           'EmptyInterfaceException', 'ConvergenceException', 'InapplicableSolverException']
\ No newline at end of file
@@ -0,0 +1,1023 @@
+from collections import deque
+from collections.abc import MutableMapping, MutableSequence
+from dataclasses import dataclass
+from typing import Annotated, Literal, Optional
+import numpy as np
+from numpy.typing import NDArray
+from scipy.sparse import block_diag, coo_matrix, csc_matrix, csr_matrix, eye
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+from ..circuit.component import Component
+from ..circuit.components.condensed_component import _CondensedComponent
+from ..circuit.photonic_circuit import PhotonicCircuit
+from ..models.port import Port, PortConnection, PortType
+
+@dataclass(frozen=True, slots=True)
+class _FeedForwardStep:
+    """One component of a feed-forward propagation, in topological order. A component's ports
+    list its inputs before its outputs, so its S matrix splits into input and output blocks at
+    the amount of input states.
+
+    :param s_matrix_entries: Positions of the component's S matrix entries in the concatenated
+        S matrix data of the plan
+    :type s_matrix_entries: slice
+    :param num_states: Amount of states (two per port) of the component
+    :type num_states: int
+    :param num_input_states: Amount of input states (two per input port) of the component
+    :type num_input_states: int
+    :param source_rows: Rows of the propagated wave array that feed each of the component's
+        input states
+    :type source_rows: NDArray[np.int64]
+    :param output_states: Global indices of the component's output states
+    :type output_states: slice
+    """
+
+    s_matrix_entries: slice
+    num_states: int
+    num_input_states: int
+    source_rows: NDArray[np.int64]
+    output_states: slice
+
+@dataclass(frozen=True, slots=True)
+class _BlockAssembly:
+    """Fills one block of the global system (I - SC), or of its input matrix S[:, inputs],
+    straight from the concatenated entries of the component S matrices. Each entry of the block
+    is one component S entry, an entry of the identity, or zero, and the structure never
+    changes, so only the block's data is refilled for every wavelength.
+
+    :param shape: Shape of the block
+    :type shape: tuple[int, int]
+    :param format: Format of the block, 'dense', or 'csc' or 'csr' for sparse blocks
+    :type format: Literal['dense', 'csc', 'csr']
+    :param sign: Sign of the S entries, -1 in (I - SC) and 1 in the input matrix
+    :type sign: int
+    :param sources: Positions of the block's S entries in the concatenated S matrix data
+    :type sources: NDArray[np.int64]
+    :param targets: Positions of the same entries in the block's data
+    :type targets: NDArray[np.int64]
+    :param identity_targets: Positions of the identity's entries in the block's data
+    :type identity_targets: NDArray[np.int64]
+    :param indptr: Index pointer of a sparse block's compressed pattern, defaults to None
+    :type indptr: Optional[NDArray[np.int32]]
+    :param indices: Indices of a sparse block's compressed pattern, defaults to None
+    :type indices: Optional[NDArray[np.int32]]
+    """
+
+    shape: tuple[int, int]
+    format: Literal["dense", "csc", "csr"]
+    sign: int
+    sources: NDArray[np.int64]
+    targets: NDArray[np.int64]
+    identity_targets: NDArray[np.int64]
+    indptr: Optional[NDArray[np.int32]] = None
+    indices: Optional[NDArray[np.int32]] = None
+
+    def assemble(self, s_matrix_data: NDArray[np.complex128]) -> NDArray[np.complex128] | csc_matrix | csr_matrix:
+        """Fills the block from the S matrix entries of every component.
+
+        :param s_matrix_data: The entries of every component's modified S matrix, concatenated
+            in plan order
+        :type s_matrix_data: NDArray[np.complex128]
+        :return: The block
+        :rtype: NDArray[np.complex128] | csc_matrix | csr_matrix
+        """
+
+        if self.format == "dense":
+            data = np.zeros(self.shape[0]*self.shape[1], dtype=complex)
+        else:
+            data = np.zeros(len(self.indices), dtype=complex)
+
+        # every target holds one S entry, which can land on the identity's diagonal
+        data[self.identity_targets] = 1
+        data[self.targets] += self.sign*s_matrix_data[self.sources]
+
+        if self.format == "dense":
+            return data.reshape(self.shape)
+        # the pattern is copied, so that the block can be modified without changing the plan
+        sparse_matrix = csc_matrix if self.format == "csc" else csr_matrix
+        return sparse_matrix((data, self.indices.copy(), self.indptr.copy()), shape=self.shape)
+
+@dataclass(frozen=True, slots=True)
+class _SystemAssembly:
+    """Fills the blocks of the global system (I - SC) y = S a_ext, partitioned into the
+    eliminated states R and the kept output states K, from the component S matrices.
+
+    :param M_RR: Block of (I - SC) between the eliminated states
+    :type M_RR: _BlockAssembly
+    :param M_RK: Block of (I - SC) from the kept states to the eliminated states
+    :type M_RK: _BlockAssembly
+    :param M_KR: Block of (I - SC) from the eliminated states to the kept states
+    :type M_KR: _BlockAssembly
+    :param M_KK: Block of (I - SC) between the kept states
+    :type M_KK: _BlockAssembly
+    :param B_R: Rows of the input matrix S[:, inputs] of the eliminated states
+    :type B_R: _BlockAssembly
+    :param B_K: Rows of the input matrix S[:, inputs] of the kept states
+    :type B_K: _BlockAssembly
+    """
+
+    M_RR: _BlockAssembly
+    M_RK: _BlockAssembly
+    M_KR: _BlockAssembly
+    M_KK: _BlockAssembly
+    B_R: _BlockAssembly
+    B_K: _BlockAssembly
+
+class CompiledCircuit:
+    """Simulation plan compiled once from a photonic circuit. Holds everything about the circuit
+    that only depends on its topology: the components that are simulated after sequential chains
+    are condensed, the port indexing, the connectivity matrix, the sparsity pattern of the
+    global system (I - SC), the order in which its states are eliminated and the index maps that
+    fill the blocks of the global system from the component S matrices. The plan refers to
+    the circuit's own components, so changes to component parameters are picked up without
+    recompiling. Any change to the topology makes the plan stale.
+
+    The plan is also split into partitions, one per connected part of the circuit that links
+    circuit inputs to circuit outputs. Each partition is a plan of its own and is solved
+    independently. Pickled plans keep only the numeric data needed to solve them, so that
+    partitions can be sent to worker processes.
+
+    :param photonic_circuit: The photonic circuit that the plan is compiled from
+    :type photonic_circuit: PhotonicCircuit
+    """
+
+    # amount of chain components whose S matrices are stacked for one tree reduction
+    _CHAIN_SEGMENT_SIZE = 64
+
+    # 4x4 complex ndarray type used for type hinting
+    SMatrix4x4 = Annotated[NDArray[np.complex128], Literal[4, 4]]
+
+    __slots__ = ("_photonic_circuit", "_topology_version", "_components", "_component_ports",
+                 "_sequential_chains", "_condensed_components", "_port_to_index", "_num_ports",
+                 "_input_ports", "_output_ports", "_input_indices", "_output_indices",
+                 "_connectivity_matrix", "_sparsity_pattern", "_num_eliminated",
+                 "_elimination_order", "_feed_forward_steps", "_component_indices",
+                 "_external_input_states", "_external_output_states", "_partitions",
+                 "_system_assembly", "_reflection_entries", "_cross_polarization_entries",
+                 "_polarization_plans")
+
+    # slots holding numbers and arrays only, which are kept when the plan is pickled
+    _NUMERIC_SLOTS = ("_topology_version", "_num_ports", "_input_indices", "_output_indices",
+                      "_connectivity_matrix", "_sparsity_pattern", "_num_eliminated",
+                      "_elimination_order", "_feed_forward_steps", "_component_indices",
+                      "_external_input_states", "_external_output_states", "_system_assembly",
+                      "_reflection_entries", "_cross_polarization_entries", "_polarization_plans")
+
+    def __init__(self, photonic_circuit: PhotonicCircuit):
+        self._photonic_circuit = photonic_circuit
+        self._topology_version = photonic_circuit._topology_version
+
+        self._sequential_chains = self._condense_circuit()
+
+        # every sequential chain is replaced by one condensed component, which evaluates the chain
+        # lazily for the wavelengths it is asked for. The condensed component's ports are the
+        # input of the first and the output of the last component
+        self._condensed_components = []
+        chain_components = set()
+        for sequential_chain in self._sequential_chains:
+            self._condensed_components.append(
+                _CondensedComponent(sequential_chain, self._get_condensed_s_matrix_batch))
+            chain_components.update(sequential_chain)
+
+        self._components: MutableSequence[Component] = []
+        self._component_ports: MutableSequence[MutableSequence[Port]] = []
+        for component in photonic_circuit.components:
+            if component not in chain_components and not self._is_disconnected(component):
+                self._components.append(component)
+                self._component_ports.append(component._ports)
+        for sequential_chain, condensed_component in zip(self._sequential_chains,
+                                                         self._condensed_components):
+            self._components.append(condensed_component)
+            self._component_ports.append([sequential_chain[0]._ports[0], sequential_chain[-1]._ports[1]])
+
+        # the partitions are split off before the full plan is indexed, so that the full plan's
+        # elimination order is put together from theirs
+        self._input_ports = list(photonic_circuit._circuit_inputs)
+        self._output_ports = list(photonic_circuit._circuit_outputs)
+        self._partitions = self._get_partitions()
+        self._index_ports(self._input_ports, self._output_ports)
+
+        # the full plan covers every component and every external state
+        self._component_indices = np.arange(len(self._components))
+        self._external_input_states = np.arange(len(self._input_indices))
+        self._external_output_states = np.arange(len(self._output_indices))
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self._NUMERIC_SLOTS}
+
+    def __setstate__(self, state):
+        for slot in self.__slots__:
+            setattr(self, slot, state.get(slot))
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(components={len(self._components)}, "
+                f"ports={self._num_ports}, chains={len(self._sequential_chains)})")
+
+    def __str__(self):
+        return (
+            f"--- Compiled Circuit ---\n"
+            f"  Components:        {len(self._components)} "
+            f"({len(self._sequential_chains)} condensed chains)\n"
+            f"  Ports:             {self._num_ports}\n"
+            f"  Inputs / Outputs:  {len(self._input_ports)} / {len(self._output_ports)}\n"
+            f"  Partitions:        {len(self._partitions)}\n"
+            f"  Nonzeros (I - SC): {self._sparsity_pattern.nnz}"
+        )
+
+    @property
+    def photonic_circuit(self) -> PhotonicCircuit:
+        return self._photonic_circuit
+
+    @property
+    def components(self) -> MutableSequence[Component]:
+        return self._components
+
+    @property
+    def sequential_chains(self) -> MutableSequence[MutableSequence[Component]]:
+        return self._sequential_chains
+
+    @property
+    def num_ports(self) -> int:
+        return self._num_ports
+
+    @property
+    def port_to_index(self) -> MutableMapping[Port, int]:
+        return self._port_to_index
+
+    @property
+    def connectivity_matrix(self) -> csc_matrix:
+        return self._connectivity_matrix
+
+    @property
+    def sparsity_pattern(self) -> csc_matrix:
+        return self._sparsity_pattern
+
+    @property
+    def is_feed_forward(self) -> bool:
+        return all(partition._feed_forward_steps is not None for partition in self._partitions)
+
+    @property
+    def partitions(self) -> MutableSequence["CompiledCircuit"]:
+        return self._partitions
+
+    def is_stale(self) -> bool:
+        """Checks if the circuit's topology changed since the plan was compiled.
+
+        :return: Whether the plan needs to be recompiled
+        :rtype: bool
+        """
+
+        return self._topology_version != self._photonic_circuit._topology_version
+
+    def refresh(self) -> None:
+        """Clears the S matrices memoized by the condensed components, so that changes to the
+        parameters of components in sequential chains are picked up by the next evaluation.
+        """
+
+        for condensed_component in self._condensed_components:
+            condensed_component.clear_cache()
+
+    def _get_plan_indices(self) -> MutableMapping[Component, int]:
+        """Maps every simulated component of the circuit to the index of the plan component that
+        simulates it, which is the condensed component for components of a sequential chain.
+        Helper function.
+
+        :return: Dictionary mapping each simulated component to its index in the plan
+        :rtype: MutableMapping[Component, int]
+        """
+
+        plan_indices = {}
+        for component_index, component in enumerate(self._components):
+            if isinstance(component, _CondensedComponent):
+                for chain_component in component._sequential_chain:
+                    plan_indices[chain_component] = component_index
+            else:
+                plan_indices[component] = component_index
+        return plan_indices
+
+    def _index_ports(self, input_ports: MutableSequence[Port], output_ports: MutableSequence[Port]) -> None:
+        """Indexes the ports of the plan's components and derives everything about the global
+        system that depends on the indexing. Helper function.
+
+        :param input_ports: The circuit inputs that belong to the plan
+        :type input_ports: MutableSequence[Port]
+        :param output_ports: The circuit outputs that belong to the plan
+        :type output_ports: MutableSequence[Port]
+        """
+
+        # get port-index maps and number of ports
+        self._port_to_index: MutableMapping[Port, int] = {}
+        for ports in self._component_ports:
+            for port in ports:
+                self._port_to_index[port] = len(self._port_to_index)
+        self._num_ports = len(self._port_to_index)
+
+        self._input_ports = input_ports
+        self._output_ports = output_ports
+        self._input_indices = self._get_mode_indices(self._input_ports)
+        self._output_indices = self._get_mode_indices(self._output_ports)
+
+        self._connectivity_matrix = self._get_connectivity_matrix()
+
+        # every entry of a component's S matrix may be nonzero, so S is treated as fully dense
+        # within each component's block
+        structural_s_matrix = block_diag([np.ones((2*len(ports), 2*len(ports)))
+                                          for ports in self._component_ports], format="csr")
+        self._sparsity_pattern = csc_matrix(
+            (eye(2*self._num_ports) + structural_s_matrix @ self._connectivity_matrix) != 0)
+
+        # the component S matrices are concatenated into one data vector in plan order, whose
+        # entries couple the global states of the same rows and columns of block_diag(S)
+        entry_rows, entry_cols = self._get_entry_states()
+        self._feed_forward_steps = self._get_feed_forward_steps()
+        self._compile_system(np.arange(len(entry_rows)), entry_rows, entry_cols)
+        self._cross_polarization_entries = np.flatnonzero(entry_rows % 2 != entry_cols % 2)
+
+        self._reflection_entries = self._get_reflection_entries()
+        self._polarization_plans = self._get_polarization_plans(entry_rows, entry_cols)
+
+    def _get_entry_states(self) -> tuple[NDArray[np.int64], NDArray[np.int64]]:
+        """Gets the global states coupled by every entry of the concatenated component S
+        matrices. Helper function.
+
+        :return: The row state and the column state of every entry
+        :rtype: tuple[NDArray[np.int64], NDArray[np.int64]]
+        """
+
+        entry_rows = []
+        entry_cols = []
+        for ports in self._component_ports:
+            # a component's ports are indexed consecutively, so its states are contiguous
+            num_states = 2*len(ports)
+            first_state = 2*self._port_to_index[ports[0]]
+            rows, cols = np.divmod(np.arange(num_states*num_states), num_states)
+            entry_rows.append(first_state + rows)
+            entry_cols.append(first_state + cols)
+        return np.concatenate(entry_rows), np.concatenate(entry_cols)
+
+    def _compile_system(self, entry_sources: NDArray[np.int64], entry_rows: NDArray[np.int64],
+                        entry_cols: NDArray[np.int64], reduces_fill: bool = True) -> None:
+        """Orders the states of the global system and builds the index maps that fill its
+        blocks. Every state other than the circuit outputs' is eliminated when the global system
+        is reduced to the external ports, and the eliminated states are ordered first. Helper
+        function.
+
+        :param entry_sources: Positions of the system's S entries in the concatenated S matrix data
+        :type entry_sources: NDArray[np.int64]
+        :param entry_rows: The row state of every entry
+        :type entry_rows: NDArray[np.int64]
+        :param entry_cols: The column state of every entry
+        :type entry_cols: NDArray[np.int64]
+        :param reduces_fill: Whether the eliminated states are ordered to reduce the fill-in of a
+            sparse factorization, defaults to True
+        :type reduces_fill: bool
+        """
+
+        num_states = self._connectivity_matrix.shape[0]
+        is_kept = np.zeros(num_states, dtype=bool)
+        is_kept[self._output_indices] = True
+        eliminated_indices = np.flatnonzero(~is_kept)
+        if reduces_fill:
+            eliminated_indices = self._get_fill_reducing_order(eliminated_indices)
+        self._num_eliminated = len(eliminated_indices)
+        self._elimination_order = np.concatenate((eliminated_indices, self._output_indices))
+
+        self._system_assembly = self._get_system_assembly(entry_sources, entry_rows, entry_cols)
+
+    def _get_fill_reducing_order(self, eliminated_indices: NDArray[np.int64]) -> NDArray[np.int64]:
+        """Orders the eliminated states so that factorizing their block of (I - SC) causes
+        little fill-in. The reverse Cuthill-McKee ordering narrows the band of the block, and only
+        depends on its sparsity pattern, so it is computed once here instead of in every
+        factorization. Only blocks that the default thresholds factorize sparsely are ordered.
+        Helper function.
+
+        :param eliminated_indices: The eliminated states
+        :type eliminated_indices: NDArray[np.int64]
+        :return: The eliminated states in fill-reducing order
+        :rtype: NDArray[np.int64]
+        """
+
+        from .simulation import Simulation
+
+        # partitions are disconnected from each other, so a plan that is split into them is
+        # ordered one partition after the other. States of parts that are not partitions are
+        # never solved, and are left in place at the end
+        if self._partitions != [self]:
+            partition_orders = []
+            for partition in self._partitions:
+                port_indices = np.array([self._port_to_index[port] for port in partition._port_to_index],
+                                        dtype=np.int64)
+                partition_eliminated = partition._elimination_order[:partition._num_eliminated]
+                partition_orders.append(2*port_indices[partition_eliminated // 2] + partition_eliminated % 2)
+            partition_order = np.concatenate(partition_orders + [np.empty(0, dtype=np.int64)])
+            return np.concatenate((partition_order, np.setdiff1d(eliminated_indices, partition_order)))
+
+        # feed-forward plans are propagated without a factorization. Smaller blocks are
+        # factorized densely, and larger ones are solved iteratively with the preconditioner's
+        # own ordering
+        num_eliminated = len(eliminated_indices)
+        if self._feed_forward_steps is not None or num_eliminated < Simulation._DENSE_DOMAIN_SIZE \
+                or num_eliminated > Simulation._ITERATIVE_DOMAIN_SIZE:
+            return eliminated_indices
+
+        block = self._sparsity_pattern[eliminated_indices][:, eliminated_indices]
+        order = reverse_cuthill_mckee(csr_matrix(block + block.T), symmetric_mode=True)
+        return eliminated_indices[order]
+
+    def _get_system_assembly(self, entry_sources: NDArray[np.int64], entry_rows: NDArray[np.int64],
+                             entry_cols: NDArray[np.int64]) -> _SystemAssembly:
+        """Maps the S entries of the global system into the blocks of (I - SC) and of the input
+        matrix S[:, inputs], in elimination order. Column c of SC is column b of S when C[b, c] is
+        1, so every S entry of a connected column lands in one entry of (I - SC), and every S
+        entry of a circuit input's column lands in one entry of the input matrix. Helper
+        function.
+
+        :param entry_sources: Positions of the system's S entries in the concatenated S matrix data
+        :type entry_sources: NDArray[np.int64]
+        :param entry_rows: The row state of every entry
+        :type entry_rows: NDArray[np.int64]
+        :param entry_cols: The column state of every entry
+        :type entry_cols: NDArray[np.int64]
+        :return: The index maps of every block
+        :rtype: _SystemAssembly
+        """
+
+        num_states = len(self._elimination_order)
+        num_eliminated = self._num_eliminated
+        num_kept = num_states - num_eliminated
+        num_inputs = len(self._input_indices)
+
+        positions = np.empty(num_states, dtype=np.int64)
+        positions[self._elimination_order] = np.arange(num_states)
+        connectivity = coo_matrix(self._connectivity_matrix)
+        partners = np.full(num_states, -1, dtype=np.int64)
+        partners[connectivity.row] = connectivity.col
+        input_columns = np.full(num_states, -1, dtype=np.int64)
+        input_columns[self._input_indices] = np.arange(num_inputs)
+
+        is_coupled = partners[entry_cols] >= 0
+        coupled_rows = positions[entry_rows[is_coupled]]
+        coupled_cols = positions[partners[entry_cols[is_coupled]]]
+        coupled_sources = entry_sources[is_coupled]
+
+        is_excited = input_columns[entry_cols] >= 0
+        excited_rows = positions[entry_rows[is_excited]]
+        excited_cols = input_columns[entry_cols[is_excited]]
+        excited_sources = entry_sources[is_excited]
+
+        def get_block(rows, cols, sources, row_start, col_start, shape, format, sign, has_identity):
+            is_in_block = (rows >= row_start) & (rows < row_start + shape[0]) \
+                & (cols >= col_start) & (cols < col_start + shape[1])
+            identity = np.arange(shape[0]) if has_identity else np.empty(0, dtype=np.int64)
+            return self._get_block_assembly(shape, format, sign, sources[is_in_block],
+                                            rows[is_in_block] - row_start, cols[is_in_block] - col_start,
+                                            identity)
+
+        return _SystemAssembly(
+            M_RR=get_block(coupled_rows, coupled_cols, coupled_sources, 0, 0,
+                           (num_eliminated, num_eliminated), "csc", -1, True),
+            M_RK=get_block(coupled_rows, coupled_cols, coupled_sources, 0, num_eliminated,
+                           (num_eliminated, num_kept), "dense", -1, False),
+            M_KR=get_block(coupled_rows, coupled_cols, coupled_sources, num_eliminated, 0,
+                           (num_kept, num_eliminated), "csr", -1, False),
+            M_KK=get_block(coupled_rows, coupled_cols, coupled_sources, num_eliminated, num_eliminated,
+                           (num_kept, num_kept), "dense", -1, True),
+            B_R=get_block(excited_rows, excited_cols, excited_sources, 0, 0,
+                          (num_eliminated, num_inputs), "dense", 1, False),
+            B_K=get_block(excited_rows, excited_cols, excited_sources, num_eliminated, 0,
+                          (num_kept, num_inputs), "dense", 1, False))
+
+    def _get_block_assembly(self, shape: tuple[int, int], format: Literal["dense", "csc", "csr"],
+                            sign: int, sources: NDArray[np.int64], rows: NDArray[np.int64],
+                            cols: NDArray[np.int64], identity: NDArray[np.int64]) -> _BlockAssembly:
+        """Builds the index maps of one block, and its compressed pattern if it is sparse.
+        Helper function.
+
+        :param shape: Shape of the block
+        :type shape: tuple[int, int]
+        :param format: Format of the block
+        :type format: Literal['dense', 'csc', 'csr']
+        :param sign: Sign of the S entries in the block
+        :type sign: int
+        :param sources: Positions of the block's S entries in the concatenated S matrix data
+        :type sources: NDArray[np.int64]
+        :param rows: Row of every S entry in the block
+        :type rows: NDArray[np.int64]
+        :param cols: Column of every S entry in the block
+        :type cols: NDArray[np.int64]
+        :param identity: Diagonal positions of the identity's entries in the block
+        :type identity: NDArray[np.int64]
+        :return: The index maps of the block
+        :rtype: _BlockAssembly
+        """
+
+        if format == "dense":
+            return _BlockAssembly(shape=shape, format=format, sign=sign, sources=sources,
+                                  targets=rows*shape[1] + cols, identity_targets=identity*shape[1] + identity)
+
+        # entries are sorted along the compressed axis, then along the other axis
+        major, minor = (cols, rows) if format == "csc" else (rows, cols)
+        num_major, num_minor = (shape[1], shape[0]) if format == "csc" else shape
+        keys = np.concatenate((major*num_minor + minor, identity*num_minor + identity))
+        pattern_keys, data_positions = np.unique(keys, return_inverse=True)
+        indptr = np.searchsorted(pattern_keys // num_minor, np.arange(num_major + 1))
+
+        return _BlockAssembly(shape=shape, format=format, sign=sign, sources=sources,
+                              targets=data_positions[:len(sources)],
+                              identity_targets=data_positions[len(sources):],
+                              indptr=indptr.astype(np.int32), indices=(pattern_keys % num_minor).astype(np.int32))
+
+    def _get_reflection_entries(self) -> Optional[NDArray[np.int64]]:
+        """Gets the S matrix entries that send light entering a component's inputs back out of
+        its inputs, or light entering its outputs back out of its outputs. Helper function.
+
+        :return: Positions of the entries in the concatenated S matrix data, or None if the
+            circuit is not feed-forward
+        :rtype: Optional[NDArray[np.int64]]
+        """
+
+        if self._feed_forward_steps is None:
+            return None
+
+        reflection_entries = []
+        for step in self._feed_forward_steps:
+            rows, cols = np.divmod(np.arange(step.num_states*step.num_states), step.num_states)
+            is_reflection = (rows < step.num_input_states) == (cols < step.num_input_states)
+            reflection_entries.append(step.s_matrix_entries.start + np.flatnonzero(is_reflection))
+        return np.concatenate(reflection_entries)
+
+    def _get_polarization_plans(self, entry_rows: NDArray[np.int64],
+                                entry_cols: NDArray[np.int64]) -> tuple["CompiledCircuit", "CompiledCircuit"]:
+        """Gets the plans of the global systems of the H and of the V polarization, which have
+        one state per port. When no component couples H to V, the H and V states of the global
+        system form two independent systems with the same connectivity, each half the size.
+        Helper function.
+
+        :param entry_rows: The row state of every entry of the concatenated S matrix data
+        :type entry_rows: NDArray[np.int64]
+        :param entry_cols: The column state of every entry of the concatenated S matrix data
+        :type entry_cols: NDArray[np.int64]
+        :return: The plans of the H and of the V system
+        :rtype: tuple[CompiledCircuit, CompiledCircuit]
+        """
+
+        polarization_plans = []
+
+        # the H states are at even indices and the V states at odd ones
+        for mode in (0, 1):
+            polarization_plan = CompiledCircuit.__new__(CompiledCircuit)
+            polarization_plan.__setstate__({
+                "_topology_version": self._topology_version,
+                "_num_ports": self._num_ports,
+                "_input_indices": self._input_indices[mode::2] // 2,
+                "_output_indices": self._output_indices[mode::2] // 2,
+                "_connectivity_matrix": csc_matrix(self._connectivity_matrix[mode::2, mode::2]),
+                "_sparsity_pattern": csc_matrix(self._sparsity_pattern[mode::2, mode::2]),
+            })
+
+            is_mode_entry = (entry_rows % 2 == mode) & (entry_cols % 2 == mode)
+            # the H and V systems are only ever factorized densely, so their order does not matter
+            polarization_plan._compile_system(np.flatnonzero(is_mode_entry), entry_rows[is_mode_entry] // 2,
+                                              entry_cols[is_mode_entry] // 2, reduces_fill=False)
+            polarization_plans.append(polarization_plan)
+        return tuple(polarization_plans)
+
+    def _get_partitions(self) -> MutableSequence["CompiledCircuit"]:
+        """Splits the plan into the connected parts of the circuit. Parts without circuit inputs
+        only output zeros and parts without circuit outputs cannot be observed, so neither is
+        kept. Helper function.
+
+        :return: One plan per connected part that links circuit inputs to circuit outputs
+        :rtype: MutableSequence[CompiledCircuit]
+        """
+
+        port_to_component_index = {port: component_index
+                                   for component_index, ports in enumerate(self._component_ports)
+                                   for port in ports}
+
+        # union-find over the components, joined by every port connection
+        parents = list(range(len(self._components)))
+        def find_root(component_index: int) -> int:
+            while parents[component_index] != component_index:
+                parents[component_index] = parents[parents[component_index]]
+                component_index = parents[component_index]
+            return component_index
+
+        for component_index, ports in enumerate(self._component_ports):
+            for port in ports:
+                if isinstance(port._connection, PortConnection):
+                    root_1 = find_root(component_index)
+                    root_2 = find_root(port_to_component_index[port._connection.port])
+                    parents[root_2] = root_1
+
+        groups: MutableMapping[int, MutableSequence[int]] = {}
+        for component_index in range(len(self._components)):
+            groups.setdefault(find_root(component_index), []).append(component_index)
+
+        # a circuit made of one connected part is its own partition
+        if len(groups) == 1:
+            return [self]
+
+        has_input = {find_root(port_to_component_index[port]) for port in self._input_ports}
+        has_output = {find_root(port_to_component_index[port]) for port in self._output_ports}
+        return [self._get_partition(component_indices) for root, component_indices in groups.items()
+                if root in has_input and root in has_output]
+
+    def _get_partition(self, component_indices: MutableSequence[int]) -> "CompiledCircuit":
+        """Creates the plan of one connected part of the circuit. Helper function.
+
+        :param component_indices: Indices of the part's components in the plan
+        :type component_indices: MutableSequence[int]
+        :return: The plan of the part
+        :rtype: CompiledCircuit
+        """
+
+        partition = CompiledCircuit.__new__(CompiledCircuit)
+        partition._partitions = [partition]
+        partition._photonic_circuit = self._photonic_circuit
+        partition._topology_version = self._topology_version
+        partition._components = [self._components[index] for index in component_indices]
+        partition._component_ports = [self._component_ports[index] for index in component_indices]
+        partition._condensed_components = [component for component in partition._components
+                                           if isinstance(component, _CondensedComponent)]
+        partition._sequential_chains = [component._sequential_chain
+                                        for component in partition._condensed_components]
+
+        partition_ports = {port for ports in partition._component_ports for port in ports}
+        input_positions = [position for position, port in enumerate(self._input_ports)
+                           if port in partition_ports]
+        output_positions = [position for position, port in enumerate(self._output_ports)
+                            if port in partition_ports]
+        partition._index_ports([self._input_ports[position] for position in input_positions],
+                               [self._output_ports[position] for position in output_positions])
+
+        # positions of the partition's states in the external S matrix of the full plan
+        partition._component_indices = np.array(component_indices, dtype=np.int64)
+        partition._external_input_states = self._get_position_states(input_positions)
+        partition._external_output_states = self._get_position_states(output_positions)
+        return partition
+
+    def _get_position_states(self, positions: MutableSequence[int]) -> NDArray[np.int64]:
+        """Gets the H and V state indices of ports at the given positions of an interleaved
+        input or output list. Helper function.
+
+        :param positions: Positions of the ports in the list
+        :type positions: MutableSequence[int]
+        :return: Index of each position's H state followed by its V state
+        :rtype: NDArray[np.int64]
+        """
+
+        positions = np.array(positions, dtype=np.int64)
+        return np.column_stack((2*positions, 2*positions + 1)).ravel()
+
+    def _get_mode_indices(self, ports: MutableSequence[Port]) -> NDArray[np.int64]:
+        """Gets the indices of the H and V states of every port in the global system, in port order.
+
+        :param ports: The ports whose indices are returned
+        :type ports: MutableSequence[Port]
+        :return: Indices of each port's H state followed by its V state
+        :rtype: NDArray[np.int64]
+        """
+
+        port_indices = np.array([self._port_to_index[port] for port in ports], dtype=np.int64)
+        return np.column_stack((2*port_indices, 2*port_indices + 1)).ravel()
+
+    def _get_connectivity_matrix(self) -> csc_matrix:
+        """Gets the connectivity matrix C from the photonic circuit. If port i is connected to port
+        j, then a 2x2 identity matrix is placed in the 2x2 block created by the H and V state of
+        ports i and j.
+
+        :return: The connectivity matrix
+        :rtype: csc_matrix
+        """
+
+        rows = []
+        cols = []
+        for ports in self._component_ports:
+            for port in ports:
+                if port._port_type == PortType.OUTPUT:
+                    if isinstance(port._connection, PortConnection):
+                        port_index_1 = self._port_to_index[port]
+                        port_index_2 = self._port_to_index[port._connection.port]
+
+                        # H state stored first, then V state
+                        p1h, p1v = 2*port_index_1, 2*port_index_1 + 1
+                        p2h, p2v = 2*port_index_2, 2*port_index_2 + 1
+
+                        rows.extend([p1h, p2h, p1v, p2v])
+                        cols.extend([p2h, p1h, p2v, p1v])
+
+        data = np.ones(len(rows), dtype=int)
+
+        return coo_matrix((data, (rows, cols)), shape=(2 * self._num_ports, 2 * self._num_ports)).tocsc()
+
+    def _get_feed_forward_steps(self) -> Optional[MutableSequence[_FeedForwardStep]]:
+        """Orders the components topologically so that light can be propagated from the circuit
+        inputs to the circuit outputs one component at a time. This is only possible when every
+        connection joins an output port to an input port, the circuit inputs are input ports, the
+        circuit outputs are output ports and the port graph has no feedback loops.
+
+        :return: The propagation steps in topological order, or None if the circuit is not
+            feed-forward
+        :rtype: Optional[MutableSequence[_FeedForwardStep]]
+        """
+
+        for port in self._input_ports:
+            if port._port_type != PortType.INPUT:
+                return None
+        for port in self._output_ports:
+            if port._port_type != PortType.OUTPUT:
+                return None
+
+        port_to_component_index = {port: component_index
+                                   for component_index, ports in enumerate(self._component_ports)
+                                   for port in ports}
+
+        # edges go from the component owning an output port to the component owning the input
+        # port it is connected to
+        successors = [[] for _ in self._component_ports]
+        in_degrees = [0] * len(self._component_ports)
+        for component_index, ports in enumerate(self._component_ports):
+            for port in ports:
+                if isinstance(port._connection, PortConnection):
+                    if port._port_type == port._connection.port._port_type:
+                        return None
+                    if port._port_type == PortType.OUTPUT:
+                        successor_index = port_to_component_index[port._connection.port]
+                        successors[component_index].append(successor_index)
+                        in_degrees[successor_index] += 1
+
+        # Kahn's algorithm. Components left over are part of a feedback loop
+        topological_order = []
+        ready = deque(index for index, in_degree in enumerate(in_degrees) if in_degree == 0)
+        while ready:
+            component_index = ready.popleft()
+            topological_order.append(component_index)
+            for successor_index in successors[component_index]:
+                in_degrees[successor_index] -= 1
+                if in_degrees[successor_index] == 0:
+                    ready.append(successor_index)
+        if len(topological_order) != len(self._component_ports):
+            return None
+
+        # rows of the propagated wave array: every global state, then one unit excitation per
+        # circuit input state, then one row of zeros for unconnected input ports
+        num_states = 2*self._num_ports
+        input_port_to_row = {port: num_states + 2*source_index
+                             for source_index, port in enumerate(self._input_ports)}
+        zero_row = num_states + 2*len(self._input_ports)
+
+        # every component's S matrix entries are contiguous in the concatenated S matrix data
+        entry_offsets = np.cumsum([0] + [(2*len(ports))**2 for ports in self._component_ports])
+
+        steps = []
+        for component_index in topological_order:
+            ports = self._component_ports[component_index]
+            input_ports = [port for port in ports if port._port_type == PortType.INPUT]
+
+            source_rows = []
+            for port in input_ports:
+                if isinstance(port._connection, PortConnection):
+                    source_row = 2*self._port_to_index[port._connection.port]
+                    source_rows.extend((source_row, source_row + 1))
+                elif port in input_port_to_row:
+                    source_rows.extend((input_port_to_row[port], input_port_to_row[port] + 1))
+                else:
+                    source_rows.extend((zero_row, zero_row))
+
+            # a component's ports are indexed consecutively, so its output states are contiguous.
+            # A component without outputs, such as a terminator, propagates nothing, but its step
+            # is kept so that its reflections are checked
+            if len(ports) > len(input_ports):
+                first_output_state = 2*self._port_to_index[ports[len(input_ports)]]
+            else:
+                first_output_state = 0
+            steps.append(_FeedForwardStep(
+                s_matrix_entries=slice(entry_offsets[component_index], entry_offsets[component_index + 1]),
+                num_states=2*len(ports), num_input_states=2*len(input_ports),
+                source_rows=np.array(source_rows, dtype=np.int64),
+                output_states=slice(first_output_state, first_output_state + 2*(len(ports) - len(input_ports)))))
+        return steps
+
+    def _condense_circuit(self) -> MutableSequence[MutableSequence[Component]]:
+        """Finds the sequential chains of the circuit, which are simplified using redheffer star
+        products. Completely disconnected components are skipped. The circuit itself is not modified.
+
+        :return: Sequential chains of components
+        :rtype: MutableSequence[MutableSequence[Component]]
+        """
+
+        # skip completely disconnected components
+        components = [component for component in self._photonic_circuit.components
+                      if not self._is_disconnected(component)]
+
+        # find all anchor components (where in-degree != 1 or out-degree != 1). Components with
+        # more than one input or output are anchors even if only one of each is connected
+        anchor_components = set()
+        for component in components:
+            if component._in_degree != 1 or component._out_degree != 1 \
+                or component._num_inputs != 1 or component._num_outputs != 1:
+                anchor_components.add(component)
+
+        # find all sequential paths
+        sequential_paths = []
+        # iterate through starting at outputs of anchor components
+        for anchor_component in anchor_components:
+            for port in anchor_component._ports:
+                if port._port_type == PortType.OUTPUT:
+                    connection = port.connection
+                    if isinstance(connection, PortConnection):
+                        component = connection.port._component
+                        sequential_path = self._find_sequential_chain(component, anchor_components)
+                        if len(sequential_path) >= 2:
+                            sequential_paths.append(sequential_path)
+        # iterate through starting at circuit inputs
+        for circuit_input in self._photonic_circuit._circuit_inputs:
+            sequential_path = self._find_sequential_chain(circuit_input._component, anchor_components)
+            if len(sequential_path) >= 2:
+                sequential_paths.append(sequential_path)
+
+        return sequential_paths
+
+    def _find_sequential_chain(self, component: Component,
+                               anchor_components: set[Component]) -> MutableSequence[Component]:
+        """Identifies chains of sequential components starting at one component (typically ones
+        connected to outputs of anchor components) and ending at an anchor component (in-degree
+        != 1 or out-degree != 1). Helper function.
+
+        :param component: The component that the search starts at (inclusive)
+        :type component: Component
+        :param anchor_components: Set of all anchor components
+        :type anchor_components: set[Component]
+        :return: The chain of sequential components
+        :rtype: MutableSequence[Component]
+        """
+
+        sequential_components = []
+        current_component = component
+        # a loop made only of sequential components would otherwise never reach an anchor
+        while current_component not in anchor_components and current_component not in sequential_components:
+            sequential_components.append(current_component)
+            # if sequential, there will only be one output port: _ports[1]
+            current_connection = current_component._ports[1]._connection
+            if isinstance(current_connection, PortConnection):
+                current_component = current_connection.port._component
+            else: # no connection (None) or circuit output (OutputConnection)
+                return sequential_components
+        return sequential_components
+
+    def _is_disconnected(self, component: Component) -> bool:
+        """Checks if a component is completely disconnected from the rest of the circuit.
+
+        :param component: The component to be checked
+        :type component: Component
+        :return: Whether the component is completely disconnected from the rest of the circuit
+        :rtype: bool
+        """
+
+        for port in component._ports:
+            if port._connection is not None:
+                return False
+        return True
+
+    def _get_condensed_s_matrix(self, sequential_chain: MutableSequence[Component],
+                                  wavelength: float) -> SMatrix4x4:
+        """Returns the modified S matrix that represents the entire chain. Helper function.
+
+        :param sequential_chain: The chain of sequential components to be condensed
+        :type sequential_chain: MutableSequence[Component]
+        :param wavelength: The wavelength of the light going through the sequential chain
+        :type wavelength: float
+        :return: The condensed modified S matrix
+        :rtype: SMatrix4x4
+        """
+
+        return self._get_condensed_s_matrix_batch(sequential_chain, np.array([wavelength], dtype=float))[0]
+
+    def _get_condensed_s_matrix_batch(self, sequential_chain: MutableSequence[Component],
+                                      wavelengths: NDArray[np.float64]) -> NDArray[np.complex128]:
+        """Returns the modified S matrices that represent the entire chain for an array of
+        wavelengths. The chain is split into segments that are each combined by tree reduction,
+        which bounds the memory used by the stacked S matrices. Helper function.
+
+        :param sequential_chain: The chain of sequential components to be condensed
+        :type sequential_chain: MutableSequence[Component]
+        :param wavelengths: The wavelengths of the light going through the sequential chain
+        :type wavelengths: NDArray[np.float64]
+        :return: The condensed modified S matrices, with shape (len(wavelengths), 4, 4)
+        :rtype: NDArray[np.complex128]
+        """
+
+        condensed_s_matrices = None
+        for segment_start in range(0, len(sequential_chain), self._CHAIN_SEGMENT_SIZE):
+            segment = sequential_chain[segment_start:segment_start + self._CHAIN_SEGMENT_SIZE]
+            segment_s_matrices = self._reduce_chain(
+                np.stack([component.get_s_matrix_batch(wavelengths) for component in segment]))
+
+            if condensed_s_matrices is None:
+                condensed_s_matrices = segment_s_matrices
+            else:
+                condensed_s_matrices = self._redheffer_star_batch(condensed_s_matrices, segment_s_matrices)
+
+        return condensed_s_matrices
+
+    def _reduce_chain(self, s_matrices: NDArray[np.complex128]) -> NDArray[np.complex128]:
+        """Combines a chain of modified S matrices with the Redheffer star product. The star product
+        is associative, so neighbouring pairs are combined together level by level (tree reduction)
+        instead of folding the chain from left to right. Every level is one batched star product.
+        Helper function.
+
+        :param s_matrices: The S matrices of the chain in order, with shape (L, ..., 4, 4)
+        :type s_matrices: NDArray[np.complex128]
+        :return: The combined S matrices, with shape (..., 4, 4)
+        :rtype: NDArray[np.complex128]
+        """
+
+        while len(s_matrices) > 1:
+            num_pairs = len(s_matrices) // 2
+            combined = self._redheffer_star_batch(s_matrices[0:2*num_pairs:2], s_matrices[1:2*num_pairs:2])
+
+            # an odd matrix out is carried over to the next level unchanged
+            if len(s_matrices) % 2 == 1:
+                combined = np.concatenate((combined, s_matrices[-1:]))
+            s_matrices = combined
+
+        return s_matrices[0]
+
+    def _redheffer_star(self, A: SMatrix4x4, B: SMatrix4x4) -> SMatrix4x4:
+        """Operation used to combine the modified S matrices of two sequential components.
+        The resulting matrix represents a component equivalent to those two components.
+        Helper function.
+
+        :param A: First matrix to be combined
+        :type A: SMatrix4x4
+        :param B: Second matrix to be combined
+        :type B: SMatrix4x4
+        :return: The combined matrix, representing a component equivalent to the two
+            components
+        :rtype: SMatrix4x4
+        """
+
+        return self._redheffer_star_batch(A, B)
+
+    def _redheffer_star_batch(self, A: NDArray[np.complex128], B: NDArray[np.complex128]) -> NDArray[np.complex128]:
+        """Redheffer star product of two stacks of modified S matrices, applied across any
+        leading (wavelength, time or chain) axes. Helper function.
+
+        :param A: First matrices to be combined, with shape (..., 4, 4)
+        :type A: NDArray[np.complex128]
+        :param B: Second matrices to be combined, with shape (..., 4, 4)
+        :type B: NDArray[np.complex128]
+        :return: The combined matrices, with shape (..., 4, 4)
+        :rtype: NDArray[np.complex128]
+        """
+
+        A11, A12, A21, A22 = self._get_blocks(A)
+        B11, B12, B21, B22 = self._get_blocks(B)
+        I = np.eye(2)
+
+        # denominator terms, for the waves bouncing between A's output and B's input
+        D1 = self._invert_2x2_batch(I - A22 @ B11)
+        D2 = self._invert_2x2_batch(I - B11 @ A22)
+
+        # star product blocks
+        star11 = A11 + A12 @ B11 @ D1 @ A21
+        star12 = A12 @ D2 @ B12
+        star21 = B21 @ D1 @ A21
+        star22 = B22 + B21 @ A22 @ D2 @ B12
+
+        star = np.empty(np.broadcast_shapes(A.shape, B.shape), dtype=complex)
+        star[..., 0:2, 0:2] = star11
+        star[..., 0:2, 2:4] = star12
+        star[..., 2:4, 0:2] = star21
+        star[..., 2:4, 2:4] = star22
+        return star
+
+    def _invert_2x2_batch(self, M: NDArray[np.complex128]) -> NDArray[np.complex128]:
+        """Inverts a stack of 2x2 matrices in closed form. Helper function.
+
+        :param M: Matrices to be inverted, with shape (..., 2, 2)
+        :type M: NDArray[np.complex128]
+        :return: The inverted matrices, with shape (..., 2, 2)
+        :rtype: NDArray[np.complex128]
+        """
+
+        a, b = M[..., 0, 0], M[..., 0, 1]
+        c, d = M[..., 1, 0], M[..., 1, 1]
+        determinant = a*d - b*c
+
+        inverse = np.empty(M.shape, dtype=complex)
+        inverse[..., 0, 0] = d / determinant
+        inverse[..., 0, 1] = -b / determinant
+        inverse[..., 1, 0] = -c / determinant
+        inverse[..., 1, 1] = a / determinant
+        return inverse
+
+    def _get_blocks(self, M: NDArray[np.complex128]) -> tuple:
+        """Gets the four 2x2 block matrices from a 4x4 modified S matrix, or from every matrix of
+        a stack of them.
+
+        :param M: matrix from which the block matrices are extracted, with shape (..., 4, 4)
+        :type M: NDArray[np.complex128]
+        """
+
+        return M[..., 0:2, 0:2], M[..., 0:2, 2:4], M[..., 2:4, 0:2], M[..., 2:4, 2:4]
@@ -0,0 +1,330 @@
+from collections import OrderedDict
+from collections.abc import MutableMapping, MutableSequence
+from typing import Literal, Optional
+import numpy as np
+from numpy.typing import NDArray
+from scipy.linalg import block_diag, lu_factor, lu_solve
+from scipy.sparse import coo_matrix
+from .simulation import Simulation
+from .simulation_exceptions import EmptyInterfaceException
+from ..circuit.component import Component
+from ..circuit.components.condensed_component import _CondensedComponent
+from ..models.simulation_result import SimulationResult
+
+class IncrementalSimulation:
+    """Re-simulates a photonic circuit at one wavelength after the parameters of a few of its
+    components change. The global system (I - SC) is factorized once. A change to the S
+    matrices of k components only changes the rows of (I - SC) that belong to those components,
+    which is a low-rank update, so the new external S matrix follows from the Woodbury identity:
+
+        (M - E dS E^T C)^-1 = M^-1 + G dS (I - E^T C G dS)^-1 E^T C M^-1,  G = M^-1 E
+
+    The response G of every changed component is solved once and reused, so every update after
+    that only costs small dense products. When the changed components add up to too many states,
+    the system is factorized again from the current parameters.
+
+    :param simulation: The simulation of the photonic circuit
+    :type simulation: Simulation
+    :param wavelength: The wavelength of the light going through the circuit
+    :type wavelength: float
+    """
+
+    # amount of changed states after which the system is factorized again
+    _MAX_UPDATE_RANK = 512
+
+    __slots__ = ("_simulation", "_wavelength", "_compiled_circuit", "_component_indices",
+                 "_entry_offsets", "_first_states", "_s_matrix_data", "_base_s_matrix_data",
+                 "_positions", "_partner_positions", "_input_columns", "_solve_eliminated", "_M_KR",
+                 "_coupling_solution", "_schur_factors", "_base_solution", "_responses",
+                 "_changed_components")
+
+    def __init__(self, simulation: Simulation, wavelength: float):
+        self._simulation = simulation
+        self._wavelength = float(wavelength)
+        self._compiled_circuit = None
+        self._factorize_system()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(simulation={self._simulation!r}, wavelength={self._wavelength!r})"
+
+    def __str__(self):
+        return (
+            f"--- Incremental Simulation ---\n"
+            f"  Wavelength:         {self._wavelength}\n"
+            f"  Changed Components: {len(self._changed_components)}\n"
+            f"  Update Rank:        {self._get_update_rank()}"
+        )
+
+    @property
+    def simulation(self) -> Simulation:
+        return self._simulation
+
+    @property
+    def wavelength(self) -> float:
+        return self._wavelength
+
+    def update(self, *components: Component) -> NDArray[np.complex128]:
+        """Applies changes to the parameters of components. Only the components passed in are
+        evaluated again, so every component whose parameters changed since the last update must
+        be passed in.
+
+        :param components: The components whose parameters changed
+        :type components: Component
+        :return: The external S matrix of the circuit after the change
+        :rtype: NDArray[np.complex128]
+        """
+
+        # a change to the topology invalidates the factorization, which also picks up the change
+        if self._compiled_circuit.is_stale():
+            self._factorize_system()
+            return self.get_s_parameters()
+
+        for component in components:
+            # components that are not simulated, such as disconnected ones, do not change anything
+            if component not in self._component_indices:
+                continue
+
+            component_index = self._component_indices[component]
+            plan_component = self._compiled_circuit._components[component_index]
+            if isinstance(plan_component, _CondensedComponent):
+                plan_component.clear_cache()
+
+            entries = slice(self._entry_offsets[component_index], self._entry_offsets[component_index + 1])
+            self._s_matrix_data[entries] = plan_component.get_s_matrix(self._wavelength).ravel()
+            self._changed_components.add(component_index)
+
+        if self._get_update_rank() > self._MAX_UPDATE_RANK:
+            self._factorize_system()
+        return self.get_s_parameters()
+
+    def get_s_parameters(self) -> NDArray[np.complex128]:
+        """Gets the external S matrix of the circuit with every update applied.
+
+        :return: The external S matrix, with shape (2*num_outputs, 2*num_inputs)
+        :rtype: NDArray[np.complex128]
+        """
+
+        num_eliminated = self._compiled_circuit._num_eliminated
+        if not self._changed_components:
+            return self._base_solution[num_eliminated:].copy()
+
+        changed_components = sorted(self._changed_components)
+        s_matrix_change = block_diag(*[self._get_s_matrix_change(component_index)
+                                       for component_index in changed_components])
+        return self._get_s_parameters_batch(changed_components, s_matrix_change[None])[0]
+
+    def simulate(self, times: NDArray[np.float64],
+                 incoherent_mode: Literal["jones", "coherency"] = "jones") -> SimulationResult:
+        """Simulates the circuit with every update applied. Time steps whose lasers run at the
+        wavelength of the incremental simulation reuse its external S matrix, while any other
+        wavelength is solved in full.
+
+        :param times: Array of time values at which the photonic circuit is simulated
+        :type times: np.ndarray[np.float64]
+        :param incoherent_mode: How incoherent light states are stored, as in Simulation.simulate.
+            Defaults to 'jones'
+        :type incoherent_mode: Literal['jones', 'coherency']
+        :return: Light states at every output corresponding to the time array
+        :rtype: SimulationResult
+        """
+
+        compiled_circuit, coherence = self._simulation._prepare_simulation(incoherent_mode)
+        if compiled_circuit is not self._compiled_circuit:
+            self._factorize_system()
+
+        transfer_matrices = OrderedDict({self._wavelength: self.get_s_parameters()})
+        return self._simulation._simulate_times(compiled_circuit, coherence, np.asarray(times, dtype=float),
+                                                transfer_matrices, incoherent_mode)
+
+    @classmethod
+    def _from_s_matrix_data(cls, simulation: Simulation, wavelength: float,
+                            s_matrix_data: NDArray[np.complex128]) -> "IncrementalSimulation":
+        """Creates an incremental simulation from S matrices that were already evaluated, such as
+        for a whole block of wavelengths at once. Helper function.
+
+        :param simulation: The simulation of the photonic circuit
+        :type simulation: Simulation
+        :param wavelength: The wavelength of the light going through the circuit
+        :type wavelength: float
+        :param s_matrix_data: The entries of every component's modified S matrix at the
+            wavelength, concatenated in plan order
+        :type s_matrix_data: NDArray[np.complex128]
+        :return: The incremental simulation
+        :rtype: IncrementalSimulation
+        """
+
+        incremental_simulation = cls.__new__(cls)
+        incremental_simulation._simulation = simulation
+        incremental_simulation._wavelength = float(wavelength)
+        incremental_simulation._compiled_circuit = None
+        incremental_simulation._factorize_system(s_matrix_data)
+        return incremental_simulation
+
+    def _factorize_system(self, s_matrix_data: Optional[NDArray[np.complex128]] = None) -> None:
+        """Factorizes the global system at the current parameters of every component, and
+        solves it for the circuit inputs. Helper function.
+
+        :param s_matrix_data: The entries of every component's modified S matrix, concatenated
+            in plan order, defaults to None, which evaluates them at the current parameters
+        :type s_matrix_data: Optional[NDArray[np.complex128]]
+        """
+
+        photonic_circuit = self._simulation._photonic_circuit
+        if len(photonic_circuit._circuit_inputs) == 0 or len(photonic_circuit._circuit_outputs) == 0:
+            raise EmptyInterfaceException(photonic_circuit)
+
+        compiled_circuit = self._simulation.compiled_circuit
+        compiled_circuit.refresh()
+        self._compiled_circuit = compiled_circuit
+        self._component_indices = compiled_circuit._get_plan_indices()
+
+        component_ports = compiled_circuit._component_ports
+        self._entry_offsets = np.cumsum([0] + [(2*len(ports))**2 for ports in component_ports])
+        self._first_states = np.array([2*compiled_circuit._port_to_index[ports[0]] for ports in component_ports],
+                                      dtype=np.int64)
+        if s_matrix_data is None:
+            s_matrix_data = np.concatenate([component.get_s_matrix(self._wavelength).ravel()
+                                            for component in compiled_circuit._components])
+        self._s_matrix_data = s_matrix_data.copy()
+        self._base_s_matrix_data = self._s_matrix_data.copy()
+
+        # position of every state in elimination order, of the state connected to it, and of
+        # the circuit input that excites it
+        num_states = len(compiled_circuit._elimination_order)
+        self._positions = np.empty(num_states, dtype=np.int64)
+        self._positions[compiled_circuit._elimination_order] = np.arange(num_states)
+        connectivity = coo_matrix(compiled_circuit._connectivity_matrix)
+        self._partner_positions = np.full(num_states, -1, dtype=np.int64)
+        self._partner_positions[connectivity.row] = self._positions[connectivity.col]
+        self._input_columns = np.full(num_states, -1, dtype=np.int64)
+        self._input_columns[compiled_circuit._input_indices] = np.arange(len(compiled_circuit._input_indices))
+
+        system_assembly = compiled_circuit._system_assembly
+        M_KK = system_assembly.M_KK.assemble(self._s_matrix_data)
+        self._M_KR = system_assembly.M_KR.assemble(self._s_matrix_data)
+        if compiled_circuit._num_eliminated > 0:
+            M_RR = system_assembly.M_RR.assemble(self._s_matrix_data)
+            self._solve_eliminated = Simulation._factorize(
+                M_RR, Simulation._select_solver(M_RR, self._simulation._get_solver_profile()))
+            self._coupling_solution = self._solve_eliminated(system_assembly.M_RK.assemble(self._s_matrix_data))
+        else:
+            self._solve_eliminated = None
+            self._coupling_solution = np.zeros((0, M_KK.shape[0]), dtype=complex)
+        self._schur_factors = lu_factor(M_KK - self._M_KR @ self._coupling_solution)
+
+        self._base_solution = self._solve(np.vstack((system_assembly.B_R.assemble(self._s_matrix_data),
+                                                     system_assembly.B_K.assemble(self._s_matrix_data))))
+        self._responses: MutableMapping[int, NDArray[np.complex128]] = {}
+        self._changed_components = set()
+
+    def _get_s_parameters_batch(self, component_indices: MutableSequence[int],
+                                s_matrix_changes: NDArray[np.complex128]) -> NDArray[np.complex128]:
+        """Gets the external S matrix of the circuit for every one of a batch of changes to the S
+        matrices of the same components, each applied to the factorized system on its own. Every
+        change only needs a small solve of the size of the components' states. Helper function.
+
+        :param component_indices: Indices of the changed components in the plan
+        :type component_indices: MutableSequence[int]
+        :param s_matrix_changes: The changes of the S matrices, with the components' blocks on the
+            diagonal in the order of their indices, with shape (B, num_states, num_states)
+        :type s_matrix_changes: NDArray[np.complex128]
+        :return: The external S matrices, with shape (B, 2*num_outputs, 2*num_inputs)
+        :rtype: NDArray[np.complex128]
+        """
+
+        num_eliminated = self._compiled_circuit._num_eliminated
+        states = np.concatenate([self._get_states(component_index) for component_index in component_indices])
+
+        # E^T C picks the state connected to every changed state, and nothing for unconnected
+        # ones. Only those rows and the kept rows of the responses are needed
+        partner_positions = self._partner_positions[states]
+        is_connected = partner_positions >= 0
+        kept_positions = np.arange(num_eliminated, len(self._positions))
+        rows = np.concatenate((kept_positions, partner_positions[is_connected]))
+        responses = np.hstack([self._get_response(component_index)[rows] for component_index in component_indices])
+        base_solution = self._base_solution[rows]
+
+        # the changed S entries of circuit input columns also change the input matrix S[:, inputs]
+        input_selection = np.zeros((len(states), base_solution.shape[1]))
+        is_input = self._input_columns[states] >= 0
+        input_selection[is_input, self._input_columns[states][is_input]] = 1
+        solution = base_solution + responses @ (s_matrix_changes @ input_selection)
+
+        num_kept = len(kept_positions)
+        connected_responses = np.zeros((len(states), len(states)), dtype=complex)
+        connected_responses[is_connected] = responses[num_kept:]
+        connected_solution = np.zeros((len(s_matrix_changes), len(states), base_solution.shape[1]), dtype=complex)
+        connected_solution[:, is_connected] = solution[:, num_kept:]
+
+        correction = np.linalg.solve(np.eye(len(states)) - connected_responses @ s_matrix_changes,
+                                     connected_solution)
+        return solution[:, :num_kept] + responses[:num_kept] @ (s_matrix_changes @ correction)
+
+    def _solve(self, rhs: NDArray[np.complex128]) -> NDArray[np.complex128]:
+        """Solves the global system for right-hand sides in elimination order, from the
+        factorization of the eliminated block and of its Schur complement. Helper function.
+
+        :param rhs: The right-hand sides, one per column
+        :type rhs: NDArray[np.complex128]
+        :return: The solutions in elimination order, one per column
+        :rtype: NDArray[np.complex128]
+        """
+
+        num_eliminated = self._compiled_circuit._num_eliminated
+        eliminated_solution = self._solve_eliminated(rhs[:num_eliminated]) if num_eliminated > 0 \
+            else rhs[:0]
+        kept_solution = lu_solve(self._schur_factors, rhs[num_eliminated:] - self._M_KR @ eliminated_solution)
+        return np.vstack((eliminated_solution - self._coupling_solution @ kept_solution, kept_solution))
+
+    def _get_response(self, component_index: int) -> NDArray[np.complex128]:
+        """Gets the response G = M^-1 E of the global system to the states of a component, which
+        is solved the first time the component changes. Helper function.
+
+        :param component_index: Index of the component in the plan
+        :type component_index: int
+        :return: The response, with one column per state of the component
+        :rtype: NDArray[np.complex128]
+        """
+
+        if component_index not in self._responses:
+            states = self._get_states(component_index)
+            unit_excitations = np.zeros((len(self._positions), len(states)), dtype=complex)
+            unit_excitations[self._positions[states], np.arange(len(states))] = 1
+            self._responses[component_index] = self._solve(unit_excitations)
+        return self._responses[component_index]
+
+    def _get_s_matrix_change(self, component_index: int) -> NDArray[np.complex128]:
+        """Gets the change of a component's S matrix since the system was factorized. Helper
+        function.
+
+        :param component_index: Index of the component in the plan
+        :type component_index: int
+        :return: The change of the S matrix
+        :rtype: NDArray[np.complex128]
+        """
+
+        num_states = len(self._get_states(component_index))
+        entries = slice(self._entry_offsets[component_index], self._entry_offsets[component_index + 1])
+        return (self._s_matrix_data[entries] - self._base_s_matrix_data[entries]).reshape(num_states, num_states)
+
+    def _get_states(self, component_index: int) -> NDArray[np.int64]:
+        """Gets the global states of a component, which are contiguous. Helper function.
+
+        :param component_index: Index of the component in the plan
+        :type component_index: int
+        :return: The component's states
+        :rtype: NDArray[np.int64]
+        """
+
+        num_states = 2*len(self._compiled_circuit._component_ports[component_index])
+        return self._first_states[component_index] + np.arange(num_states)
+
+    def _get_update_rank(self) -> int:
+        """Gets the rank of the update applied to the factorized system. Helper function.
+
+        :return: The total amount of states of the changed components
+        :rtype: int
+        """
+
+        return sum(2*len(self._compiled_circuit._component_ports[component_index])
+                   for component_index in self._changed_components)
@@ -0,0 +1,166 @@
+from typing import Literal, MutableMapping, Optional
+import numpy as np
+from numpy.typing import NDArray
+from scipy.sparse import csc_matrix, linalg
+from .simulation_exceptions import ConvergenceException
+
+class _IterativeSolver:
+    """Solves a sequence of closely related sparse systems, such as the eliminated block of
+    (I - SC) at neighbouring wavelengths, with a preconditioned Krylov method. The incomplete LU
+    factorization of the first system is reused as the preconditioner of the ones after it, and
+    is only refactorized when the method no longer converges with it. Once that happens, every
+    system after it gets its own preconditioner. Every solve starts from the previous solution for
+    the same right-hand sides, which is close for finely sampled wavelengths.
+
+    :param method: The Krylov method, 'gmres' or 'bicgstab', defaults to 'gmres'
+    :type method: Literal['gmres', 'bicgstab']
+    :param rtol: Relative tolerance of the residual of every right-hand side, defaults to 1e-10
+    :type rtol: float
+    :param max_iterations: Maximum amount of iterations for every right-hand side, defaults to 1000
+    :type max_iterations: int
+    :param drop_tolerance: Drop tolerance of the incomplete LU factorization, defaults to 1e-4
+    :type drop_tolerance: float
+    :param fill_factor: Maximum fill-in of the incomplete LU factorization, relative to the
+        system, defaults to 10
+    :type fill_factor: float
+    """
+
+    _METHODS = ("gmres", "bicgstab")
+    # amount of GMRES iterations between restarts
+    _GMRES_RESTART = 20
+    # amount of iterations that a preconditioner of another system gets before it is refactorized
+    _REUSED_PRECONDITIONER_ITERATIONS = 100
+
+    __slots__ = "_method", "_rtol", "_max_iterations", "_drop_tolerance", "_fill_factor", \
+        "_preconditioner", "_preconditioned_matrix", "_reuses_preconditioner", "_previous_solutions"
+
+    def __init__(self, method: Literal["gmres", "bicgstab"] = "gmres", rtol: float = 1e-10,
+                 max_iterations: int = 1000, drop_tolerance: float = 1e-4, fill_factor: float = 10):
+        if method not in self._METHODS:
+            raise ValueError(f"Unknown iterative method {method!r}. Methods: {', '.join(self._METHODS)}")
+        self._method = method
+        self._rtol = rtol
+        self._max_iterations = max_iterations
+        self._drop_tolerance = drop_tolerance
+        self._fill_factor = fill_factor
+        self._preconditioner = None
+        self._preconditioned_matrix = None
+        self._reuses_preconditioner = True
+        self._previous_solutions: MutableMapping[str, NDArray[np.complex128]] = {}
+
+    def solve(self, A: csc_matrix, b: NDArray[np.complex128], trans: Literal["N", "T"] = "N"
+              ) -> NDArray[np.complex128]:
+        """Solves A x = b, or A^T x = b, for a right-hand side b.
+
+        :param A: Matrix of the system
+        :type A: csc_matrix
+        :param b: Right-hand side, a vector or a matrix with one right-hand side per column
+        :type b: NDArray[np.complex128]
+        :param trans: 'N' to solve A x = b, or 'T' to solve A^T x = b, defaults to 'N'
+        :type trans: Literal['N', 'T']
+        :raises ConvergenceException: The method did not converge, even with a refactorized
+            preconditioner
+        :return: The solution, with the shape of b
+        :rtype: NDArray[np.complex128]
+        """
+
+        if self._preconditioner is None or self._preconditioner.shape != A.shape \
+            or (not self._reuses_preconditioner and self._preconditioned_matrix is not A):
+            self._factorize_preconditioner(A)
+
+        b = np.asarray(b, dtype=complex)
+        right_hand_sides = b.reshape(len(b), -1)
+        previous_solution = self._previous_solutions.get(trans)
+        if previous_solution is not None and previous_solution.shape != right_hand_sides.shape:
+            previous_solution = None
+
+        solution = np.zeros(right_hand_sides.shape, dtype=complex)
+        for column in range(right_hand_sides.shape[1]):
+            if not right_hand_sides[:, column].any():
+                continue
+            initial_guess = None if previous_solution is None else previous_solution[:, column]
+            solution[:, column] = self._solve_column(A, right_hand_sides[:, column], initial_guess, trans)
+
+        self._previous_solutions[trans] = solution
+        return solution.reshape(b.shape)
+
+    def _solve_column(self, A: csc_matrix, b: NDArray[np.complex128],
+                      initial_guess: Optional[NDArray[np.complex128]], trans: Literal["N", "T"]
+                      ) -> NDArray[np.complex128]:
+        """Solves the system for one right-hand side, and refactorizes the preconditioner once if
+        the method does not converge with it. Helper function.
+
+        :param A: Matrix of the system
+        :type A: csc_matrix
+        :param b: Right-hand side
+        :type b: NDArray[np.complex128]
+        :param initial_guess: Solution that the method starts from, or None to start from zero
+        :type initial_guess: Optional[NDArray[np.complex128]]
+        :param trans: 'N' to solve A x = b, or 'T' to solve A^T x = b
+        :type trans: Literal['N', 'T']
+        :raises ConvergenceException: The method did not converge
+        :return: The solution
+        :rtype: NDArray[np.complex128]
+        """
+
+        operator = A if trans == "N" else A.T
+
+        while True:
+            is_reused = self._preconditioned_matrix is not A
+            x, info = self._iterate(operator, b, initial_guess, trans,
+                                    self._REUSED_PRECONDITIONER_ITERATIONS if is_reused else self._max_iterations)
+            if info == 0:
+                return x
+            if not is_reused:
+                break
+
+            # the preconditioner was factorized for another system, which has drifted too far
+            # from this one, so the method continues from the last iterate with a new one
+            self._reuses_preconditioner = False
+            self._factorize_preconditioner(A)
+            initial_guess = x
+
+        residual = np.linalg.norm(operator @ x - b) / np.linalg.norm(b)
+        raise ConvergenceException(self._method, residual, self._rtol)
+
+    def _iterate(self, operator: csc_matrix, b: NDArray[np.complex128],
+                 initial_guess: Optional[NDArray[np.complex128]], trans: Literal["N", "T"],
+                 max_iterations: int) -> tuple[NDArray[np.complex128], int]:
+        """Runs the Krylov method with the current preconditioner. Helper function.
+
+        :param operator: Matrix of the system, already transposed if trans is 'T'
+        :type operator: csc_matrix
+        :param b: Right-hand side
+        :type b: NDArray[np.complex128]
+        :param initial_guess: Solution that the method starts from, or None to start from zero
+        :type initial_guess: Optional[NDArray[np.complex128]]
+        :param trans: 'N' to precondition with the factors, or 'T' with their transpose
+        :type trans: Literal['N', 'T']
+        :param max_iterations: Maximum amount of iterations
+        :type max_iterations: int
+        :return: The last iterate, and 0 if it converged or a positive number if it did not
+        :rtype: tuple[NDArray[np.complex128], int]
+        """
+
+        factors = self._preconditioner
+        preconditioner = linalg.LinearOperator(operator.shape, matvec=lambda x: factors.solve(x, trans=trans),
+                                               dtype=complex)
+        if self._method == "gmres":
+            # GMRES counts its iterations in restart cycles
+            return linalg.gmres(operator, b, x0=initial_guess, M=preconditioner, rtol=self._rtol, atol=0.0,
+                                restart=self._GMRES_RESTART,
+                                maxiter=-(-max_iterations // self._GMRES_RESTART))
+        return linalg.bicgstab(operator, b, x0=initial_guess, M=preconditioner, rtol=self._rtol, atol=0.0,
+                               maxiter=max_iterations)
+
+    def _factorize_preconditioner(self, A: csc_matrix) -> None:
+        """Computes the incomplete LU factorization of the matrix, which preconditions the systems
+        solved after it. Helper function.
+
+        :param A: Matrix that the preconditioner approximates
+        :type A: csc_matrix
+        """
+
+        self._preconditioner = linalg.spilu(csc_matrix(A), drop_tol=self._drop_tolerance,
+                                            fill_factor=self._fill_factor)
+        self._preconditioned_matrix = A
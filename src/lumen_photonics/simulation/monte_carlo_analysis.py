@@ -0,0 +1,328 @@
+from collections.abc import Mapping, MutableSequence
+from dataclasses import dataclass
+from itertools import repeat
+from numbers import Real
+from typing import Optional
+import numpy as np
+from numpy.typing import NDArray
+from .compiled_circuit import CompiledCircuit
+from .simulation import Simulation
+from .simulation_exceptions import EmptyInterfaceException
+from .solver_options import SolverOptions
+from ..circuit.component import Component
+from ..circuit.components.condensed_component import _CondensedComponent
+from ..models.monte_carlo_result import MonteCarloResult
+
+@dataclass(frozen=True, slots=True)
+class NormalVariation:
+    """Fabrication variation of a parameter that is normally distributed around its nominal value.
+
+    :param std: Standard deviation of the parameter
+    :type std: float
+    :param relative: Whether the standard deviation is relative to the nominal value, defaults to False
+    :type relative: bool
+    """
+
+    std: float
+    relative: bool = False
+
+    def sample(self, rng: np.random.Generator, nominal: float, size: int) -> NDArray[np.float64]:
+        """Draws values of the parameter.
+
+        :param rng: The random generator that the values are drawn from
+        :type rng: np.random.Generator
+        :param nominal: The nominal value of the parameter
+        :type nominal: float
+        :param size: The amount of values drawn
+        :type size: int
+        :return: The values of the parameter
+        :rtype: NDArray[np.float64]
+        """
+
+        scale = self.std*abs(nominal) if self.relative else self.std
+        return nominal + scale*rng.standard_normal(size)
+
+@dataclass(frozen=True, slots=True)
+class UniformVariation:
+    """Fabrication variation of a parameter that is uniformly distributed around its nominal value.
+
+    :param half_width: Largest deviation of the parameter from its nominal value
+    :type half_width: float
+    :param relative: Whether the deviation is relative to the nominal value, defaults to False
+    :type relative: bool
+    """
+
+    half_width: float
+    relative: bool = False
+
+    def sample(self, rng: np.random.Generator, nominal: float, size: int) -> NDArray[np.float64]:
+        """Draws values of the parameter.
+
+        :param rng: The random generator that the values are drawn from
+        :type rng: np.random.Generator
+        :param nominal: The nominal value of the parameter
+        :type nominal: float
+        :param size: The amount of values drawn
+        :type size: int
+        :return: The values of the parameter
+        :rtype: NDArray[np.float64]
+        """
+
+        scale = self.half_width*abs(nominal) if self.relative else self.half_width
+        return nominal + scale*rng.uniform(-1, 1, size)
+
+@dataclass(frozen=True, slots=True)
+class _MonteCarloTask:
+    """Everything needed to simulate a batch of circuit instances. Only refers to the numeric plan,
+    arrays and detached components, so it can be sent to the workers of a process pool.
+
+    :param compiled_circuit: The simulation plan of the photonic circuit
+    :type compiled_circuit: CompiledCircuit
+    :param component_matrix_batches: The nominal S matrices of every plan component, each with
+        shape (W, 2N, 2N)
+    :type component_matrix_batches: MutableSequence[NDArray[np.complex128]]
+    :param varied_components: The plan index of every plan component with varied parameters, the
+        detached copies of the components that it simulates, and whether it is a condensed chain
+    :type varied_components: MutableSequence[tuple[int, MutableSequence[Component], bool]]
+    :param parameter_refs: The detached component and name of every varied parameter, with no
+        component for parameters of components that are not simulated
+    :type parameter_refs: MutableSequence[tuple[Optional[Component], str]]
+    :param wavelengths: The wavelengths that the circuit instances are simulated at
+    :type wavelengths: NDArray[np.float64]
+    :param input_vector: The amplitudes of the input states
+    :type input_vector: NDArray[np.complex128]
+    :param solver_options: Options of the matrix solvers, with the profile of the simulation
+    :type solver_options: SolverOptions
+    """
+
+    compiled_circuit: CompiledCircuit
+    component_matrix_batches: MutableSequence[NDArray[np.complex128]]
+    varied_components: MutableSequence[tuple[int, MutableSequence[Component], bool]]
+    parameter_refs: MutableSequence[tuple[Optional[Component], str]]
+    wavelengths: NDArray[np.float64]
+    input_vector: NDArray[np.complex128]
+    solver_options: SolverOptions
+
+class MonteCarloAnalysis:
+    """Estimates the spread of a photonic circuit's output powers under fabrication variations of
+    its components' parameters. The circuit instances are simulated in batches, on the
+    simulation's executor if it has one. Every batch draws its parameter values from its own
+    child of one SeedSequence, so the samples only depend on the seed and the batch size, and not
+    on how the batches are scheduled. The workers are sent the compiled plan and detached copies
+    of the varied components instead of the circuit, and only send back the powers at the outputs.
+
+    :param simulation: The simulation of the photonic circuit
+    :type simulation: Simulation
+    :param variations: The variation of every varied parameter, keyed by the label
+        'component_name.parameter_name'. Variations draw values with a method
+        sample(rng, nominal, size)
+    :type variations: Mapping[str, NormalVariation | UniformVariation]
+    """
+
+    # amount of circuit instances simulated by each task
+    _DEFAULT_BATCH_SIZE = 64
+
+    __slots__ = "_simulation", "_variations"
+
+    def __init__(self, simulation: Simulation, variations: Mapping[str, NormalVariation | UniformVariation]):
+        self._simulation = simulation
+        self._variations = dict(variations)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(simulation={self._simulation!r}, variations={self._variations!r})"
+
+    def __str__(self):
+        variation_summary = "\n".join(f"    - {label}: {variation!r}" for label, variation in self._variations.items())
+        return (
+            f"--- Monte Carlo Analysis ---\n"
+            f"  Varied Parameters:\n{variation_summary or '    (none)'}"
+        )
+
+    @property
+    def simulation(self) -> Simulation:
+        return self._simulation
+
+    @property
+    def variations(self) -> Mapping[str, NormalVariation | UniformVariation]:
+        return self._variations
+
+    def run(self, num_samples: int, wavelengths: NDArray[np.float64], *,
+            input_jones: Optional[NDArray[np.complex128]] = None, seed: Optional[int] = None,
+            batch_size: int = _DEFAULT_BATCH_SIZE) -> MonteCarloResult:
+        """Simulates circuit instances with parameters drawn from their variations, for coherent
+        light with the same wavelength at every input.
+
+        :param num_samples: The amount of circuit instances
+        :type num_samples: int
+        :param wavelengths: Array of wavelength values at which every instance is simulated
+        :type wavelengths: np.ndarray[np.float64]
+        :param input_jones: The Jones vectors of the light at every input, in the order of the
+            input ports, with shape (num_inputs, 2), defaults to None, which uses the circuit's
+            lasers at time 0
+        :type input_jones: Optional[NDArray[np.complex128]]
+        :param seed: Seed of the random values, defaults to None, which draws fresh entropy
+        :type seed: Optional[int]
+        :param batch_size: The amount of circuit instances simulated by each task, defaults to 64
+        :type batch_size: int
+        :raises MissingComponentException: A label refers to a component that is not in the circuit
+        :raises MissingParameterException: A label refers to a parameter that is not tunable or
+            not numeric
+        :return: The parameter values and output powers of every instance
+        :rtype: MonteCarloResult
+        """
+
+        from ..circuit.circuit_exceptions import MissingParameterException
+
+        photonic_circuit = self._simulation._photonic_circuit
+        if len(photonic_circuit._circuit_inputs) == 0 or len(photonic_circuit._circuit_outputs) == 0:
+            raise EmptyInterfaceException(photonic_circuit)
+
+        compiled_circuit = self._simulation.compiled_circuit
+        compiled_circuit.refresh()
+        wavelengths = np.asarray(wavelengths, dtype=float)
+
+        parameter_refs = [self._simulation._get_parameter_ref(label) for label in self._variations]
+        nominal_values = [component.get_parameter(name) for component, name in parameter_refs]
+        for label, (component, name), nominal_value in zip(self._variations, parameter_refs, nominal_values):
+            if not isinstance(nominal_value, Real) or isinstance(nominal_value, bool):
+                raise MissingParameterException(component, name, f"{label} is not numeric, so it cannot vary")
+
+        samples = self._draw_samples(nominal_values, num_samples, seed, batch_size)
+        task = self._get_task(compiled_circuit, parameter_refs, wavelengths, input_jones)
+
+        # only the powers of every batch are kept, as soon as the batch is done
+        batches = [slice(batch_start, min(batch_start + batch_size, num_samples))
+                   for batch_start in range(0, num_samples, batch_size)]
+        executor = self._simulation._executor
+        if executor is None:
+            batch_powers = map(self._simulate_batch, repeat(task), [samples[batch] for batch in batches])
+        else:
+            batch_powers = executor.map(self._simulate_batch, repeat(task, len(batches)),
+                                        [samples[batch] for batch in batches])
+
+        powers = np.empty((num_samples, len(wavelengths), len(compiled_circuit._output_ports), 2))
+        for batch, powers_of_batch in zip(batches, batch_powers):
+            powers[batch] = powers_of_batch
+
+        return MonteCarloResult(photonic_circuit, parameters=list(self._variations), samples=samples,
+                                output_ports=compiled_circuit._output_ports, wavelengths=wavelengths,
+                                powers=powers)
+
+    def _draw_samples(self, nominal_values: MutableSequence[float], num_samples: int, seed: Optional[int],
+                      batch_size: int) -> NDArray[np.float64]:
+        """Draws the parameter values of every circuit instance, batch by batch. Each batch has its
+        own random generator, spawned from the seed. Helper function.
+
+        :param nominal_values: The nominal value of every varied parameter
+        :type nominal_values: MutableSequence[float]
+        :param num_samples: The amount of circuit instances
+        :type num_samples: int
+        :param seed: Seed of the random values
+        :type seed: Optional[int]
+        :param batch_size: The amount of circuit instances in each batch
+        :type batch_size: int
+        :return: The parameter values, with shape (num_samples, num_parameters)
+        :rtype: NDArray[np.float64]
+        """
+
+        samples = np.empty((num_samples, len(nominal_values)))
+        num_batches = -(-num_samples // batch_size)
+        for batch_index, seed_sequence in enumerate(np.random.SeedSequence(seed).spawn(num_batches)):
+            rng = np.random.default_rng(seed_sequence)
+            batch = slice(batch_index*batch_size, min((batch_index + 1)*batch_size, num_samples))
+            for parameter_index, (variation, nominal_value) in enumerate(zip(self._variations.values(),
+                                                                             nominal_values)):
+                samples[batch, parameter_index] = variation.sample(rng, nominal_value, batch.stop - batch.start)
+        return samples
+
+    def _get_task(self, compiled_circuit: CompiledCircuit, parameter_refs: MutableSequence[tuple[Component, str]],
+                  wavelengths: NDArray[np.float64], input_jones: Optional[NDArray[np.complex128]]) -> _MonteCarloTask:
+        """Gathers what the workers need to simulate circuit instances. Every plan component with
+        a varied parameter is detached from the circuit, which is a whole chain for components of
+        a sequential chain. Helper function.
+
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param parameter_refs: The component and name of every varied parameter
+        :type parameter_refs: MutableSequence[tuple[Component, str]]
+        :param wavelengths: The wavelengths that the circuit instances are simulated at
+        :type wavelengths: NDArray[np.float64]
+        :param input_jones: The Jones vectors of the light at every input, or None for the
+            circuit's lasers at time 0
+        :type input_jones: Optional[NDArray[np.complex128]]
+        :return: The task sent to the workers
+        :rtype: _MonteCarloTask
+        """
+
+        if input_jones is None:
+            laser_jones, _ = self._simulation._sample_inputs(self._simulation._photonic_circuit, np.zeros(1))
+            input_vector = np.concatenate([laser_jones[port][0] for port in compiled_circuit._input_ports])
+        else:
+            input_vector = np.asarray(input_jones, dtype=complex).ravel()
+
+        plan_indices = compiled_circuit._get_plan_indices()
+        detached_components = {}
+        varied_components = []
+        for component, _ in parameter_refs:
+            if component not in plan_indices or component in detached_components:
+                continue
+            plan_index = plan_indices[component]
+            plan_component = compiled_circuit._components[plan_index]
+            is_condensed = isinstance(plan_component, _CondensedComponent)
+            members = plan_component._sequential_chain if is_condensed else [plan_component]
+            detached_members = [member._get_detached_copy() for member in members]
+            detached_components.update(zip(members, detached_members))
+            varied_components.append((plan_index, detached_members, is_condensed))
+
+        return _MonteCarloTask(
+            compiled_circuit=compiled_circuit,
+            component_matrix_batches=self._simulation._get_component_matrix_batches(compiled_circuit._components,
+                                                                                    wavelengths),
+            varied_components=varied_components,
+            parameter_refs=[(detached_components.get(component), name) for component, name in parameter_refs],
+            wavelengths=wavelengths, input_vector=input_vector,
+            solver_options=self._simulation._resolve_solver_options(None))
+
+    @classmethod
+    def _simulate_batch(cls, task: _MonteCarloTask, samples: NDArray[np.float64]) -> NDArray[np.float64]:
+        """Simulates a batch of circuit instances. Runs on the executor's workers. Helper function.
+
+        :param task: Everything needed to simulate the circuit instances
+        :type task: _MonteCarloTask
+        :param samples: The parameter values of every instance, with shape (B, num_parameters)
+        :type samples: NDArray[np.float64]
+        :return: The powers of the H and V states at every output, with shape
+            (B, len(wavelengths), num_outputs, 2)
+        :rtype: NDArray[np.float64]
+        """
+
+        compiled_circuit = task.compiled_circuit
+        num_wavelengths = len(task.wavelengths)
+        component_matrix_batches = list(task.component_matrix_batches)
+        powers = np.empty((len(samples), num_wavelengths, len(compiled_circuit._output_indices) // 2, 2))
+
+        # batches that run on the threads of one process share the task, so every batch varies
+        # its own copies of the components
+        batch_components = {member: member._get_detached_copy()
+                            for _, members, _ in task.varied_components for member in members}
+        varied_components = [(plan_index, [batch_components[member] for member in members], is_condensed)
+                             for plan_index, members, is_condensed in task.varied_components]
+        parameter_refs = [(batch_components.get(component), name) for component, name in task.parameter_refs]
+
+        for sample_index, sample in enumerate(samples):
+            for (component, name), value in zip(parameter_refs, sample):
+                if component is not None:
+                    component.set_parameter(name, value)
+
+            for plan_index, members, is_condensed in varied_components:
+                if is_condensed:
+                    component_matrix_batches[plan_index] = compiled_circuit._get_condensed_s_matrix_batch(
+                        members, task.wavelengths)
+                else:
+                    component_matrix_batches[plan_index] = members[0].get_s_matrix_batch(task.wavelengths)
+
+            output_states = Simulation._reduce_batch_to_external_ports(compiled_circuit, component_matrix_batches,
+                                                                       task.solver_options) @ task.input_vector
+            powers[sample_index] = np.abs(output_states.reshape(num_wavelengths, -1, 2))**2
+
+        return powers
@@ -0,0 +1,364 @@
+from collections.abc import MutableMapping, MutableSequence
+from numbers import Real
+from typing import Optional
+import warnings
+import numpy as np
+from numpy.typing import NDArray
+from .compiled_circuit import CompiledCircuit
+from .simulation import Simulation
+from .simulation_exceptions import EmptyInterfaceException
+from ..circuit.component import Component
+from ..circuit.components.condensed_component import _CondensedComponent
+from ..models.sensitivity_result import SensitivityResult
+
+class SensitivityAnalysis:
+    """Computes the derivatives of a photonic circuit's external S matrix with respect to the
+    tunable parameters of its components with the adjoint method. A parameter of component k only
+    changes the component's S matrix S_k, so the derivative of the external S matrix T is
+
+        dT/dp = A_k dS_k/dp X_k
+
+    where X_k are the waves incident on the component and A_k are the rows of (I - SC)^-1 that
+    map the component's outgoing waves to the circuit outputs. Both are solved once per wavelength
+    for every parameter: X from the forward solve that gives T, and A from one transposed solve
+    with one right-hand side per output state. Each parameter then only costs a small product and
+    the evaluation of dS_k/dp, which is a central finite difference of the component's own S
+    matrix, so the cost hardly grows with the amount of parameters. Derivatives are only as
+    accurate as that finite difference, typically to about six significant digits. A parameter
+    whose component has non-finite S matrices around its value has no derivative, which is NaN
+    and raises a warning.
+
+    :param simulation: The simulation of the photonic circuit
+    :type simulation: Simulation
+    """
+
+    # relative trial step of the central finite differences of the components' S matrices.
+    # Parameters that are zero are stepped by this absolute amount instead
+    _FINITE_DIFFERENCE_STEP = 1e-6
+
+    # largest change of an S matrix entry that the finite difference steps are scaled to, close
+    # to the cube root of the machine epsilon
+    _TARGET_S_MATRIX_CHANGE = 1e-5
+
+    # factor that a step is grown by while it is too small to change the S matrix, up to the
+    # largest relative step, which is absolute for parameters that are zero. The S matrix of a
+    # component that does not change within it does not depend on the parameter
+    _STEP_GROWTH = 10
+    _MAX_FINITE_DIFFERENCE_STEP = 1e-3
+
+    # amount of wavelengths whose S matrix derivatives are held at once
+    _WAVELENGTH_BLOCK_SIZE = 64
+
+    __slots__ = "_simulation"
+
+    def __init__(self, simulation: Simulation):
+        self._simulation = simulation
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(simulation={self._simulation!r})"
+
+    def __str__(self):
+        return (
+            f"--- Sensitivity Analysis ---\n"
+            f"  Tunable Parameters: {len(self._get_parameter_refs(self._simulation.compiled_circuit, None))}"
+        )
+
+    @property
+    def simulation(self) -> Simulation:
+        return self._simulation
+
+    def get_sensitivities(self, wavelengths: NDArray[np.float64],
+                          parameters: Optional[MutableSequence[str]] = None) -> SensitivityResult:
+        """Gets the external S matrices of the circuit and their derivatives with respect to
+        tunable parameters of its components.
+
+        :param wavelengths: Array of wavelength values at which the photonic circuit is analysed
+        :type wavelengths: np.ndarray[np.float64]
+        :param parameters: Labels of the parameters, 'component_name.parameter_name'. Defaults to
+            None, which analyses every numeric tunable parameter of every simulated component
+        :type parameters: Optional[MutableSequence[str]]
+        :raises MissingComponentException: A label refers to a component that is not in the circuit
+        :raises MissingParameterException: A label refers to a parameter that is not tunable or
+            not numeric
+        :return: The external S matrices and their derivatives
+        :rtype: SensitivityResult
+        """
+
+        photonic_circuit = self._simulation._photonic_circuit
+        if len(photonic_circuit._circuit_inputs) == 0 or len(photonic_circuit._circuit_outputs) == 0:
+            raise EmptyInterfaceException(photonic_circuit)
+
+        compiled_circuit = self._simulation.compiled_circuit
+        compiled_circuit.refresh()
+        parameter_refs = self._get_parameter_refs(compiled_circuit, parameters)
+
+        wavelengths = np.asarray(wavelengths, dtype=float)
+        num_output_states = len(compiled_circuit._output_indices)
+        num_input_states = len(compiled_circuit._input_indices)
+        s_parameters = np.empty((len(wavelengths), num_output_states, num_input_states), dtype=complex)
+        derivatives = np.zeros((len(wavelengths), len(parameter_refs), num_output_states, num_input_states),
+                               dtype=complex)
+
+        # position of every state in elimination order
+        num_states = len(compiled_circuit._elimination_order)
+        positions = np.empty(num_states, dtype=np.int64)
+        positions[compiled_circuit._elimination_order] = np.arange(num_states)
+
+        for block_start in range(0, len(wavelengths), self._WAVELENGTH_BLOCK_SIZE):
+            block_wavelengths = wavelengths[block_start:block_start + self._WAVELENGTH_BLOCK_SIZE]
+            component_matrix_batches = self._simulation._get_component_matrix_batches(compiled_circuit._components,
+                                                                                      block_wavelengths)
+            s_matrix_data = np.concatenate([batch.reshape(len(block_wavelengths), -1)
+                                            for batch in component_matrix_batches], axis=1)
+            derivative_groups = self._get_s_matrix_derivatives(compiled_circuit, parameter_refs, block_wavelengths)
+
+            for wavelength_index in range(len(block_wavelengths)):
+                transfer_matrix, adjoint_rows, incident_waves = self._solve_adjoint_system(
+                    compiled_circuit, s_matrix_data[wavelength_index], positions)
+                s_parameters[block_start + wavelength_index] = transfer_matrix
+
+                for parameter_indices, states, s_matrix_derivatives in derivative_groups:
+                    derivatives[block_start + wavelength_index, parameter_indices] = np.einsum(
+                        "kpa,pab,pbi->pki", adjoint_rows[:, states], s_matrix_derivatives[:, wavelength_index],
+                        incident_waves[states], optimize=True)
+
+        return SensitivityResult(photonic_circuit,
+                                 parameters=[f"{component._name}.{name}" for component, name in parameter_refs],
+                                 input_ports=compiled_circuit._input_ports,
+                                 output_ports=compiled_circuit._output_ports,
+                                 wavelengths=wavelengths, s_parameters=s_parameters, derivatives=derivatives)
+
+    def _get_parameter_refs(self, compiled_circuit: CompiledCircuit, parameters: Optional[MutableSequence[str]]
+                            ) -> MutableSequence[tuple[Component, str]]:
+        """Resolves the labels of parameters to their components and names. Helper function.
+
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param parameters: Labels of the parameters, or None for every numeric tunable parameter
+            of every simulated component
+        :type parameters: Optional[MutableSequence[str]]
+        :return: The component and name of every parameter
+        :rtype: MutableSequence[tuple[Component, str]]
+        """
+
+        from ..circuit.circuit_exceptions import MissingParameterException
+
+        if parameters is None:
+            return [(component, name) for component in compiled_circuit._get_plan_indices()
+                    for name in component._PARAMETERS if self._is_numeric(component.get_parameter(name))]
+
+        parameter_refs = []
+        for label in parameters:
+            component, name = self._simulation._get_parameter_ref(label)
+            if not self._is_numeric(component.get_parameter(name)):
+                raise MissingParameterException(component, name, f"{label} is not numeric, so it has no derivative")
+            parameter_refs.append((component, name))
+        return parameter_refs
+
+    def _get_s_matrix_derivatives(self, compiled_circuit: CompiledCircuit,
+                                  parameter_refs: MutableSequence[tuple[Component, str]],
+                                  wavelengths: NDArray[np.float64]
+                                  ) -> MutableSequence[tuple[NDArray[np.int64], NDArray[np.int64], NDArray[np.complex128]]]:
+        """Gets the derivatives of the S matrices of the plan's components with respect to every
+        parameter, grouped by the size of the S matrices. A parameter of a component in a
+        sequential chain changes the condensed S matrix of the whole chain, whose derivative is
+        taken with the rest of the chain held fixed. Parameters of components that are not
+        simulated have no effect and are left out. Helper function.
+
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param parameter_refs: The component and name of every parameter
+        :type parameter_refs: MutableSequence[tuple[Component, str]]
+        :param wavelengths: Wavelengths of the light going through the components
+        :type wavelengths: NDArray[np.float64]
+        :return: For every size of S matrix, the indices of its parameters, the global states of
+            their plan components with shape (P, 2N), and the derivatives with shape (P, W, 2N, 2N)
+        :rtype: MutableSequence[tuple[NDArray[np.int64], NDArray[np.int64], NDArray[np.complex128]]]
+        """
+
+        component_indices = compiled_circuit._get_plan_indices()
+        chain_contexts: MutableMapping[Component, tuple[NDArray[np.complex128], NDArray[np.complex128]]] = {}
+        groups: MutableMapping[int, tuple[list, list, list]] = {}
+
+        for parameter_index, (component, name) in enumerate(parameter_refs):
+            if component not in component_indices:
+                continue
+            component_index = component_indices[component]
+            plan_component = compiled_circuit._components[component_index]
+
+            # the trial step is rescaled so that the S matrix changes by a fixed amount, which
+            # balances the truncation and rounding errors whatever the parameter's scale. A
+            # detached copy is stepped, so that other simulations of the circuit never see the
+            # stepped values
+            value = component.get_parameter(name)
+            scale = abs(value) if value != 0 else 1
+            step = self._FINITE_DIFFERENCE_STEP*scale
+            stepped_component = component._get_detached_copy()
+            forward_s_matrices, backward_s_matrices = self._get_stepped_s_matrices(stepped_component, name, value,
+                                                                                   step, wavelengths)
+            s_matrix_change = np.abs(forward_s_matrices - backward_s_matrices).max() / 2
+
+            # a step that rounds away inside the component is grown until it is resolved, while the
+            # stepped values stay close to the parameter's value
+            while s_matrix_change == 0 and step*self._STEP_GROWTH <= self._MAX_FINITE_DIFFERENCE_STEP*scale:
+                step *= self._STEP_GROWTH
+                forward_s_matrices, backward_s_matrices = self._get_stepped_s_matrices(stepped_component, name,
+                                                                                       value, step, wavelengths)
+                s_matrix_change = np.abs(forward_s_matrices - backward_s_matrices).max() / 2
+
+            if s_matrix_change > 0:
+                step *= self._TARGET_S_MATRIX_CHANGE / s_matrix_change
+                forward_s_matrices, backward_s_matrices = self._get_stepped_s_matrices(stepped_component, name,
+                                                                                       value, step, wavelengths)
+
+            is_finite = np.isfinite(forward_s_matrices).all() and np.isfinite(backward_s_matrices).all()
+            if not is_finite:
+                warnings.warn(f"The S matrix of {component._name} is not finite around {name} = {value}, so its "
+                              f"derivative is set to NaN.", RuntimeWarning, stacklevel=3)
+
+            # the rest of the chain is combined on either side of the component
+            if isinstance(plan_component, _CondensedComponent):
+                if component not in chain_contexts:
+                    chain_contexts.update(self._get_chain_contexts(compiled_circuit, plan_component._sequential_chain,
+                                                                   wavelengths))
+                prefix, suffix = chain_contexts[component]
+                forward_s_matrices = compiled_circuit._redheffer_star_batch(
+                    compiled_circuit._redheffer_star_batch(prefix, forward_s_matrices), suffix)
+                backward_s_matrices = compiled_circuit._redheffer_star_batch(
+                    compiled_circuit._redheffer_star_batch(prefix, backward_s_matrices), suffix)
+
+            ports = compiled_circuit._component_ports[component_index]
+            states = 2*compiled_circuit._port_to_index[ports[0]] + np.arange(2*len(ports))
+            parameter_indices, group_states, group_derivatives = groups.setdefault(len(states), ([], [], []))
+            parameter_indices.append(parameter_index)
+            group_states.append(states)
+            group_derivatives.append((forward_s_matrices - backward_s_matrices) / (2*step) if is_finite
+                                     else np.full(forward_s_matrices.shape, np.nan, dtype=complex))
+
+        return [(np.array(parameter_indices, dtype=np.int64), np.array(group_states), np.stack(group_derivatives))
+                for parameter_indices, group_states, group_derivatives in groups.values()]
+
+    def _get_stepped_s_matrices(self, component: Component, name: str, value: float, step: float,
+                                wavelengths: NDArray[np.float64]
+                                ) -> tuple[NDArray[np.complex128], NDArray[np.complex128]]:
+        """Gets the S matrices of a component with one of its parameters stepped up and down. The
+        parameter is left at the lower value, so the component is a detached copy. Helper function.
+
+        :param component: The detached component whose parameter is stepped
+        :type component: Component
+        :param name: Name of the parameter
+        :type name: str
+        :param value: The value of the parameter
+        :type value: float
+        :param step: The step of the parameter
+        :type step: float
+        :param wavelengths: Wavelengths of the light going through the component
+        :type wavelengths: NDArray[np.float64]
+        :return: The S matrices at value + step and at value - step, each with shape (W, 2N, 2N)
+        :rtype: tuple[NDArray[np.complex128], NDArray[np.complex128]]
+        """
+
+        component.set_parameter(name, value + step)
+        forward_s_matrices = component.get_s_matrix_batch(wavelengths)
+        component.set_parameter(name, value - step)
+        return forward_s_matrices, component.get_s_matrix_batch(wavelengths)
+
+    def _get_chain_contexts(self, compiled_circuit: CompiledCircuit, sequential_chain: MutableSequence[Component],
+                            wavelengths: NDArray[np.float64]
+                            ) -> MutableMapping[Component, tuple[NDArray[np.complex128], NDArray[np.complex128]]]:
+        """Gets the combined S matrices of the components before and after every component of a
+        sequential chain. Helper function.
+
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param sequential_chain: The chain of sequential components
+        :type sequential_chain: MutableSequence[Component]
+        :param wavelengths: Wavelengths of the light going through the chain
+        :type wavelengths: NDArray[np.float64]
+        :return: Dictionary mapping every component of the chain to the S matrices of the part of
+            the chain before it and after it, each with shape (W, 4, 4)
+        :rtype: MutableMapping[Component, tuple[NDArray[np.complex128], NDArray[np.complex128]]]
+        """
+
+        s_matrices = [component.get_s_matrix_batch(wavelengths) for component in sequential_chain]
+
+        # an empty part of the chain transmits everything and reflects nothing
+        identity = np.zeros((len(wavelengths), 4, 4), dtype=complex)
+        identity[:, 0:2, 2:4] = np.eye(2)
+        identity[:, 2:4, 0:2] = np.eye(2)
+
+        prefixes = [identity]
+        for s_matrix in s_matrices[:-1]:
+            prefixes.append(compiled_circuit._redheffer_star_batch(prefixes[-1], s_matrix))
+        suffixes = [identity]
+        for s_matrix in s_matrices[:0:-1]:
+            suffixes.append(compiled_circuit._redheffer_star_batch(s_matrix, suffixes[-1]))
+
+        return {component: (prefix, suffix)
+                for component, prefix, suffix in zip(sequential_chain, prefixes, reversed(suffixes))}
+
+    def _solve_adjoint_system(self, compiled_circuit: CompiledCircuit, s_matrix_data: NDArray[np.complex128],
+                              positions: NDArray[np.int64]
+                              ) -> tuple[NDArray[np.complex128], NDArray[np.complex128], NDArray[np.complex128]]:
+        """Solves the global system (I - SC) y = S a_ext for the circuit inputs, and its transpose
+        for the circuit outputs, from one factorization of the eliminated block. With M ordered
+        as the eliminated states R and the kept output states K, the rows of M^-1 that belong to
+        the output states are
+
+            [-Sc^-1 M_KR M_RR^-1, Sc^-1],  Sc = M_KK - M_KR M_RR^-1 M_RK
+
+        and M_KR M_RR^-1 is one transposed solve with one right-hand side per output state.
+        Helper function.
+
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param s_matrix_data: The entries of every component's modified S matrix, concatenated
+            in plan order
+        :type s_matrix_data: NDArray[np.complex128]
+        :param positions: Position of every state in elimination order
+        :type positions: NDArray[np.int64]
+        :return: The external S matrix with shape (2*num_outputs, 2*num_inputs), the output rows
+            of M^-1 with one column per state, and the incident waves C y + a_ext of every state
+            with one column per input state
+        :rtype: tuple[NDArray[np.complex128], NDArray[np.complex128], NDArray[np.complex128]]
+        """
+
+        system_assembly = compiled_circuit._system_assembly
+        num_eliminated = compiled_circuit._num_eliminated
+
+        M_KK = system_assembly.M_KK.assemble(s_matrix_data)
+        B_K = system_assembly.B_K.assemble(s_matrix_data)
+        M_KR = system_assembly.M_KR.assemble(s_matrix_data)
+        if num_eliminated > 0:
+            M_RR = system_assembly.M_RR.assemble(s_matrix_data)
+            solve = Simulation._factorize(M_RR, Simulation._select_solver(M_RR, self._simulation._get_solver_profile()))
+            eliminated_solution = solve(np.hstack((system_assembly.M_RK.assemble(s_matrix_data),
+                                                   system_assembly.B_R.assemble(s_matrix_data))))
+            adjoint_solution = solve(M_KR.T.toarray(), trans="T").T
+        else:
+            eliminated_solution = np.zeros((0, M_KK.shape[0] + B_K.shape[1]), dtype=complex)
+            adjoint_solution = np.zeros((M_KK.shape[0], 0), dtype=complex)
+
+        num_kept = M_KK.shape[0]
+        inverse_schur_complement = np.linalg.inv(M_KK - M_KR @ eliminated_solution[:, :num_kept])
+        transfer_matrix = inverse_schur_complement @ (B_K - M_KR @ eliminated_solution[:, num_kept:])
+
+        # both solutions are reordered from elimination order to global state order
+        solution = np.vstack((eliminated_solution[:, num_kept:] - eliminated_solution[:, :num_kept] @ transfer_matrix,
+                              transfer_matrix))[positions]
+        adjoint_rows = np.hstack((-inverse_schur_complement @ adjoint_solution, inverse_schur_complement))[:, positions]
+
+        incident_waves = compiled_circuit._connectivity_matrix @ solution
+        incident_waves[compiled_circuit._input_indices, np.arange(len(compiled_circuit._input_indices))] += 1
+        return transfer_matrix, adjoint_rows, incident_waves
+
+    def _is_numeric(self, value: object) -> bool:
+        """Checks if the value of a parameter is a real number. Helper function.
+
+        :param value: The value of the parameter
+        :type value: object
+        :return: Whether the parameter can be differentiated
+        :rtype: bool
+        """
+
+        return isinstance(value, Real) and not isinstance(value, bool)
@@ -1,25 +1,42 @@
-from collections import defaultdict
-from collections.abc import MutableMapping, MutableSequence
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator, Mapping, MutableMapping, MutableSequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import replace
 from enum import Enum
+from itertools import islice, repeat
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter
+from typing import Literal, Optional
 import numpy as np
-from typing import Annotated, Literal
 from numpy.typing import NDArray
-from scipy.sparse import block_diag, csr_matrix, csc_matrix, coo_matrix, linalg, eye
-from .simulation_exceptions import EmptyInterfaceException
-from ..models.light import Coherence, CoherentLight, IncoherentLight
-from ..circuit.components.condensed_component import _CondensedComponent
-from ..models.port import InputConnection, OutputConnection, Port, PortConnection, PortType
+from scipy.linalg import lu_factor, lu_solve
+from scipy.sparse import csc_matrix, linalg
+from .compiled_circuit import CompiledCircuit
+from .iterative_solver import _IterativeSolver
+from .solver_options import SolverChoice, SolverOptions
+from .solver_profile import SolverProfile
+from .simulation_stats import SimulationEvent, SimulationPhase, SimulationStats
+from .simulation_exceptions import EmptyInterfaceException, InapplicableSolverException
+from ..models.light import Coherence
+from ..models.port import Port
 from ..circuit.photonic_circuit import PhotonicCircuit
 from ..circuit.component import Component
+from ..circuit.components.condensed_component import _CondensedComponent
 from ..models.simulation_result import SimulationResult
-import copy
+from ..models.sweep_result import SweepResult
 
 class MatrixSolver(Enum):
-    """Represents two different types of matrix solving algorithm types
+    """Represents the different types of matrix solving algorithm types. DENSE and SPARSE
+    factorize every system directly, while ITERATIVE solves very large systems with a
+    preconditioned Krylov method, warm-started from the previous wavelength's solution.
+    FEED_FORWARD solves no system, and propagates the inputs through the components of an
+    acyclic circuit without reflections in order.
     """
     
     DENSE = 0
     SPARSE = 1
+    ITERATIVE = 2
+    FEED_FORWARD = 3
     
     def __repr__(self):
         return f"<MatrixSolver.{self.name}: {self.value}>"
@@ -28,29 +45,67 @@ class MatrixSolver(Enum):
         return f"{self.name} Solver"
     
 class Simulation:
-    """Simulates a photonic circuit.
+    """Simulates a photonic circuit. Disconnected parts of the circuit are solved independently,
+    and when an executor is given, on its workers, split into chunks of wavelengths. Thread pools
+    work well when the linear algebra dominates, since it releases the GIL. Process pools are
+    also supported, as the partitions are sent to the workers without the circuit's components,
+    and the workers write their external S matrices straight into shared memory.
     
     :param photonic_circuit: The photonic circuit to be simulated
     :type photonic_circuit: PhotonicCircuit
+    :param executor: Executor that the parts of the circuit and chunks of wavelengths are solved
+        on, defaults to None, which solves them one after another
+    :type executor: Optional[Executor]
+    :param solver_profile: Calibrated cost model that selects the matrix solvers, defaults to
+        None, which uses the default profile file if there is one, and fixed size and density
+        thresholds otherwise
+    :type solver_profile: Optional[SolverProfile]
+    :param event_callback: Function called with every measured step of a simulation's phases,
+        defaults to None. The totals of every call are kept in stats either way
+    :type event_callback: Optional[Callable[[SimulationEvent], None]]
     """
     
-    # 4x4 complex ndarray type used for type hinting
-    SMatrix4x4 = Annotated[NDArray[np.complex128], Literal[4, 4]]
-    
     _COMPLEX_SIZE_BYTES = 16
+    _INDEX_SIZE_BYTES = 4
     _GB_TO_BYTES = 1024 ** 3
     _DENSE_DOMAIN_SIZE = 1000
     _MEMORY_LIMIT_GB = 8
     _LIMITING_DENSITY = 0.02
+    # amount of eliminated states above which even a sparse factorization takes too much memory
+    _ITERATIVE_DOMAIN_SIZE = 250_000
     
-    _WAVELENGTH_TOLERANCE = 1e-9
+    # amount of excitations propagated together through one external S matrix
+    _RHS_BLOCK_SIZE = 1024
+    # amount of wavelengths that component S matrices are evaluated for at once
+    _WAVELENGTH_BLOCK_SIZE = 1024
+    # amount of external S matrices kept, keyed on wavelength
+    _TRANSFER_MATRIX_CACHE_SIZE = 1024
+    # amount of time values in each chunk of simulate_iter
+    _DEFAULT_CHUNK_SIZE = 65536
+    # amount of memory that the S matrices of the swept components and their updates may take up
+    # for one block of wavelengths during a sweep
+    _SWEEP_MEMORY_BYTES = 256 * 1024 ** 2
+    # amount of states of the swept components up to which grid points are low-rank updates
+    _MAX_SWEEP_UPDATE_RANK = 64
+    # amount of wavelengths that each task on the executor solves
+    _PARALLEL_CHUNK_SIZE = 16
     
-    _DUMMY_WAVELENGTH = 1
     
-    __slots__ = "_photonic_circuit",
+    __slots__ = "_photonic_circuit", "_compiled_circuit", "_executor", "_solver_profile", "_thread_pools", \
+        "_solver_choices", "_event_callback", "_stats"
     
-    def __init__(self, photonic_circuit: PhotonicCircuit):
+    def __init__(self, photonic_circuit: PhotonicCircuit, *, executor: Optional[Executor] = None,
+                 solver_profile: Optional[SolverProfile] = None,
+                 event_callback: Optional[Callable[[SimulationEvent], None]] = None):
         self._photonic_circuit = photonic_circuit
+        self._compiled_circuit = None
+        self._executor = executor
+        self._solver_profile = solver_profile
+        # thread pools of the calls that set their own amount of threads, keyed by that amount
+        self._thread_pools = {}
+        self._solver_choices = []
+        self._event_callback = event_callback
+        self._stats = SimulationStats()
         
     def __repr__(self):
         return f"Simulation(photonic_circuit={self._photonic_circuit!r})"
@@ -76,7 +131,60 @@ class Simulation:
     def photonic_circuit(self):
         return self._photonic_circuit
         
-    def simulate(self, times: NDArray[np.float64]) -> SimulationResult:
+    @property
+    def executor(self) -> Optional[Executor]:
+        return self._executor
+    
+    @executor.setter
+    def executor(self, executor: Optional[Executor]) -> None:
+        self._executor = executor
+    
+    @property
+    def solver_profile(self) -> Optional[SolverProfile]:
+        return self._solver_profile
+    
+    @solver_profile.setter
+    def solver_profile(self, solver_profile: Optional[SolverProfile]) -> None:
+        self._solver_profile = solver_profile
+    
+    @property
+    def solver_choices(self) -> MutableSequence[SolverChoice]:
+        """The solvers that the last call of simulate, simulate_iter or get_s_parameters chose for
+        every partition of the circuit, at its first wavelength.
+        """
+        
+        return self._solver_choices
+    
+    @property
+    def event_callback(self) -> Optional[Callable[[SimulationEvent], None]]:
+        return self._event_callback
+    
+    @event_callback.setter
+    def event_callback(self, event_callback: Optional[Callable[[SimulationEvent], None]]) -> None:
+        self._event_callback = event_callback
+    
+    @property
+    def stats(self) -> SimulationStats:
+        """The wall times, call counts, matrix sizes and memory estimates of every phase of the
+        last call of simulate, simulate_iter or get_s_parameters. For simulate_iter, these are the
+        stats of the last chunk.
+        """
+        
+        return self._stats
+        
+    @property
+    def compiled_circuit(self) -> CompiledCircuit:
+        """The simulation plan of the photonic circuit. Compiled on first use and recompiled only
+        when the circuit's topology changes.
+        """
+        
+        if self._compiled_circuit is None or self._compiled_circuit.is_stale():
+            self._compiled_circuit = CompiledCircuit(self._photonic_circuit)
+        return self._compiled_circuit
+        
+    def simulate(self, times: NDArray[np.float64],
+                 incoherent_mode: Literal["jones", "coherency"] = "jones", *,
+                 solver_options: Optional[SolverOptions] = None) -> SimulationResult:
         """Simulates a photonic circuit. The algorithm first simplifies chains of sequential
         components (components with one input port and one output port) into single components
         using the Redheffer Star operation. Afterwards, the whole simplified circuit is solved
@@ -84,281 +192,310 @@ class Simulation:
         
         :param times: Array of time values at which the photonic circuit is simulated
         :type times: np.ndarray[np.float64]
-        :return: List of Light states corresponding to the time array
+        :param incoherent_mode: How incoherent light states are stored. 'jones' keeps the Jones
+            vector contributed by every source, while 'coherency' sums the sources into one 2x2
+            coherency matrix per state, whose size does not grow with the amount of sources.
+            Unused for coherent light. Defaults to 'jones'
+        :type incoherent_mode: Literal['jones', 'coherency']
+        :param solver_options: Options of the matrix solvers, which are recorded with the chosen
+            solvers on the result, defaults to None, which selects the solvers automatically
+        :type solver_options: Optional[SolverOptions]
+        :return: Light states at every output corresponding to the time array
         :rtype: SimulationResult
         """
         
+        stats = SimulationStats(self._event_callback)
+        compiled_circuit, coherence = self._prepare_simulation(incoherent_mode, stats)
+        
+        return self._simulate_times(compiled_circuit, coherence, np.asarray(times, dtype=float),
+                                    OrderedDict(), incoherent_mode, self._resolve_solver_options(solver_options), stats)
+    
+    def simulate_iter(self, times: Iterable[float], chunk_size: int = _DEFAULT_CHUNK_SIZE,
+                      incoherent_mode: Literal["jones", "coherency"] = "jones", *,
+                      solver_options: Optional[SolverOptions] = None) -> Iterator[SimulationResult]:
+        """Simulates a photonic circuit over a time series that is consumed in chunks, yielding
+        the result of every chunk as soon as it is solved. Peak memory is bounded by the chunk
+        size instead of the length of the time series, so the time series can be a generator of
+        any length. The compiled circuit and the external S matrices are shared by all
+        chunks. Changes to component parameters are picked up when a new iterator is created.
+        
+        :param times: Array or iterable of time values at which the photonic circuit is simulated
+        :type times: Iterable[float]
+        :param chunk_size: Maximum amount of time values in each chunk, defaults to 65536
+        :type chunk_size: int
+        :param incoherent_mode: How incoherent light states are stored, as in simulate. Defaults
+            to 'jones'
+        :type incoherent_mode: Literal['jones', 'coherency']
+        :param solver_options: Options of the matrix solvers, as in simulate, defaults to None
+        :type solver_options: Optional[SolverOptions]
+        :return: Iterator over the simulation results of consecutive chunks of the time series
+        :rtype: Iterator[SimulationResult]
+        """
+        
+        if chunk_size < 1:
+            raise ValueError(f"'chunk_size' must be positive, got {chunk_size}.")
+        
+        # validation and compilation happen on the call, not on the first iteration, and are
+        # measured with the first chunk
+        stats = SimulationStats(self._event_callback)
+        compiled_circuit, coherence = self._prepare_simulation(incoherent_mode, stats)
+        
+        return self._iter_chunks(compiled_circuit, coherence, times, chunk_size, incoherent_mode,
+                                 self._resolve_solver_options(solver_options), stats)
+    
+    def _iter_chunks(self, compiled_circuit: CompiledCircuit, coherence: Coherence,
+                     times: Iterable[float], chunk_size: int, incoherent_mode: Literal["jones", "coherency"],
+                     solver_options: SolverOptions, stats: SimulationStats) -> Iterator[SimulationResult]:
+        """Generator behind simulate_iter. Helper function.
+        
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param coherence: The coherence of the circuit's inputs
+        :type coherence: Coherence
+        :param times: Array or iterable of time values at which the photonic circuit is simulated
+        :type times: Iterable[float]
+        :param chunk_size: Maximum amount of time values in each chunk
+        :type chunk_size: int
+        :param incoherent_mode: How incoherent light states are stored
+        :type incoherent_mode: Literal['jones', 'coherency']
+        :param solver_options: Options of the matrix solvers
+        :type solver_options: SolverOptions
+        :param stats: Stats of the first chunk, which hold the compilation of the call
+        :type stats: SimulationStats
+        :return: Iterator over the simulation results of consecutive chunks of the time series
+        :rtype: Iterator[SimulationResult]
+        """
+        
+        transfer_matrices = OrderedDict()
+        
+        # arrays are sliced into views, while other iterables are consumed lazily
+        if isinstance(times, np.ndarray):
+            for chunk_start in range(0, len(times), chunk_size):
+                chunk_times = np.asarray(times[chunk_start:chunk_start + chunk_size], dtype=float)
+                yield self._simulate_times(compiled_circuit, coherence, chunk_times, transfer_matrices,
+                                           incoherent_mode, solver_options, stats)
+                stats = SimulationStats(self._event_callback)
+            return
+        
+        time_iterator = iter(times)
+        while True:
+            chunk_times = np.fromiter(islice(time_iterator, chunk_size), dtype=float)
+            if len(chunk_times) == 0:
+                return
+            yield self._simulate_times(compiled_circuit, coherence, chunk_times, transfer_matrices,
+                                       incoherent_mode, solver_options, stats)
+            stats = SimulationStats(self._event_callback)
+    
+    def _prepare_simulation(self, incoherent_mode: Literal["jones", "coherency"],
+                            stats: Optional[SimulationStats] = None) -> tuple[CompiledCircuit, Coherence]:
+        """Checks the circuit's interface and the simulation options, and gets everything a
+        simulation needs before any time step is solved. Helper function.
+        
+        :param incoherent_mode: How incoherent light states are stored
+        :type incoherent_mode: Literal['jones', 'coherency']
+        :param stats: Stats that the compilation is measured in, defaults to None
+        :type stats: Optional[SimulationStats]
+        :return: The refreshed simulation plan and the coherence of the circuit's inputs
+        :rtype: tuple[CompiledCircuit, Coherence]
+        """
+        
         if len(self._photonic_circuit._circuit_inputs) == 0 or len(self._photonic_circuit._circuit_outputs) == 0:
             raise EmptyInterfaceException(self._photonic_circuit)
+        if incoherent_mode not in ("jones", "coherency"):
+            raise ValueError(f"'incoherent_mode' must be 'jones' or 'coherency', got {incoherent_mode!r}.")
         
-        # copy circuit as to not modify original circuit
-        photonic_circuit = copy.deepcopy(self._photonic_circuit)
+        return self._compile(stats), self._check_coherence(self._photonic_circuit)
+    
+    def _compile(self, stats: Optional[SimulationStats] = None) -> CompiledCircuit:
+        """Gets the simulation plan, compiled if the topology changed and refreshed with the
+        components' current parameters. Helper function.
+        
+        :param stats: Stats that the compilation is measured in, defaults to None
+        :type stats: Optional[SimulationStats]
+        :return: The refreshed simulation plan
+        :rtype: CompiledCircuit
+        """
         
-        coherence = self._check_coherence(photonic_circuit)
+        start = perf_counter()
         
-        simulation_result = SimulationResult(self._photonic_circuit, coherence)
+        # the plan is reused between calls, so the circuit is neither copied nor modified
+        compiled_circuit = self.compiled_circuit
+        compiled_circuit.refresh()
         
-        sequential_paths = self._condense_circuit(photonic_circuit)
-
-        # get port-index maps and number of ports
-        num_ports = 0
-        port_to_index = {}
-        index_to_port = []
-        # inputs indexed first, then outputs
-        for component in photonic_circuit.components:
-            for port in component._ports:
-                port_to_index[port] = num_ports
-                index_to_port.append(port)
-                num_ports += 1
-                
-        # Connectivity matrix
-        connectivity_matrix = self._get_connectivity_matrix(photonic_circuit, num_ports, port_to_index)
-
-        # making the global matrix (I - SC)
-        dimension = connectivity_matrix.shape[0] # S, C, and SC have the same dimensions
-        identity = eye(dimension)
-                        
-        # all sequential paths are identified and condensed with dummy wavelength. Makes rest of algorithm easier
-        # since the structure is simplified and only calues need to be changed
-        # I, C found
-        
-        if coherence == Coherence.COHERENT:         
-            laser = next(iter(photonic_circuit._circuit_inputs.values()))
-            wavelengths = []
-            max_wavelength = laser(times[0])._wavelength
-            min_wavelength = laser(times[0])._wavelength
-            
-            for time in times:
-                new_wavelength = laser(time)._wavelength
-                if new_wavelength > max_wavelength:
-                    max_wavelength = new_wavelength
-                elif new_wavelength < min_wavelength:
-                    min_wavelength = new_wavelength
-                    
-                wavelengths.append(new_wavelength)
-            
-            # check if wavelength is constant
-            constant_wavelength = False
-            if max_wavelength - min_wavelength < self._WAVELENGTH_TOLERANCE:
-                constant_wavelength = True
+        if stats is not None:
+            stats.record(SimulationPhase.COMPILE, perf_counter() - start, dim=2*compiled_circuit._num_ports)
+        return compiled_circuit
+    
+    def _simulate_times(self, compiled_circuit: CompiledCircuit, coherence: Coherence,
+                        times: NDArray[np.float64], transfer_matrices: OrderedDict[float, NDArray],
+                        incoherent_mode: Literal["jones", "coherency"] = "jones",
+                        solver_options: Optional[SolverOptions] = None,
+                        stats: Optional[SimulationStats] = None) -> SimulationResult:
+        """Solves the circuit for an array of times. Helper function.
+        
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param coherence: The coherence of the circuit's inputs
+        :type coherence: Coherence
+        :param times: Array of time values at which the photonic circuit is simulated
+        :type times: np.ndarray[np.float64]
+        :param transfer_matrices: External S matrices memoized by wavelength, shared between
+            calls that solve the same circuit
+        :type transfer_matrices: OrderedDict[float, NDArray]
+        :param incoherent_mode: How incoherent light states are stored, defaults to 'jones'
+        :type incoherent_mode: Literal['jones', 'coherency']
+        :param solver_options: Options of the matrix solvers, defaults to None
+        :type solver_options: Optional[SolverOptions]
+        :param stats: Stats that the phases are measured in, defaults to None, which creates new ones
+        :type stats: Optional[SimulationStats]
+        :return: Light states at every output corresponding to the time array
+        :rtype: SimulationResult
+        """
+        
+        solver_options = self._resolve_solver_options(solver_options)
+        self._solver_choices = []
+        if stats is None:
+            stats = SimulationStats(self._event_callback)
+        self._stats = stats
+        
+        components = compiled_circuit._components
+        output_ports = compiled_circuit._output_ports
+        input_ports = compiled_circuit._input_ports
+        num_times = len(times)
+        num_outputs = len(output_ports)
+        num_sources = len(input_ports)
+        
+        # every laser is evaluated once for the whole time array
+        start = perf_counter()
+        input_jones, input_wavelengths = self._sample_inputs(self._photonic_circuit, times)
+        
+        # Jones vectors of every circuit input, in the order of the external S matrix's columns
+        source_jones = np.empty((num_times, num_sources, 2), dtype=complex)
+        for source_index, circuit_input_port in enumerate(input_ports):
+            source_jones[:, source_index] = input_jones[circuit_input_port]
+        stats.record(SimulationPhase.INPUTS, perf_counter() - start,
+                     memory_bytes=2*source_jones.nbytes + num_sources*times.nbytes)
+        
+        if coherence == Coherence.COHERENT:
+            wavelengths = next(iter(input_wavelengths.values()))
+            if num_times > 0:
+                self._solver_choices = self._get_solver_choices(compiled_circuit, wavelengths[0], solver_options)
             
-            # circuit is condensed
-            # I, C are found
+            # check if wavelength is constant. Only exactly equal wavelengths share a solve, so
+            # that the result of every time step does not depend on the other times it is solved with
+            constant_wavelength = num_times > 0 and bool(np.all(wavelengths == wavelengths[0]))
             
             if constant_wavelength:    
                 wavelength = wavelengths[0]                        
-                # Global S Matrix
-                component_matrices = [component.get_s_matrix(wavelength) for component in photonic_circuit.components]
-                global_s_matrix = block_diag(component_matrices, format = "csr")
-                
-                global_matrix = identity - (global_s_matrix @ connectivity_matrix)
-                
-                # select solver based on matrix density, size, and estimated memory required
-                solver = self._select_solver(global_matrix)
+                output_wavelengths = np.full(num_times, wavelength, dtype=float)
                 
-                for time in times:                    
-                    input_vector = self._get_input_vector(photonic_circuit, global_s_matrix,
-                                                        num_ports, port_to_index, time)
-
-                    if solver == MatrixSolver.DENSE:
-                        # toarray() converts to dense format needed for np.linalg.solve
-                        output_vector = np.linalg.solve(global_matrix.toarray(), input_vector)
-                    elif solver == MatrixSolver.SPARSE:
-                        output_vector = linalg.spsolve(global_matrix, input_vector)
-                    
-                    # recombines each port's H and V state, which is stored separately in the vector
-                    for output_port_index, output_port in enumerate(photonic_circuit._circuit_outputs):
-                        output_index = 2*port_to_index[output_port]
-                        
-                        light = CoherentLight.from_jones(eh=output_vector[output_index],
-                                                ev=output_vector[output_index + 1],
-                                                wavelength=wavelength)
-                                                
-                        simulation_result._port_to_output_lights[
-                            self._photonic_circuit._circuit_outputs[output_port_index]].append(light)
+                # the circuit does not change between time steps, so every time step is a product
+                # with the same external S matrix. Each port's H and V states are interleaved, so
+                # the products reshape into (num_outputs, 2) blocks of Jones vectors
+                transfer_matrix = self._get_transfer_matrix(compiled_circuit, wavelength, transfer_matrices,
+                                                            solver_options, stats)
+                start = perf_counter()
+                output_jones = (source_jones.reshape(num_times, -1) @ transfer_matrix.T) \
+                    .reshape(num_times, num_outputs, 2)
+                stats.record(SimulationPhase.OUTPUTS, perf_counter() - start, memory_bytes=output_jones.nbytes)
             
             else:
-                first_pass = True
-                solver = None
-                for time_index, time in enumerate(times):
-                    wavelength = wavelengths[time_index]
-                    
-                    # Global S Matrix
-                    component_matrices = [component.get_s_matrix(wavelength) for component in photonic_circuit.components]
-                    global_s_matrix = block_diag(component_matrices, format = "csr")
-                    
-                    global_matrix = identity - (global_s_matrix @ connectivity_matrix)
+                output_wavelengths = np.array(wavelengths, dtype=float)
+                output_jones = np.empty((num_times, num_outputs, 2), dtype=complex)
+                
+                for block_start in range(0, len(wavelengths), self._WAVELENGTH_BLOCK_SIZE):
+                    block_wavelengths = wavelengths[block_start:block_start + self._WAVELENGTH_BLOCK_SIZE]
                     
-                    if first_pass:
-                        # select solver based on matrix density, size, and estimated memory required
-                        solver = self._select_solver(global_matrix)
-                        first_pass = False
-                                    
-                    input_vector = self._get_input_vector(photonic_circuit, global_s_matrix,
-                                                        num_ports, port_to_index, time)
-
-                    if solver == MatrixSolver.DENSE:
-                        # toarray() converts to dense format needed for np.linalg.solve
-                        output_vector = np.linalg.solve(global_matrix.toarray(), input_vector)
-                    elif solver == MatrixSolver.SPARSE:
-                        output_vector = linalg.spsolve(global_matrix, input_vector)
+                    # every component's S matrices for the block, evaluated in one call per component
+                    component_matrix_batches = self._get_component_matrix_batches(components, block_wavelengths,
+                                                                                  stats)
+                    transfer_matrices_block = self._get_transfer_matrices(compiled_circuit, component_matrix_batches,
+                                                                          solver_options=solver_options, stats=stats)
                     
-                    # recombines each port's H and V state, which is stored separately in the vector
-                    for output_port_index, output_port in enumerate(photonic_circuit._circuit_outputs):
-                        output_index = 2*port_to_index[output_port]
-                        
-                        light = CoherentLight.from_jones(eh=output_vector[output_index],
-                                                ev=output_vector[output_index + 1],
-                                                wavelength=wavelength)
-                                                
-                        simulation_result._port_to_output_lights[
-                            self._photonic_circuit._circuit_outputs[output_port_index]].append(light)
+                    start = perf_counter()
+                    block_times = slice(block_start, block_start + len(block_wavelengths))
+                    output_jones[block_times] = np.einsum(
+                        "wok,wk->wo", transfer_matrices_block,
+                        source_jones[block_times].reshape(len(block_wavelengths), -1)) \
+                        .reshape(-1, num_outputs, 2)
+                    stats.record(SimulationPhase.OUTPUTS, perf_counter() - start,
+                                 memory_bytes=output_jones[block_times].nbytes)
             
         elif coherence == Coherence.INCOHERENT:
-            constant_wavelength = True
-            input_wavelengths = defaultdict(list)
-            min_wavelength = None
-            max_wavelength = None
+            # every source contributes one coherent part to each output's incoherent light. The
+            # parts are either kept, or summed into coherency matrices as they are solved
+            if incoherent_mode == "coherency":
+                output_coherency = np.zeros((num_times, num_outputs, 2, 2), dtype=complex)
+            else:
+                output_jones = np.empty((num_times, num_outputs, num_sources, 2), dtype=complex)
+            output_wavelengths = np.empty((num_times, num_sources), dtype=float)
             
-            for laser in photonic_circuit._circuit_inputs.values():
-                min_wavelength = laser(times[0])._wavelength
-                max_wavelength = laser(times[0])._wavelength
-                for time in times:
-                    new_wavelength = laser(time)._wavelength
-                    input_wavelengths[laser].append(new_wavelength)
-                    
-                    if new_wavelength > max_wavelength:
-                        max_wavelength = new_wavelength
-                    elif new_wavelength < min_wavelength:
-                        min_wavelength = new_wavelength
-                
-                if constant_wavelength and max_wavelength - min_wavelength > self._WAVELENGTH_TOLERANCE:
-                    constant_wavelength = False
-        
-            global_s_matrix_list = []
-            chain_to_condensed_component = {}
+            for source_index, circuit_input_port in enumerate(input_ports):
+                output_wavelengths[:, source_index] = input_wavelengths[circuit_input_port]
+            
+            # (time, source) pairs are grouped by wavelength, and every group shares one external
+            # S matrix
+            unique_wavelengths, wavelength_indices = np.unique(output_wavelengths, return_inverse=True)
+            if num_times > 0:
+                self._solver_choices = self._get_solver_choices(compiled_circuit, unique_wavelengths[0],
+                                                                solver_options)
+            pair_order = np.argsort(wavelength_indices.ravel(), kind="stable")
+            group_starts = np.searchsorted(wavelength_indices.ravel()[pair_order],
+                                           np.arange(len(unique_wavelengths) + 1))
             
-            if constant_wavelength:
-                first_pass = True
-                solver = None
-                for time in times:
-                    for laser in photonic_circuit._circuit_inputs.values():
-                        wavelength = input_wavelengths[laser][0]
-                        # updates condensed component s matrices
-                        for sequential_path in sequential_paths:
-                            # modify condensed component S matrices for wavelength
-                            condensed_component = chain_to_condensed_component[sequential_path]
-                            condensed_component._s_matrix = self._get_condensed_s_matrix(sequential_path, wavelength)
-                        
-                        # Global S Matrix
-                        component_matrices = [component.get_s_matrix(wavelength) for component in photonic_circuit.components]
-                        
-                        global_s_matrix = block_diag(component_matrices, format = "csr")
-                        global_s_matrix_list.append(global_s_matrix)
-                        
-                        if first_pass:
-                            # evaluate solver with first s matrix, since updated s matrices will only have changed values,
-                            # not changed size/density/memory
-                            # select solver based on matrix density, size, and estimated memory required
-                            solver = self._select_solver(identity - (global_s_matrix @ connectivity_matrix))
-                            first_pass = False
+            for wavelength_index, wavelength in enumerate(unique_wavelengths):
+                transfer_matrix = self._get_transfer_matrix(compiled_circuit, wavelength, transfer_matrices,
+                                                            solver_options, stats)
                 
-                    # make blank incoherent lights for each port
-                    for output_port_index, _ in enumerate(photonic_circuit._circuit_outputs):
-                        simulation_result._port_to_output_lights[
-                            self._photonic_circuit._circuit_outputs[output_port_index]] \
-                            .append(IncoherentLight([]))
-                    for circuit_input_port_index, circuit_input_port in enumerate(photonic_circuit._circuit_inputs):
-                        global_s_matrix = global_s_matrix_list[circuit_input_port_index]
-                        input_vector = self._get_source_input_vector(photonic_circuit,
-                                                                    global_s_matrix,
-                                                                    num_ports, port_to_index,
-                                                                    circuit_input_port, time)
-                        
-                        global_matrix = identity - (global_s_matrix @ connectivity_matrix)
-                        
-                        if solver == MatrixSolver.DENSE:
-                            output_vector = np.linalg.solve(global_matrix.toarray(), input_vector)
-                        elif solver == MatrixSolver.SPARSE:
-                            output_vector = linalg.spsolve(global_matrix, input_vector)
-
-                        # recombines each port's H and V state, which is stored separately in the vector
-                        for output_port_index, output_port in enumerate(photonic_circuit._circuit_outputs):
-                            output_index = 2*port_to_index[output_port]
-                            
-                            light = CoherentLight.from_jones(eh=output_vector[output_index],
-                                                    ev=output_vector[output_index + 1],
-                                                    wavelength=wavelength)
-                                                    
-                            simulation_result._port_to_output_lights[
-                                self._photonic_circuit._circuit_outputs[output_port_index]][-1] \
-                                .coherent_lights.append(light)
+                start = perf_counter()
+                # the H and V columns of every source, with shape (2*num_outputs, num_sources, 2)
+                source_transfer_matrices = transfer_matrix.reshape(2*num_outputs, num_sources, 2)
                 
-            else:
-                first_pass = True
-                solver = None
-                for time_index, time in enumerate(times):
-                    for circuit_input_port, laser in photonic_circuit._circuit_inputs.items():
-                        wavelength = input_wavelengths[laser][time_index]
-                        
-                        for sequential_path in sequential_paths:
-                            # modify condensed component S matrices for wavelength
-                            condensed_component = chain_to_condensed_component[sequential_path]
-                            condensed_component._s_matrix = self._get_condensed_s_matrix(sequential_path, wavelength)
-                        
-                        # Global S Matrix
-                        component_matrices = [component.get_s_matrix(wavelength) for component in photonic_circuit.components]
-                        
-                        global_s_matrix = block_diag(component_matrices, format = "csr")
-                                
-                        global_s_matrix_list.append(global_s_matrix)
+                group_pairs = pair_order[group_starts[wavelength_index]:group_starts[wavelength_index + 1]]
+                for block_start in range(0, len(group_pairs), self._RHS_BLOCK_SIZE):
+                    block_pairs = group_pairs[block_start:block_start + self._RHS_BLOCK_SIZE]
+                    time_indices, source_indices = np.divmod(block_pairs, num_sources)
+                    
+                    # each pair is excited by its own source only
+                    block_jones = np.einsum("obk,bk->bo", source_transfer_matrices[:, source_indices],
+                                            source_jones[time_indices, source_indices]) \
+                        .reshape(-1, num_outputs, 2)
+                    
+                    if incoherent_mode == "coherency":
+                        # a block can hold several sources of the same time step, so the outer
+                        # products are accumulated unbuffered
+                        np.add.at(output_coherency, time_indices,
+                                  block_jones[..., :, None] * block_jones[..., None, :].conj())
+                    else:
+                        output_jones[time_indices, :, source_indices] = block_jones
+                stats.record(SimulationPhase.OUTPUTS, perf_counter() - start,
+                             memory_bytes=len(group_pairs)*2*num_outputs*self._COMPLEX_SIZE_BYTES)
             
-                        if first_pass:
-                            # select solver based on matrix density, size, and estimated memory required
-                            solver = self._select_solver(identity - (global_s_matrix @ connectivity_matrix))
-                            first_pass = False
-                
-                    # make blank incoherent lights for each port
-                    for output_port_index, _ in enumerate(photonic_circuit._circuit_outputs):
-                        simulation_result._port_to_output_lights[
-                            self._photonic_circuit._circuit_outputs[output_port_index]] \
-                            .append(IncoherentLight([]))
-                    for circuit_input_port_index, circuit_input_port in enumerate(photonic_circuit._circuit_inputs):
-                        global_s_matrix = global_s_matrix_list[circuit_input_port_index]
-                        input_vector = self._get_source_input_vector(photonic_circuit, global_s_matrix, 
-                                                                     num_ports, port_to_index,
-                                                                    circuit_input_port, time)
-                        
-                        global_matrix = identity - (global_s_matrix @ connectivity_matrix)
-
-                        if solver == MatrixSolver.DENSE:
-                            output_vector = np.linalg.solve(global_matrix.toarray(), input_vector)
-                        elif solver == MatrixSolver.SPARSE:
-                            output_vector = linalg.spsolve(global_matrix, input_vector)
-                        # recombines each port's H and V state, which is stored separately in the vector
-                        for output_port_index, output_port in enumerate(photonic_circuit._circuit_outputs):
-                            output_index = 2*port_to_index[output_port]
-                            
-                            light = CoherentLight.from_jones(eh=output_vector[output_index],
-                                                    ev=output_vector[output_index + 1],
-                                                    wavelength=wavelength)
-                                                    
-                            simulation_result._port_to_output_lights[
-                                self._photonic_circuit._circuit_outputs[output_port_index]][-1] \
-                                .coherent_lights.append(light)
+            if incoherent_mode == "coherency":
+                return SimulationResult(self._photonic_circuit, coherence, output_ports=output_ports,
+                                        coherency=output_coherency,
+                                        wavelengths=output_wavelengths.mean(axis=1),
+                                        solver_choices=self._solver_choices, stats=stats)
 
-        return simulation_result
+        return SimulationResult(self._photonic_circuit, coherence, output_ports=output_ports,
+                                jones=output_jones, wavelengths=output_wavelengths,
+                                solver_choices=self._solver_choices, stats=stats)
     
-    def get_s_parameters(self, wavelengths: NDArray[np.float64]) -> MutableSequence[NDArray]:
+    def get_s_parameters(self, wavelengths: NDArray[np.float64], *,
+                         solver_options: Optional[SolverOptions] = None) -> MutableSequence[NDArray]:
         """Simulates a photonic circuit's overall S-matrix as a function of wavelength.
         The algorithm first simplifies chains of sequential components (components with one
         input port and one output port) into single components using the Redheffer Star 
-        operation. Afterwards, the whole simplified circuit is represented by a single matrix.
+        operation. Afterwards, every internal port is eliminated from the global system, which
+        leaves the S-matrix between the circuit's inputs and outputs.
         This method assumes that for any time, the wavelength across all inputs is equal and coherent.
         Independent of actual input laser values.
         
         :param wavelengths: Array of wavelength values at which the photonic circuit is simulated
         :type wavelengths: np.ndarray[np.float64]
+        :param solver_options: Options of the matrix solvers, defaults to None, which selects the
+            solvers automatically. The chosen solvers are kept in solver_choices
+        :type solver_options: Optional[SolverOptions]
         :return: List of S-matrices
         :rtype: MutableSequence[NDArray]
         """
@@ -366,430 +503,1025 @@ class Simulation:
         if len(self._photonic_circuit._circuit_inputs) == 0 or len(self._photonic_circuit._circuit_outputs) == 0:
             raise EmptyInterfaceException(self._photonic_circuit)
         
-        # copy circuit as to not modify original circuit
-        photonic_circuit = copy.deepcopy(self._photonic_circuit)
+        stats = SimulationStats(self._event_callback)
+        self._stats = stats
+        compiled_circuit = self._compile(stats)
         
-        S_parameter_list = []
+        wavelengths = np.asarray(wavelengths, dtype=float)
+        solver_options = self._resolve_solver_options(solver_options)
+        self._solver_choices = []
+        if len(wavelengths) > 0:
+            self._solver_choices = self._get_solver_choices(compiled_circuit, wavelengths[0], solver_options)
         
-        self._condense_circuit(photonic_circuit)
+        # every block's S matrices are written in place into one array for all wavelengths
+        s_parameters = np.empty((len(wavelengths), len(compiled_circuit._output_indices),
+                                 len(compiled_circuit._input_indices)), dtype=complex)
         
-        # get port-index maps and number of ports
-        num_ports = 0
-        port_to_index = {}
-        index_to_port = []
-        # inputs indexed first, then outputs
-        for component in photonic_circuit.components:
-            for port in component._ports:
-                port_to_index[port] = num_ports
-                index_to_port.append(port)
-                num_ports += 1
-                
-        # Connectivity matrix
-        connectivity_matrix = self._get_connectivity_matrix(photonic_circuit, num_ports, port_to_index)
-
-        # making the global matrix (I - SC)
-        dimension = connectivity_matrix.shape[0] # S, C, and SC have the same dimensions
-        identity = eye(dimension)
-        
-        first_pass = True
-        solver = None
-        for wavelength in wavelengths:             
-            # Global S Matrix
-            component_matrices = [component.get_s_matrix(wavelength) for component in photonic_circuit.components]
-            global_s_matrix = block_diag(component_matrices, format = "csr")
-                    
-            global_matrix = identity - (global_s_matrix @ connectivity_matrix)
+        for block_start in range(0, len(wavelengths), self._WAVELENGTH_BLOCK_SIZE):
+            block_wavelengths = wavelengths[block_start:block_start + self._WAVELENGTH_BLOCK_SIZE]
             
-            if first_pass:
-                solver = self._select_solver(global_matrix)
-                first_pass = False
+            # every component's S matrices for the block, evaluated in one call per component
+            component_matrix_batches = self._get_component_matrix_batches(compiled_circuit._components,
+                                                                          block_wavelengths, stats)
             
-            if solver == MatrixSolver.DENSE:
-                condensed_matrix = np.linalg.solve(global_matrix.toarray(), global_s_matrix.toarray())
-                photonic_circuit._circuit_inputs
-                
-                # get external interface S matrix
-                input_port_indices = []
-                output_port_indices = []
-                for circuit_input in photonic_circuit._circuit_inputs:
-                    input_port_index = port_to_index[circuit_input]
-                    input_port_indices.append(2*input_port_index)
-                    input_port_indices.append(2*input_port_index + 1)
-                for circuit_output in photonic_circuit._circuit_outputs:
-                    output_port_index = port_to_index[circuit_output]
-                    output_port_indices.append(2*output_port_index)
-                    output_port_indices.append(2*output_port_index + 1)
-
-                S_parameter_list.append(condensed_matrix[np.ix_(output_port_indices, input_port_indices)])
-
-            elif solver == MatrixSolver.SPARSE:
-                condensed_matrix = linalg.spsolve(global_matrix, global_s_matrix).toarray()
-                
-                # get external interface S matrix
-                input_port_indices = []
-                output_port_indices = []
-                for circuit_input in photonic_circuit._circuit_inputs:
-                    input_port_index = port_to_index[circuit_input]
-                    input_port_indices.append(2*input_port_index)
-                    input_port_indices.append(2*input_port_index + 1)
-                for circuit_output in photonic_circuit._circuit_outputs:
-                    output_port_index = port_to_index[circuit_output]
-                    output_port_indices.append(2*output_port_index)
-                    output_port_indices.append(2*output_port_index + 1)
-                    
-                S_parameter_list.append(condensed_matrix[np.ix_(output_port_indices, input_port_indices)])
+            self._get_transfer_matrices(compiled_circuit, component_matrix_batches,
+                                        out=s_parameters[block_start:block_start + len(block_wavelengths)],
+                                        solver_options=solver_options, stats=stats)
         
-        return S_parameter_list
-            
+        return list(s_parameters)
+    
+    def sweep(self, parameters: Mapping[str, Iterable], wavelengths: NDArray[np.float64]) -> SweepResult:
+        """Simulates a photonic circuit's overall S-matrix on the grid spanned by values of
+        component parameters, crossed with wavelengths. The circuit is compiled once for the whole
+        grid. A component's S matrices only depend on its own swept parameters, so they are
+        evaluated once for every combination of their values, in batch over the wavelengths.
+        When the swept components have few states, the global system is factorized once per
+        wavelength and every grid point is a low-rank update of it, solved for the whole grid at
+        once. Otherwise, the global system is solved again at every grid point. The swept values
+        are set on copies of the components, so the circuit's own components never change.
+        
+        :param parameters: Values of every swept parameter, keyed by the label
+            'component_name.parameter_name'. Each parameter is one axis of the grid, in the order
+            of the mapping. A parameter without values gives an empty grid
+        :type parameters: Mapping[str, Iterable]
+        :param wavelengths: Array of wavelength values at which the photonic circuit is simulated
+        :type wavelengths: np.ndarray[np.float64]
+        :raises MissingComponentException: A label refers to a component that is not in the circuit
+        :raises MissingParameterException: A label refers to a parameter that is not tunable
+        :return: The S-matrices at every point of the grid
+        :rtype: SweepResult
+        """
         
+        if len(self._photonic_circuit._circuit_inputs) == 0 or len(self._photonic_circuit._circuit_outputs) == 0:
+            raise EmptyInterfaceException(self._photonic_circuit)
         
+        compiled_circuit = self.compiled_circuit
+        compiled_circuit.refresh()
+        
+        parameter_refs = [self._get_parameter_ref(label) for label in parameters]
+        axis_values = [list(values) for values in parameters.values()]
+        grid_shape = tuple(len(values) for values in axis_values)
+        wavelengths = np.asarray(wavelengths, dtype=float)
+        
+        # axes that every plan component depends on. Components that are not simulated, such as
+        # disconnected ones, have no effect
+        plan_indices = compiled_circuit._get_plan_indices()
+        component_axes: MutableMapping[int, MutableSequence[int]] = {}
+        for axis, (component, _) in enumerate(parameter_refs):
+            if component in plan_indices:
+                component_axes.setdefault(plan_indices[component], []).append(axis)
+        
+        s_parameters = np.empty(grid_shape + (len(wavelengths), len(compiled_circuit._output_indices),
+                                              len(compiled_circuit._input_indices)), dtype=complex)
+        sweep_result = SweepResult(self._photonic_circuit, parameters=list(parameters), values=axis_values,
+                                   input_ports=compiled_circuit._input_ports,
+                                   output_ports=compiled_circuit._output_ports,
+                                   wavelengths=wavelengths, s_parameters=s_parameters)
+        
+        # a grid with an empty axis has no points
+        if 0 in grid_shape:
+            return sweep_result
+        
+        # every swept plan component is evaluated from detached copies of its components, so that
+        # simulations running alongside the sweep never see the swept values. A swept chain is
+        # condensed again from copies of all of its components
+        detached_components = {}
+        swept_members: MutableMapping[int, MutableSequence[Component]] = {}
+        for component_index in component_axes:
+            plan_component = compiled_circuit._components[component_index]
+            members = plan_component._sequential_chain if isinstance(plan_component, _CondensedComponent) \
+                else [plan_component]
+            swept_members[component_index] = [member._get_detached_copy() for member in members]
+            detached_components.update(zip(members, swept_members[component_index]))
+        swept_refs = [(detached_components.get(component), name) for component, name in parameter_refs]
+        
+        # the S matrices of every swept component for every combination of its own values are
+        # held for a block of wavelengths at once
+        update_rank = sum(2*len(compiled_circuit._component_ports[component_index])
+                          for component_index in component_axes)
+        swept_matrix_bytes = sum(
+            int(np.prod([grid_shape[axis] for axis in axes])) * (2*len(compiled_circuit._component_ports[component_index]))**2
+            for component_index, axes in component_axes.items()) * self._COMPLEX_SIZE_BYTES
+        
+        for block_start in range(0, len(wavelengths), self._WAVELENGTH_BLOCK_SIZE):
+            block_wavelengths = wavelengths[block_start:block_start + self._WAVELENGTH_BLOCK_SIZE]
+            block = slice(block_start, block_start + len(block_wavelengths))
             
-    def _find_sequential_chain(self, component: Component,
-                               anchor_components: MutableSequence[Component]) -> MutableSequence[Component]:
-        """Identifies chains of sequential components starting at one component (typically ones
-        connected to outputs of anchor components) and ending at an anchor component (in-degree
-        != 1 or out-degree != 1). Helper function.
-        
-        :param component: The component that the search starts at (inclusive)
-        :type component: Component
-        :param anchor_components: List of all anchor components
-        :type anchor_components: MutableSequence[Component]
-        """
-        
-        sequential_components = []
-        current_component = component
-        while current_component not in anchor_components:
-            sequential_components.append(current_component)
-            # if sequential, there will only be one output port: _ports[1]
-            current_connection = current_component._ports[1]._connection
-            if isinstance(current_connection, PortConnection):
-                current_component = current_connection.port._component
-            else: # no connection (None) or circuit output (OutputConnection)
-                return sequential_components
-        return sequential_components
-    
-    def _condense_sequential_chain_incoherent(self, photonic_circuit: PhotonicCircuit, 
-                                  sequential_chain: MutableSequence[Component],
-                                  wavelength: float,
-                                  chain_to_condensed_component:
-                                  MutableMapping[MutableSequence[Component], _CondensedComponent]) -> None:
-        """Replaces a sequential chain with a condensed component that represents
-        the entire chain. For incoherent light (updates dictionary for incoherent simulation)
+            if 0 < update_rank <= self._MAX_SWEEP_UPDATE_RANK \
+                and swept_matrix_bytes*len(block_wavelengths) <= self._SWEEP_MEMORY_BYTES:
+                self._sweep_updates(compiled_circuit, swept_refs, axis_values, component_axes, swept_members,
+                                    block_wavelengths, s_parameters[..., block, :, :])
+            else:
+                self._sweep_solves(compiled_circuit, swept_refs, axis_values, component_axes, swept_members,
+                                   block_wavelengths, s_parameters[..., block, :, :])
+        
+        return sweep_result
+    
+    def _sweep_solves(self, compiled_circuit: CompiledCircuit, parameter_refs: MutableSequence[tuple[Component, str]],
+                      axis_values: MutableSequence[MutableSequence], component_axes: MutableMapping[int, MutableSequence[int]],
+                      swept_members: MutableMapping[int, MutableSequence[Component]],
+                      wavelengths: NDArray[np.float64], s_parameters: NDArray[np.complex128]) -> None:
+        """Sweeps a block of wavelengths by solving the global system at every grid point. The S
+        matrices of the swept components are memoized on the grid indices of their own axes.
         Helper function.
         
-        :param photonic_circuit: The photonic_circuit that the chain is found in
-        :type photonic_circuit: PhotonicCircuit
-        :param sequential_chain: The chain of sequential components to be condensed
-        :type sequential_chain: MutableSequence[Component]
-        :param wavelength: The wavelength of the light going through the sequential chain
-        :type wavelength: float
-        :param chain_to_condensed_component: Dictionary that maps sequential chains to the
-            condensed component that replace them
-        :type chain_to_condensed_component: MutableMapping[MutableSequence[Component], 
-            _CondensedComponent]
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param parameter_refs: The detached component and name of every swept parameter
+        :type parameter_refs: MutableSequence[tuple[Component, str]]
+        :param axis_values: The values of every swept parameter
+        :type axis_values: MutableSequence[MutableSequence]
+        :param component_axes: The swept axes of every plan component that depends on them
+        :type component_axes: MutableMapping[int, MutableSequence[int]]
+        :param swept_members: Detached copies of the components of every swept plan component
+        :type swept_members: MutableMapping[int, MutableSequence[Component]]
+        :param wavelengths: The wavelengths of the block
+        :type wavelengths: NDArray[np.float64]
+        :param s_parameters: The S-matrices of the block, filled in place, with shape
+            (*grid_shape, len(wavelengths), 2*num_outputs, 2*num_inputs)
+        :type s_parameters: NDArray[np.complex128]
         """
         
-        condensed_component = self._condense_sequential_chain_coherent(photonic_circuit,
-                                                                       sequential_chain,
-                                                                       wavelength)
+        grid_shape = s_parameters.shape[:len(axis_values)]
+        component_matrix_batches = self._get_component_matrix_batches(compiled_circuit._components, wavelengths)
+        
+        # the least recently used S matrices are evicted first
+        swept_matrix_batches = {component_index: OrderedDict() for component_index in component_axes}
+        
+        for grid_index in np.ndindex(grid_shape):
+            for component_index, axes in component_axes.items():
+                key = tuple(grid_index[axis] for axis in axes)
+                matrix_batches = swept_matrix_batches[component_index]
+                if key in matrix_batches:
+                    matrix_batches.move_to_end(key)
+                else:
+                    matrix_batches[key] = self._get_swept_matrix_batch(compiled_circuit, component_index,
+                                                                       swept_members[component_index], axes, key,
+                                                                       parameter_refs, axis_values, wavelengths)
+                    if len(matrix_batches)*matrix_batches[key].nbytes > self._SWEEP_MEMORY_BYTES:
+                        matrix_batches.popitem(last=False)
+                component_matrix_batches[component_index] = matrix_batches[key]
+            
+            s_parameters[grid_index] = self._get_transfer_matrices(compiled_circuit, component_matrix_batches)
+    
+    def _sweep_updates(self, compiled_circuit: CompiledCircuit, parameter_refs: MutableSequence[tuple[Component, str]],
+                       axis_values: MutableSequence[MutableSequence], component_axes: MutableMapping[int, MutableSequence[int]],
+                       swept_members: MutableMapping[int, MutableSequence[Component]],
+                       wavelengths: NDArray[np.float64], s_parameters: NDArray[np.complex128]) -> None:
+        """Sweeps a block of wavelengths by factorizing the global system once per wavelength, at
+        the current parameters. Every grid point only changes the S matrices of the swept
+        components, which is a low-rank update of the factorized system, so the whole grid is
+        solved with the Woodbury identity in batches of small systems. Helper function.
+        
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param parameter_refs: The detached component and name of every swept parameter
+        :type parameter_refs: MutableSequence[tuple[Component, str]]
+        :param axis_values: The values of every swept parameter
+        :type axis_values: MutableSequence[MutableSequence]
+        :param component_axes: The swept axes of every plan component that depends on them
+        :type component_axes: MutableMapping[int, MutableSequence[int]]
+        :param swept_members: Detached copies of the components of every swept plan component
+        :type swept_members: MutableMapping[int, MutableSequence[Component]]
+        :param wavelengths: The wavelengths of the block
+        :type wavelengths: NDArray[np.float64]
+        :param s_parameters: The S-matrices of the block, filled in place, with shape
+            (*grid_shape, len(wavelengths), 2*num_outputs, 2*num_inputs)
+        :type s_parameters: NDArray[np.complex128]
+        """
         
-        # for backtracking for incoherent light
-        chain_to_condensed_component[sequential_chain] = condensed_component
+        from .incremental_simulation import IncrementalSimulation
+        
+        grid_shape = s_parameters.shape[:len(axis_values)]
+        num_wavelengths = len(wavelengths)
+        component_matrix_batches = self._get_component_matrix_batches(compiled_circuit._components, wavelengths)
+        s_matrix_data = np.concatenate([batch.reshape(num_wavelengths, -1) for batch in component_matrix_batches],
+                                       axis=1)
+        
+        # the changes of every swept component's S matrices from the current ones, for every
+        # combination of the values of its own axes, and the combination at every grid point
+        swept_components = sorted(component_axes)
+        grid_indices = np.indices(grid_shape).reshape(len(grid_shape), -1)
+        s_matrix_changes = []
+        key_indices = []
+        for component_index in swept_components:
+            axes = component_axes[component_index]
+            axes_shape = tuple(grid_shape[axis] for axis in axes)
+            s_matrix_changes.append(np.stack([
+                self._get_swept_matrix_batch(compiled_circuit, component_index, swept_members[component_index], axes,
+                                             key, parameter_refs, axis_values, wavelengths)
+                - component_matrix_batches[component_index]
+                for key in np.ndindex(axes_shape)]))
+            key_indices.append(np.ravel_multi_index(grid_indices[axes], axes_shape))
+        
+        update_rank = sum(change.shape[-1] for change in s_matrix_changes)
+        batch_size = max(1, self._SWEEP_MEMORY_BYTES // (update_rank**2 * self._COMPLEX_SIZE_BYTES))
+        grid_s_parameters = s_parameters.reshape((-1,) + s_parameters.shape[len(grid_shape):])
+        
+        for wavelength_index, wavelength in enumerate(wavelengths):
+            incremental_simulation = IncrementalSimulation._from_s_matrix_data(self, wavelength,
+                                                                               s_matrix_data[wavelength_index])
+            
+            for batch_start in range(0, grid_indices.shape[1], batch_size):
+                batch = slice(batch_start, batch_start + batch_size)
+                num_points = len(grid_indices[0, batch])
+                
+                # the swept components' changes are the blocks on the diagonal
+                update = np.zeros((num_points, update_rank, update_rank), dtype=complex)
+                offset = 0
+                for s_matrix_change, component_key_indices in zip(s_matrix_changes, key_indices):
+                    num_states = s_matrix_change.shape[-1]
+                    update[:, offset:offset + num_states, offset:offset + num_states] = \
+                        s_matrix_change[component_key_indices[batch], wavelength_index]
+                    offset += num_states
                 
-    def _condense_sequential_chain_coherent(self, photonic_circuit: PhotonicCircuit, 
-                                  sequential_chain: MutableSequence[Component],
-                                  wavelength: float) -> _CondensedComponent:
-        """Replaces a sequential chain with a condensed component that represents
-        the entire chain. For coherent light. Helper function.
+                grid_s_parameters[batch, wavelength_index] = \
+                    incremental_simulation._get_s_parameters_batch(swept_components, update)
+    
+    def _get_swept_matrix_batch(self, compiled_circuit: CompiledCircuit, component_index: int,
+                                members: MutableSequence[Component], axes: MutableSequence[int], key: tuple[int, ...],
+                                parameter_refs: MutableSequence[tuple[Component, str]],
+                                axis_values: MutableSequence[MutableSequence],
+                                wavelengths: NDArray[np.float64]) -> NDArray[np.complex128]:
+        """Sets the swept parameters of a plan component's detached copies to one combination of
+        their values and evaluates its S matrices. Helper function.
+        
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param component_index: Index of the component in the plan
+        :type component_index: int
+        :param members: Detached copies of the plan component's components, which are the
+            components of its chain if it is condensed
+        :type members: MutableSequence[Component]
+        :param axes: The swept axes that the component depends on
+        :type axes: MutableSequence[int]
+        :param key: The index of the value of every one of those axes
+        :type key: tuple[int, ...]
+        :param parameter_refs: The detached component and name of every swept parameter
+        :type parameter_refs: MutableSequence[tuple[Component, str]]
+        :param axis_values: The values of every swept parameter
+        :type axis_values: MutableSequence[MutableSequence]
+        :param wavelengths: Wavelengths of the light going through the component
+        :type wavelengths: NDArray[np.float64]
+        :return: The S matrices, with shape (len(wavelengths), 2N, 2N)
+        :rtype: NDArray[np.complex128]
+        """
         
-        :param photonic_circuit: The photonic_circuit that the chain is found in
-        :type photonic_circuit: PhotonicCircuit
-        :param sequential_chain: The chain of sequential components to be condensed
-        :type sequential_chain: MutableSequence[Component]
-        :param wavelength: The wavelength of the light going through the sequential chain
-        :type wavelength: float
-        :return: The condensed component that replaces the chain
-        :rtype: _CondensedComponent
+        for axis, value_index in zip(axes, key):
+            component, name = parameter_refs[axis]
+            component.set_parameter(name, axis_values[axis][value_index])
+        
+        if isinstance(compiled_circuit._components[component_index], _CondensedComponent):
+            return compiled_circuit._get_condensed_s_matrix_batch(members, wavelengths)
+        return members[0].get_s_matrix_batch(wavelengths)
+    
+    def _get_component_matrix_batches(self, components: MutableSequence[Component],
+                                      wavelengths: NDArray[np.float64],
+                                      stats: Optional[SimulationStats] = None) -> MutableSequence[NDArray]:
+        """Evaluates the modified S matrices of every component for an array of wavelengths.
+        
+        :param components: The components whose S matrices are evaluated
+        :type components: MutableSequence[Component]
+        :param wavelengths: Wavelengths of the light going through the components
+        :type wavelengths: NDArray[np.float64]
+        :param stats: Stats that the evaluation is measured in, defaults to None
+        :type stats: Optional[SimulationStats]
+        :return: One array of S matrices per component, each with shape (len(wavelengths), 2N, 2N)
+        :rtype: MutableSequence[NDArray]
         """
         
-        condensed_component = _CondensedComponent(self._get_condensed_s_matrix(sequential_chain,
-                                                                               wavelength))
-        photonic_circuit.add(condensed_component)
-                
-        self._replace_components(photonic_circuit, sequential_chain, condensed_component)
+        start = perf_counter()
+        component_matrix_batches = [component.get_s_matrix_batch(wavelengths) for component in components]
+        if stats is not None:
+            stats.record(SimulationPhase.COMPONENT_MATRICES, perf_counter() - start,
+                         memory_bytes=sum(batch.nbytes for batch in component_matrix_batches))
+        return component_matrix_batches
+    
+    def _sample_inputs(self, photonic_circuit: PhotonicCircuit, times: NDArray[np.float64]
+                       ) -> tuple[MutableMapping[Port, NDArray[np.complex128]],
+                                  MutableMapping[Port, NDArray[np.float64]]]:
+        """Evaluates every circuit input's laser once for the whole time array.
         
-        return condensed_component
+        :param photonic_circuit: The photonic circuit whose lasers are sampled
+        :type photonic_circuit: PhotonicCircuit
+        :param times: Array of time values at which the photonic circuit is simulated
+        :type times: np.ndarray[np.float64]
+        :return: Dictionaries mapping each circuit input port to its Jones vectors, with shape
+            (len(times), 2), and to its wavelengths, with shape (len(times),)
+        :rtype: tuple[MutableMapping[Port, NDArray[np.complex128]], MutableMapping[Port, NDArray[np.float64]]]
+        """
         
-    def _get_condensed_s_matrix(self, sequential_chain: MutableSequence[Component],
-                                  wavelength: float) -> None:
-        """Returns a condensed component that represents the entire chain. Helper function.
+        input_jones = {}
+        input_wavelengths = {}
+        for circuit_input_port, laser in photonic_circuit._circuit_inputs.items():
+            input_jones[circuit_input_port], input_wavelengths[circuit_input_port] = laser.sample(times)
+        return input_jones, input_wavelengths
+    
+    def _get_parameter_ref(self, label: str) -> tuple[Component, str]:
+        """Gets the component and the name of a tunable parameter from its label. Helper function.
+        
+        :param label: The label of the parameter, 'component_name.parameter_name'
+        :type label: str
+        :raises MissingComponentException: The label refers to a component that is not in the circuit
+        :raises MissingParameterException: The label refers to a parameter that is not tunable
+        :return: The component and the name of the parameter
+        :rtype: tuple[Component, str]
+        """
+        
+        from ..circuit.circuit_exceptions import MissingComponentException, MissingParameterException
         
-        :param sequential_chain: The chain of sequential components to be condensed
-        :type sequential_chain: MutableSequence[Component]
-        :param wavelength: The wavelength of the light going through the sequential chain
+        component_name, _, name = label.rpartition(".")
+        if component_name not in self._photonic_circuit._names_to_components:
+            raise MissingComponentException(component_name)
+        component = self._photonic_circuit._names_to_components[component_name]
+        if name not in component._PARAMETERS:
+            raise MissingParameterException(component, name)
+        return component, name
+    
+    def _get_transfer_matrix(self, compiled_circuit: CompiledCircuit, wavelength: float,
+                             transfer_matrices: OrderedDict[float, NDArray],
+                             solver_options: Optional[SolverOptions] = None,
+                             stats: Optional[SimulationStats] = None) -> NDArray[np.complex128]:
+        """Gets the external S matrix of the circuit at a wavelength. External S matrices are
+        memoized by wavelength in the mapping passed in, which keeps only the most recently used
+        ones. Helper function.
+        
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param wavelength: The wavelength of the light going through the circuit
         :type wavelength: float
+        :param transfer_matrices: External S matrices memoized by wavelength
+        :type transfer_matrices: OrderedDict[float, NDArray]
+        :param solver_options: Options of the matrix solvers, defaults to None
+        :type solver_options: Optional[SolverOptions]
+        :param stats: Stats that the phases are measured in, defaults to None
+        :type stats: Optional[SimulationStats]
+        :return: The external S matrix, mapping the inputs' Jones vectors to the outputs'
+        :rtype: NDArray[np.complex128]
         """
         
-        condensed_s_matrix = sequential_chain[0].get_s_matrix(wavelength).copy()
-        for component in sequential_chain[1:]:
-            condensed_s_matrix = self._redheffer_star(condensed_s_matrix, component.get_s_matrix(wavelength))
-        
-        return condensed_s_matrix
+        key = float(wavelength)
+        if key in transfer_matrices:
+            transfer_matrices.move_to_end(key)
+            return transfer_matrices[key]
+        
+        component_matrix_batches = self._get_component_matrix_batches(compiled_circuit._components,
+                                                                      np.array([key], dtype=float), stats)
+        transfer_matrices[key] = self._get_transfer_matrices(compiled_circuit, component_matrix_batches,
+                                                             solver_options=solver_options, stats=stats)[0]
+        if len(transfer_matrices) > self._TRANSFER_MATRIX_CACHE_SIZE:
+            transfer_matrices.popitem(last=False)
+        return transfer_matrices[key]
     
-    def _replace_components(self, photonic_circuit: PhotonicCircuit,
-                            component_list: MutableSequence[Component],
-                            replacement_component: Component) -> None:
-        """Replaces a list of components with a single component. The list of components
-        is assumed to contain sequential components. Helper function.
+    def _get_transfer_matrices(self, compiled_circuit: CompiledCircuit,
+                               component_matrix_batches: MutableSequence[NDArray],
+                               out: Optional[NDArray[np.complex128]] = None,
+                               solver_options: Optional[SolverOptions] = None,
+                               stats: Optional[SimulationStats] = None) -> NDArray[np.complex128]:
+        """Gets the external S matrices of the circuit for a block of wavelengths. Every partition
+        of the plan is solved on its own, and the partitions' external S matrices are placed in
+        the blocks of their inputs and outputs. Light cannot travel between partitions, so every
+        other entry is zero. With an executor, or threads set by the solver options, the block is
+        also split into chunks of wavelengths, and every partition's chunk is solved on the
+        workers. Helper function.
+        
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param component_matrix_batches: The modified S matrices of every component, in plan
+            order, each with shape (W, 2N, 2N)
+        :type component_matrix_batches: MutableSequence[NDArray]
+        :param out: Array that the external S matrices are written to in place, defaults to None,
+            which allocates a new one
+        :type out: Optional[NDArray[np.complex128]]
+        :param solver_options: Options of the matrix solvers, defaults to None
+        :type solver_options: Optional[SolverOptions]
+        :param stats: Stats that the phases are measured in, defaults to None. The workers measure
+            their chunks in their own stats, which are merged into these ones
+        :type stats: Optional[SimulationStats]
+        :return: The external S matrices, with shape (W, 2*num_outputs, 2*num_inputs)
+        :rtype: NDArray[np.complex128]
+        """
         
-        :param photonic_circuit: The photonic circuit that the component list belongs to
-        :type photonic_circuit: PhotonicCircuit
-        :param component_list: The list of components to be replaced
-        :type component_list: MutableSequence[Component]
-        :param replacement_component: The component that replaces the list of components
-        :type replacement_component: Component
-        """
-        
-        # input and output ports of the replacement component is the input/output of the
-        # ends of the component list
-        replacement_component_input = component_list[0]._ports[0] # 0 for input port
-        replacement_component_output = component_list[-1]._ports[1] # 1 for output port
-        
-        # connections referring to the ports that connect to the input/output of the
-        # replacement component
-        previous_component_output = replacement_component_input._connection
-        next_component_input = replacement_component_output._connection
-        
-        # connect previous component to new condensed component
-        if isinstance(previous_component_output, PortConnection):
-            previous_component_output_port = previous_component_output.port
-            photonic_circuit._connect_by_port(previous_component_output_port, replacement_component._ports[0])
+        num_wavelengths = len(component_matrix_batches[0]) if component_matrix_batches else 0
+        if out is None:
+            out = np.zeros((num_wavelengths, len(compiled_circuit._output_indices),
+                            len(compiled_circuit._input_indices)), dtype=complex)
         else:
-            # either None or InputConnection or OutputConnection
-            replacement_component._ports[0]._connection = previous_component_output
-            if isinstance(previous_component_output, InputConnection):
-                # change circuit input to input of new condensed component
-                laser = photonic_circuit._circuit_inputs.get(replacement_component_input)
-                photonic_circuit._circuit_inputs.pop(replacement_component_input)
-                photonic_circuit._circuit_inputs[replacement_component._ports[0]] = laser
-            elif isinstance(previous_component_output, OutputConnection):
-                # chnge circuit output to input of new condensed component
-                photonic_circuit._circuit_outputs.pop(replacement_component_input)
-                photonic_circuit._circuit_outputs.append(replacement_component._ports[0])
-        
-        # connect next component to new condensed component
-        if isinstance(next_component_input, PortConnection):
-            next_component_input_port = next_component_input.port
-            photonic_circuit._connect_by_port(next_component_input_port, replacement_component._ports[1])
+            out.fill(0)
+        
+        partitions = compiled_circuit._partitions
+        partition_batches = [[component_matrix_batches[index] for index in partition._component_indices]
+                             for partition in partitions]
+        chunks = [slice(chunk_start, chunk_start + self._PARALLEL_CHUNK_SIZE)
+                  for chunk_start in range(0, num_wavelengths, self._PARALLEL_CHUNK_SIZE)]
+        # the profile is resolved here, so that the workers do not read the profile file
+        solver_options = self._resolve_solver_options(solver_options)
+        executor = self._get_call_executor(solver_options)
+        
+        if executor is None or len(partitions)*len(chunks) < 2:
+            for partition, batches in zip(partitions, partition_batches):
+                out[:, partition._external_output_states[:, None],
+                    partition._external_input_states] = self._reduce_batch_to_external_ports(partition, batches,
+                                                                                             solver_options, stats)
+            return out
+        
+        tasks = [(partition, [batch[chunk] for batch in batches], chunk)
+                 for partition, batches in zip(partitions, partition_batches) for chunk in chunks]
+        task_partitions, task_batches, task_chunks = zip(*tasks)
+        task_stats = [stats._get_worker_stats() if stats is not None else None for _ in tasks]
+        
+        if isinstance(executor, ProcessPoolExecutor):
+            # workers write their chunks straight into a shared output, instead of sending them back
+            shared_memory = SharedMemory(create=True, size=max(out.nbytes, 1))
+            try:
+                shared_out = np.ndarray(out.shape, dtype=complex, buffer=shared_memory.buf)
+                shared_out.fill(0)
+                for chunk_stats in executor.map(self._reduce_chunk_to_shared_memory, task_partitions, task_batches,
+                                                repeat(shared_memory.name), repeat(out.shape), task_chunks,
+                                                repeat(solver_options), task_stats):
+                    if stats is not None:
+                        stats.merge(chunk_stats)
+                out[...] = shared_out
+                del shared_out
+            finally:
+                shared_memory.close()
+                shared_memory.unlink()
         else:
-            # either None or OutputConnection or InputConnection
-            replacement_component._ports[1]._connection = next_component_input
-            if isinstance(next_component_input, OutputConnection):
-                # change circuit output to output of new condensed component
-                index = photonic_circuit._circuit_outputs.index(replacement_component_output)
-                photonic_circuit._circuit_outputs[index] = replacement_component._ports[1]
-            elif isinstance(next_component_input, InputConnection):
-                laser = photonic_circuit._circuit_inputs.get(replacement_component_output)
-                photonic_circuit._circuit_inputs.pop(replacement_component_output)
-                photonic_circuit._circuit_inputs[replacement_component._ports[1]] = laser
-        
-        # remove connections to old component list
-        replacement_component_input._connection = None
-        replacement_component_output._connection = None
-        # delete old components from component list
-        for component in component_list:
-            photonic_circuit._components.remove(component)
-    
-    def _redheffer_star(self, A: SMatrix4x4, B: SMatrix4x4) -> SMatrix4x4:
-        """Operation used to combine the modified S matrices of two sequential components.
-        The resulting matrix represents a component equivalent to those two components.
-        Helper function.
+            # thread pools share the output, so every chunk is written into it as it completes. Every
+            # chunk is measured in its own stats, which are merged on this thread
+            for partition, chunk, chunk_stats, chunk_transfer_matrices in zip(
+                task_partitions, task_chunks, task_stats,
+                executor.map(self._reduce_batch_to_external_ports, task_partitions, task_batches,
+                             repeat(solver_options), task_stats)):
+                out[chunk, partition._external_output_states[:, None],
+                    partition._external_input_states] = chunk_transfer_matrices
+                if stats is not None:
+                    stats.merge(chunk_stats)
+        return out
+    
+    @classmethod
+    def _reduce_chunk_to_shared_memory(cls, compiled_circuit: CompiledCircuit,
+                                       component_matrix_batches: MutableSequence[NDArray], shared_memory_name: str,
+                                       shape: tuple[int, int, int], chunk: slice,
+                                       solver_options: Optional[SolverOptions] = None,
+                                       stats: Optional[SimulationStats] = None) -> Optional[SimulationStats]:
+        """Gets the external S matrices of a partition for a chunk of wavelengths and writes them
+        into the external S matrices of the whole circuit, held in shared memory. Runs on the
+        workers of a process pool. Helper function.
+        
+        :param compiled_circuit: The partition of the simulation plan
+        :type compiled_circuit: CompiledCircuit
+        :param component_matrix_batches: The modified S matrices of every component of the
+            partition for the chunk, in plan order, each with shape (len(chunk), 2N, 2N)
+        :type component_matrix_batches: MutableSequence[NDArray]
+        :param shared_memory_name: Name of the shared memory that holds the external S matrices
+        :type shared_memory_name: str
+        :param shape: Shape of the external S matrices of the whole block
+        :type shape: tuple[int, int, int]
+        :param chunk: The wavelengths of the block that the chunk covers
+        :type chunk: slice
+        :param solver_options: Options of the matrix solvers, defaults to None, which selects them
+            from fixed thresholds
+        :type solver_options: Optional[SolverOptions]
+        :param stats: Stats that the chunk is measured in, defaults to None
+        :type stats: Optional[SimulationStats]
+        :return: The stats, which are a copy in the worker's process and sent back
+        :rtype: Optional[SimulationStats]
+        """
         
-        :param A: First matrix to be combined
-        :type A: SMatrix4x4
-        :param B: Second matrix to be combined
-        :type B: SMatrix4x4
-        :return: The combined matrix, representing a component equivalent to the two
-            components
-        :rtype: SMatrix4x4
+        chunk_transfer_matrices = cls._reduce_batch_to_external_ports(compiled_circuit, component_matrix_batches,
+                                                                      solver_options, stats)
+        
+        shared_memory = SharedMemory(name=shared_memory_name)
+        try:
+            shared_out = np.ndarray(shape, dtype=complex, buffer=shared_memory.buf)
+            shared_out[chunk, compiled_circuit._external_output_states[:, None],
+                       compiled_circuit._external_input_states] = chunk_transfer_matrices
+            del shared_out
+        finally:
+            shared_memory.close()
+        return stats
+    
+    @classmethod
+    def _reduce_batch_to_external_ports(cls, compiled_circuit: CompiledCircuit,
+                                        component_matrix_batches: MutableSequence[NDArray],
+                                        solver_options: Optional[SolverOptions] = None,
+                                        stats: Optional[SimulationStats] = None) -> NDArray[np.complex128]:
+        """Gets the external S matrix of a plan for every wavelength of a block. Runs on the
+        executor's workers, so it only uses the plan's numeric data. Helper function.
+        
+        :param compiled_circuit: The simulation plan, or one of its partitions
+        :type compiled_circuit: CompiledCircuit
+        :param component_matrix_batches: The modified S matrices of every component of the plan,
+            in plan order, each with shape (W, 2N, 2N)
+        :type component_matrix_batches: MutableSequence[NDArray]
+        :param solver_options: Options of the matrix solvers, defaults to None, which selects them
+            from fixed thresholds
+        :type solver_options: Optional[SolverOptions]
+        :param stats: Stats that the phases are measured in, defaults to None
+        :type stats: Optional[SimulationStats]
+        :return: The external S matrices, with shape (W, 2*num_outputs, 2*num_inputs)
+        :rtype: NDArray[np.complex128]
         """
         
-        A11, A12, A21, A22 = self._get_blocks(A)
-        B11, B12, B21, B22 = self._get_blocks(B)
-        I = np.eye(2)
+        num_wavelengths = len(component_matrix_batches[0])
+        transfer_matrices = np.empty((num_wavelengths, len(compiled_circuit._output_indices),
+                                      len(compiled_circuit._input_indices)), dtype=complex)
+        
+        # the S matrices of every component are concatenated once for the whole block, and every
+        # wavelength's row fills the global system in place
+        s_matrix_data = np.concatenate([batch.reshape(num_wavelengths, -1)
+                                        for batch in component_matrix_batches], axis=1)
+        if solver_options is None:
+            solver_options = SolverOptions()
+        # an iterative solver keeps its preconditioner and last solution from one wavelength to the next
+        iterative_solver = _IterativeSolver(solver_options.iterative_method, solver_options.rtol,
+                                            solver_options.max_iterations, solver_options.drop_tolerance,
+                                            solver_options.fill_factor)
+        for wavelength_index in range(num_wavelengths):
+            transfer_matrices[wavelength_index] = cls._reduce_to_external_ports(
+                compiled_circuit, s_matrix_data[wavelength_index], iterative_solver, solver_options, stats)
+        return transfer_matrices
+    
+    @classmethod
+    def _reduce_to_external_ports(cls, compiled_circuit: CompiledCircuit, s_matrix_data: NDArray[np.complex128],
+                                  iterative_solver: Optional[_IterativeSolver] = None,
+                                  solver_options: Optional[SolverOptions] = None,
+                                  stats: Optional[SimulationStats] = None) -> NDArray[np.complex128]:
+        """Eliminates every port other than the circuit outputs from the global system
+        (I - SC) y = S a_ext, which leaves the external S matrix between the circuit inputs and
+        outputs. The global matrix is partitioned into the kept output states K and the eliminated
+        states R, and the outputs are solved from the Schur complement of the R block:
+        
+            y_K = (M_KK - M_KR M_RR^-1 M_RK)^-1 (B_K - M_KR M_RR^-1 B_R)
+        
+        M_RR is factorized once and only solved for as many right-hand sides as there are
+        external states. Helper function.
+        
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param s_matrix_data: The entries of every component's modified S matrix, concatenated
+            in plan order
+        :type s_matrix_data: NDArray[np.complex128]
+        :param iterative_solver: Solver that keeps its state between the wavelengths of a batch,
+            used if the eliminated block is solved iteratively, defaults to None
+        :type iterative_solver: Optional[_IterativeSolver]
+        :param solver_options: Options of the matrix solvers, defaults to None, which selects them
+            from fixed thresholds
+        :type solver_options: Optional[SolverOptions]
+        :param stats: Stats that the phases are measured in, defaults to None
+        :type stats: Optional[SimulationStats]
+        :raises InapplicableSolverException: The feed-forward solver is forced on a circuit with
+            loops or reflections
+        :return: The external S matrix, with shape (2*num_outputs, 2*num_inputs)
+        :rtype: NDArray[np.complex128]
+        """
         
-        # denominator terms
-        D1 = np.linalg.inv(I - A22 @ B11)
-        D2 = np.linalg.inv(I - B11 @ A22)
-
-        # star product blocks
-        star11 = A11 + A12 @ B11 @ D1 @ A21
-        star12 = A12 @ D1 @ B12
-        star21 = B21 @ D2 @ A21
-        star22 = B22 + B21 @ A22 @ D2 @ B12
+        if solver_options is None:
+            solver_options = SolverOptions()
+        
+        # acyclic circuits without reflections need no linear solve at all
+        solver = cls._choose_solver(compiled_circuit, s_matrix_data, solver_options)
+        if solver == MatrixSolver.FEED_FORWARD:
+            start = perf_counter()
+            transfer_matrix = cls._propagate_feed_forward(compiled_circuit, s_matrix_data)
+            if stats is not None:
+                num_states = 2*compiled_circuit._num_ports
+                num_input_states = len(compiled_circuit._input_indices)
+                stats.record(SimulationPhase.FEED_FORWARD, perf_counter() - start, dim=num_states,
+                             memory_bytes=(num_states + num_input_states + 1)*num_input_states*cls._COMPLEX_SIZE_BYTES)
+            return transfer_matrix
+        
+        # without H-V coupling, the H and V systems are factorized separately at half the size,
+        # which cuts the cost of a dense LU factorization fourfold. A sparse LU factorization
+        # already orders the two uncoupled systems apart, so they are only split when dense
+        if cls._splits_polarizations(compiled_circuit, s_matrix_data):
+            if solver is None:
+                solver = cls._select_solver(compiled_circuit._system_assembly.M_RR.assemble(s_matrix_data),
+                                            solver_options.profile)
+            if solver == MatrixSolver.DENSE:
+                return cls._reduce_polarizations(compiled_circuit, s_matrix_data, stats)
         
-        return np.block([
-            [star11, star12],
-            [star21, star22]
-        ])
+        return cls._reduce_global_system(compiled_circuit, s_matrix_data, solver, iterative_solver,
+                                         solver_options.profile, stats)
     
-    def _get_blocks(self, M: SMatrix4x4) -> tuple:
-        """Gets the four 2x2 block matrices from a 4x4 modified S matrix.
-        
-        :param M: matrix from which the block matrices are extracted
-        :type M: SMatrix4x4
+    @classmethod
+    def _choose_solver(cls, compiled_circuit: CompiledCircuit, s_matrix_data: NDArray[np.complex128],
+                       solver_options: SolverOptions) -> Optional[MatrixSolver]:
+        """Chooses the solver of a plan at one wavelength from the solver options, before the
+        eliminated block is assembled. Helper function.
+        
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param s_matrix_data: The entries of every component's modified S matrix, concatenated
+            in plan order
+        :type s_matrix_data: NDArray[np.complex128]
+        :param solver_options: Options of the matrix solvers
+        :type solver_options: SolverOptions
+        :raises InapplicableSolverException: The feed-forward solver is forced on a circuit with
+            loops or reflections
+        :return: The forced solver, the feed-forward solver if the circuit allows it, or None if
+            the solver is selected from the eliminated block
+        :rtype: Optional[MatrixSolver]
         """
         
-        return M[0:2, 0:2], M[0:2, 2:4], M[2:4, 0:2], M[2:4, 2:4]
-        
-    def _get_connectivity_matrix(self, photonic_circuit: PhotonicCircuit, num_ports: int,
-                                 port_to_index: MutableMapping[Port, int]) -> csr_matrix:
-        """Gets the connectivity matrix C from the photonic circuit. If port i is connected to port
-        j, then a 2x2 identity matrix is placed in the 2x2 block created by the H and V state of
-        ports i and j.
+        is_feed_forward = compiled_circuit._feed_forward_steps is not None \
+            and not s_matrix_data[compiled_circuit._reflection_entries].any()
+        if solver_options.solver == MatrixSolver.FEED_FORWARD and not is_feed_forward:
+            raise InapplicableSolverException(MatrixSolver.FEED_FORWARD)
+        if solver_options.solver is not None:
+            return solver_options.solver
+        return MatrixSolver.FEED_FORWARD if is_feed_forward else None
+    
+    @classmethod
+    def _splits_polarizations(cls, compiled_circuit: CompiledCircuit, s_matrix_data: NDArray[np.complex128]) -> bool:
+        """Checks if the H and V systems of a plan are uncoupled at one wavelength, so that a dense
+        solver can reduce them on their own. Helper function.
+        
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param s_matrix_data: The entries of every component's modified S matrix, concatenated
+            in plan order
+        :type s_matrix_data: NDArray[np.complex128]
+        :return: True if the H and V systems can be reduced on their own
+        :rtype: bool
+        """
         
-        :param photonic_circuit: The photonic circuit for which the connectivity matrix will be
-            generated
-        :type photonic_circuit: PhotonicCircuit
-        :param num_ports: The number of ports in the photonic circuit
-        :type num_ports: int
-        :param port_to_index: Dictionary mapping each port to an index. Used to keep the ordering
-            of the matrix consistent
-        :type ports_to_index: MutableMapping[Port, int]
-        :return: The connectivity matrix
-        :rtype: csr_matrix
+        return compiled_circuit._polarization_plans is not None and compiled_circuit._num_eliminated > 0 \
+            and not s_matrix_data[compiled_circuit._cross_polarization_entries].any()
+    
+    @classmethod
+    def _reduce_global_system(cls, compiled_circuit: CompiledCircuit, s_matrix_data: NDArray[np.complex128],
+                              solver: Optional[MatrixSolver] = None,
+                              iterative_solver: Optional[_IterativeSolver] = None,
+                              solver_profile: Optional[SolverProfile] = None,
+                              stats: Optional[SimulationStats] = None) -> NDArray[np.complex128]:
+        """Eliminates every state other than the circuit outputs' from the global system through
+        the Schur complement of the eliminated states' block. The blocks are filled in place from
+        the plan's index maps. Helper function.
+        
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param s_matrix_data: The entries of every component's modified S matrix, concatenated
+            in plan order
+        :type s_matrix_data: NDArray[np.complex128]
+        :param solver: The type of solver used to factorize the eliminated block, defaults to
+            None, which selects it from the block
+        :type solver: Optional[MatrixSolver]
+        :param iterative_solver: Solver that keeps its state between the wavelengths of a batch,
+            used if the eliminated block is solved iteratively, defaults to None
+        :type iterative_solver: Optional[_IterativeSolver]
+        :param solver_profile: Cost model that selects the solver if none is given, defaults to
+            None, which selects it from fixed thresholds
+        :type solver_profile: Optional[SolverProfile]
+        :param stats: Stats that the phases are measured in, defaults to None. The incomplete LU
+            preconditioner of an iterative solver is factorized while solving, so it is measured
+            in the solve
+        :type stats: Optional[SimulationStats]
+        :return: The external S matrix, with shape (len(output_indices), len(input_indices))
+        :rtype: NDArray[np.complex128]
         """
-
-        rows = []
-        cols = []
-        for component in photonic_circuit.components:
-            for port in component._ports:
-                if port._port_type == PortType.OUTPUT:
-                    if isinstance(port._connection, PortConnection):
-                        port_index_1 = port_to_index[port]
-                        port_index_2 = port_to_index[port._connection.port]
-                                            
-                        # H state stored first, then V state
-                        p1h, p1v = 2*port_index_1, 2*port_index_1 + 1
-                        p2h, p2v = 2*port_index_2, 2*port_index_2 + 1
-
-                        rows.extend([p1h, p2h, p1v, p2v])
-                        cols.extend([p2h, p1h, p2v, p1v])
-                    
-        data = np.ones(len(rows), dtype=int)
         
-        return coo_matrix((data, (rows, cols)), shape=(2 * num_ports, 2 * num_ports)).tocsc()
+        system_assembly = compiled_circuit._system_assembly
+        
+        # blocks of (I - SC) and of the input matrix S[:, inputs]
+        start = perf_counter()
+        M_KK = system_assembly.M_KK.assemble(s_matrix_data)
+        B_K = system_assembly.B_K.assemble(s_matrix_data)
+        if compiled_circuit._num_eliminated == 0:
+            if stats is not None:
+                stats.record(SimulationPhase.ASSEMBLY, perf_counter() - start, dim=M_KK.shape[0],
+                             memory_bytes=cls._get_memory_bytes(M_KK, B_K))
+            start = perf_counter()
+            transfer_matrix = np.linalg.solve(M_KK, B_K)
+            if stats is not None:
+                stats.record(SimulationPhase.SOLVE, perf_counter() - start, dim=M_KK.shape[0],
+                             memory_bytes=cls._get_memory_bytes(M_KK, transfer_matrix))
+            return transfer_matrix
+        
+        M_KR = system_assembly.M_KR.assemble(s_matrix_data)
+        M_RK = system_assembly.M_RK.assemble(s_matrix_data)
+        M_RR = system_assembly.M_RR.assemble(s_matrix_data)
+        B_R = system_assembly.B_R.assemble(s_matrix_data)
+        if stats is not None:
+            stats.record(SimulationPhase.ASSEMBLY, perf_counter() - start, dim=M_RR.shape[0] + M_KK.shape[0],
+                         nnz=np.count_nonzero(M_RR.data),
+                         memory_bytes=cls._get_memory_bytes(M_KK, B_K, M_KR, M_RK, M_RR, B_R))
+        
+        # select solver based on matrix density, size, and estimated memory required
+        if solver is None:
+            solver = cls._select_solver(M_RR, solver_profile)
+        solve = cls._factorize(M_RR, solver, iterative_solver, stats)
+        
+        start = perf_counter()
+        eliminated_solution = solve(np.hstack((M_RK, B_R)))
+        
+        schur_complement = M_KK - M_KR @ eliminated_solution[:, :M_KK.shape[0]]
+        reduced_input_matrix = B_K - M_KR @ eliminated_solution[:, M_KK.shape[0]:]
+        transfer_matrix = np.linalg.solve(schur_complement, reduced_input_matrix)
+        if stats is not None:
+            stats.record(SimulationPhase.SOLVE, perf_counter() - start, dim=M_RR.shape[0],
+                         memory_bytes=cls._get_memory_bytes(eliminated_solution, schur_complement,
+                                                            reduced_input_matrix, transfer_matrix))
+        return transfer_matrix
     
-    def _get_input_vector(self, photonic_circuit: PhotonicCircuit, 
-                          global_s_matrix: csr_matrix, num_ports: int,
-                          port_to_index: MutableMapping[Port, int], time: float) -> csr_matrix:
-        """Gets the input vector used in the global scattering matrix technique.
+    @classmethod
+    def _reduce_polarizations(cls, compiled_circuit: CompiledCircuit, s_matrix_data: NDArray[np.complex128],
+                              stats: Optional[SimulationStats] = None) -> NDArray[np.complex128]:
+        """Gets the external S matrix of a circuit without H-V coupling by reducing the H and V
+        systems on their own with the dense solver. Each has one state per port, so it is
+        factorized at a fraction of the cost of the interleaved system. Helper function.
+        
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param s_matrix_data: The entries of every component's modified S matrix, concatenated
+            in plan order
+        :type s_matrix_data: NDArray[np.complex128]
+        :param stats: Stats that the phases are measured in, defaults to None
+        :type stats: Optional[SimulationStats]
+        :return: The external S matrix, with shape (2*num_outputs, 2*num_inputs)
+        :rtype: NDArray[np.complex128]
+        """
         
-        :param photonic_circuit: The photonic circuit that the input vector is derived from
-        :type photonic_circuit: PhotonicCircuit
-        :param global_s_matrix: The S matrix of the global system
-        :type global_s_matrix: csr_matrix
-        :param num_ports: The amount of ports in the circuit
-        :type num_ports: int
-        :param port_to_index: Dictionary mapping ports to indices
-        :type port_to_index: MutableMapping[Port, int]
-        :param time: time of the simulation
-        :type time: float
-        :return: input vector
-        :rtype: csr_matrix
-        """
-        
-        # creates external excitation vector a_ext
-        # inputs, then outputs
-        a_ext = np.zeros(2*num_ports, dtype=complex)
-        for circuit_input_port, laser in photonic_circuit._circuit_inputs.items():
-            port_index = port_to_index[circuit_input_port]
-            
-            # for each input, the corresponding laser value is placed in the corresponding index
-            h_index = 2*port_index
-            v_index = 2*port_index + 1
-            a_ext[h_index] = laser(time)._e[0]
-            a_ext[v_index] = laser(time)._e[1]
+        transfer_matrix = np.zeros((len(compiled_circuit._output_indices),
+                                    len(compiled_circuit._input_indices)), dtype=complex)
         
-        return global_s_matrix @ a_ext
+        # the H states are at even indices and the V states at odd ones
+        for mode, polarization_plan in enumerate(compiled_circuit._polarization_plans):
+            transfer_matrix[mode::2, mode::2] = cls._reduce_global_system(polarization_plan, s_matrix_data,
+                                                                          MatrixSolver.DENSE, stats=stats)
+        return transfer_matrix
     
-    def _get_source_input_vector(self, photonic_circuit: PhotonicCircuit,
-                                 global_s_matrix: csr_matrix, num_ports: int,
-                                 port_to_index: MutableMapping[Port, int], 
-                                 circuit_input_port: Port, time: float):
-        """Gets the input vector for a single input used in the global scattering matrix technique.
-        
-        :param photonic_circuit: The photonic circuit that the input vector is derived from
-        :type photonic_circuit: PhotonicCircuit
-        :param global_s_matrix: The S matrix of the global system
-        :type global_s_matrix: csr_matrix
-        :param num_ports: The amount of ports in the circuit
-        :type num_ports: int
-        :param port_to_index: Dictionary mapping ports to indices
-        :type port_to_index: MutableMapping[Port, int]
-        :param circuit_input_port: The circuit input associated with the vector
-        :type circuit_input_port: Port
-        :param time: time of the simulation
-        :type time: float
-        :return: input vector
-        :rtype: csr_matrix
+    @classmethod
+    def _propagate_feed_forward(cls, compiled_circuit: CompiledCircuit,
+                                s_matrix_data: NDArray[np.complex128]) -> NDArray[np.complex128]:
+        """Gets the external S matrix of a feed-forward, reflection-free circuit by propagating a
+        unit excitation of every input state through the components in topological order. Each
+        component costs one small matrix product, so the total cost is linear in the amount of
+        connections. Helper function.
+        
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param s_matrix_data: The entries of every component's modified S matrix, concatenated
+            in plan order
+        :type s_matrix_data: NDArray[np.complex128]
+        :return: The external S matrix, with shape (2*num_outputs, 2*num_inputs)
+        :rtype: NDArray[np.complex128]
         """
         
-        # creates external excitation vector a_ext
-        a_ext = np.zeros(2*num_ports, dtype=complex)
-        laser = photonic_circuit._circuit_inputs[circuit_input_port]
+        num_states = 2*compiled_circuit._num_ports
+        num_input_states = len(compiled_circuit._input_indices)
         
-        port_index = port_to_index[circuit_input_port]
+        # outgoing waves of every state, for one unit excitation of each input state per column,
+        # followed by the unit excitations themselves and a row of zeros
+        waves = np.zeros((num_states + num_input_states + 1, num_input_states), dtype=complex)
+        waves[num_states:num_states + num_input_states] = np.eye(num_input_states)
         
-        h_index = 2*port_index
-        v_index = 2*port_index + 1
-        a_ext[h_index] = laser(time)._e[0]
-        a_ext[v_index] = laser(time)._e[1]
+        for step in compiled_circuit._feed_forward_steps:
+            s_matrix = s_matrix_data[step.s_matrix_entries].reshape(step.num_states, step.num_states)
+            split = step.num_input_states
+            waves[step.output_states] = s_matrix[split:, :split] @ waves[step.source_rows]
         
-        return global_s_matrix @ a_ext
+        return waves[compiled_circuit._output_indices]
+    
+    @classmethod
+    def _factorize(cls, A: csc_matrix, solver: MatrixSolver,
+                   iterative_solver: Optional[_IterativeSolver] = None,
+                   stats: Optional[SimulationStats] = None) -> Callable[[NDArray], NDArray]:
+        """Factorizes the matrix passed in once, so that it can be reused for any amount of
+        right-hand sides. An iterative solver is not factorized, and only preconditions the
+        matrix when it is first solved.
+        
+        :param A: Matrix to be factorized
+        :type A: csc_matrix
+        :param solver: The type of solver used to factorize the matrix
+        :type solver: MatrixSolver
+        :param iterative_solver: Solver used if the matrix is solved iteratively, which reuses its
+            preconditioner and last solution, defaults to None, which creates a new one
+        :type iterative_solver: Optional[_IterativeSolver]
+        :param stats: Stats that the factorization is measured in, defaults to None
+        :type stats: Optional[SimulationStats]
+        :return: Function that solves A x = b for a right-hand side b, which can be a vector or a
+            matrix with one right-hand side per column. Passing trans='T' solves A^T x = b instead
+        :rtype: Callable[[NDArray], NDArray]
+        """
         
+        if solver == MatrixSolver.ITERATIVE:
+            if iterative_solver is None:
+                iterative_solver = _IterativeSolver()
+            return lambda b, trans="N": iterative_solver.solve(A, b, trans)
+        
+        start = perf_counter()
+        if solver == MatrixSolver.DENSE:
+            # toarray() converts to dense format needed for the dense LU factorization
+            lu_and_pivots = lu_factor(A.toarray())
+            if stats is not None:
+                nnz = np.count_nonzero(A.data)
+                stats.record(SimulationPhase.FACTORIZATION, perf_counter() - start, dim=A.shape[0], nnz=nnz,
+                             fill_in=A.shape[0]**2 - nnz, memory_bytes=cls._get_memory_bytes(*lu_and_pivots))
+            return lambda b, trans="N": lu_solve(lu_and_pivots, b, trans=0 if trans == "N" else 1)
+        
+        # splu requires csc format. The assembled pattern holds every entry that a component
+        # could fill, so the entries that are zero are dropped before factorizing. The plan
+        # already orders the eliminated states to reduce fill-in, so the columns are not reordered
+        A = csc_matrix(A)
+        A.eliminate_zeros()
+        factors = linalg.splu(A, permc_spec="NATURAL")
+        if stats is not None:
+            # L has a unit diagonal, which is stored but not filled in
+            factors_nnz = factors.L.nnz + factors.U.nnz - A.shape[0]
+            stats.record(SimulationPhase.FACTORIZATION, perf_counter() - start, dim=A.shape[0], nnz=A.nnz,
+                         fill_in=max(factors_nnz - A.nnz, 0),
+                         memory_bytes=(factors_nnz + A.shape[0])*(cls._COMPLEX_SIZE_BYTES + cls._INDEX_SIZE_BYTES))
+        return factors.solve
 
-    def _select_solver(self, A: csc_matrix) -> MatrixSolver:
-        """Selects the solver to be used based on the matrix passed in.
+    @classmethod
+    def _get_memory_bytes(cls, *matrices: NDArray | csc_matrix) -> int:
+        """Gets the memory that dense and sparse matrices take up. Helper function.
+        
+        :param matrices: The matrices
+        :type matrices: NDArray | csc_matrix
+        :return: The memory of all the matrices [bytes]
+        :rtype: int
+        """
+        
+        return sum(matrix.nbytes if isinstance(matrix, np.ndarray)
+                   else matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+                   for matrix in matrices)
+    
+    @classmethod
+    def _select_solver(cls, A: csc_matrix, solver_profile: Optional[SolverProfile] = None) -> MatrixSolver:
+        """Selects the solver to be used based on the matrix passed in, from the estimated times
+        of a calibrated profile if one is given, or from fixed size and density thresholds.
         
         :param A: Matrix that the solver selects for
         :type A: csc_matrix
+        :param solver_profile: Calibrated cost model of the solvers, defaults to None
+        :type solver_profile: Optional[SolverProfile]
         :return: The type of solver to be used
         :rtype: MatrixSolver
         """
         
+        if solver_profile is not None:
+            return solver_profile.select_solver(A)
+        
         dim = A.shape[0]
         density = A.getnnz() / (dim ** 2)
-        estimated_dense_size_gb = ((dim ** 2) * self._COMPLEX_SIZE_BYTES) / self._GB_TO_BYTES
+        estimated_dense_size_gb = ((dim ** 2) * cls._COMPLEX_SIZE_BYTES) / cls._GB_TO_BYTES
         
         # sparse overhead too large compared to dense
-        if dim < self._DENSE_DOMAIN_SIZE:
+        if dim < cls._DENSE_DOMAIN_SIZE:
             return MatrixSolver.DENSE
         
+        # the fill-in of a direct factorization outgrows memory, so the system is solved iteratively
+        if dim > cls._ITERATIVE_DOMAIN_SIZE:
+            return MatrixSolver.ITERATIVE
+        
         # memory limit exceeded by dense, so sparse is the only choice
-        if estimated_dense_size_gb > self._MEMORY_LIMIT_GB:
+        if estimated_dense_size_gb > cls._MEMORY_LIMIT_GB:
             return MatrixSolver.SPARSE
         
         # general sparse case
-        if density < self._LIMITING_DENSITY:
+        if density < cls._LIMITING_DENSITY:
             return MatrixSolver.SPARSE
         
         return MatrixSolver.DENSE
     
-    def _is_disconnected(self, component: Component) -> bool:
-        """Checks if a component is completely disconnected from the rest of the circuit.
+    def _get_solver_profile(self) -> Optional[SolverProfile]:
+        """Gets the profile that selects the matrix solvers, which is the simulation's own, or
+        else the default one. Helper function.
         
-        :param component: The component to be checked
-        :type component: Component
-        :return: Whether the component is completely disconnected from the rest of the circuit
-        :rtype: bool
+        :return: The profile, or None if there is neither
+        :rtype: Optional[SolverProfile]
         """
-
-        for port in component._ports:
-            if port._connection is not None:
-                return False
-        return True
         
+        return self._solver_profile if self._solver_profile is not None else SolverProfile.get_default()
+    
+    def _resolve_solver_options(self, solver_options: Optional[SolverOptions]) -> SolverOptions:
+        """Gets the solver options of a call, with the simulation's profile if they have none.
+        Helper function.
+        
+        :param solver_options: The options passed to the call, or None for the default ones
+        :type solver_options: Optional[SolverOptions]
+        :return: The options, with the profile resolved
+        :rtype: SolverOptions
+        """
+        
+        if solver_options is None:
+            solver_options = SolverOptions()
+        if solver_options.profile is None:
+            solver_profile = self._get_solver_profile()
+            if solver_profile is not None:
+                solver_options = replace(solver_options, profile=solver_profile)
+        return solver_options
+    
+    def _get_call_executor(self, solver_options: SolverOptions) -> Optional[Executor]:
+        """Gets the executor that a call solves its partitions and chunks of wavelengths on. The
+        thread pools of calls that set their own amount of threads are kept for the calls after
+        them. Helper function.
+        
+        :param solver_options: Options of the matrix solvers
+        :type solver_options: SolverOptions
+        :return: The simulation's executor if the options set no amount of threads, a thread pool
+            with that amount of threads, or None to solve on the calling thread
+        :rtype: Optional[Executor]
+        """
+        
+        num_threads = solver_options.num_threads
+        if num_threads is None:
+            return self._executor
+        if num_threads == 1:
+            return None
+        if num_threads not in self._thread_pools:
+            self._thread_pools[num_threads] = ThreadPoolExecutor(max_workers=num_threads)
+        return self._thread_pools[num_threads]
+    
+    def _get_solver_choices(self, compiled_circuit: CompiledCircuit, wavelength: float,
+                            solver_options: SolverOptions) -> MutableSequence[SolverChoice]:
+        """Gets the solver that every partition of the plan is solved with at a wavelength, and
+        why. The automatic choice can change with the wavelength, for example when a component
+        only reflects at some wavelengths, so it is recorded at the first one. Helper function.
+        
+        :param compiled_circuit: The simulation plan of the photonic circuit
+        :type compiled_circuit: CompiledCircuit
+        :param wavelength: The wavelength that the solvers are chosen at
+        :type wavelength: float
+        :param solver_options: Options of the matrix solvers
+        :type solver_options: SolverOptions
+        :raises InapplicableSolverException: The feed-forward solver is forced on a circuit with
+            loops or reflections
+        :return: The solver of every partition, in plan order
+        :rtype: MutableSequence[SolverChoice]
+        """
+        
+        component_matrix_batches = self._get_component_matrix_batches(compiled_circuit._components,
+                                                                      np.array([wavelength], dtype=float))
+        
+        solver_choices = []
+        for partition_index, partition in enumerate(compiled_circuit._partitions):
+            s_matrix_data = np.concatenate([component_matrix_batches[index][0].ravel()
+                                            for index in partition._component_indices])
+            solver = self._choose_solver(partition, s_matrix_data, solver_options)
+            
+            if solver == MatrixSolver.FEED_FORWARD:
+                rationale = ("forced" if solver_options.solver is not None
+                             else "the partition has no loops or reflections, so no system is solved")
+                solver_choices.append(SolverChoice(partition_index, solver, 0, rationale))
+                continue
+            
+            num_eliminated = partition._num_eliminated
+            if num_eliminated == 0:
+                rationale = "no states are eliminated, so only the outputs' system is solved densely"
+                solver_choices.append(SolverChoice(partition_index, solver or MatrixSolver.DENSE, 0,
+                                                   "forced, but " + rationale if solver is not None else rationale))
+                continue
+            
+            M_RR = partition._system_assembly.M_RR.assemble(s_matrix_data)
+            if solver is None:
+                solver = self._select_solver(M_RR, solver_options.profile)
+                rationale = self._explain_solver(M_RR, solver, solver_options.profile)
+            else:
+                rationale = "forced"
+            if solver == MatrixSolver.DENSE and self._splits_polarizations(partition, s_matrix_data):
+                rationale += ", with the H and V systems solved apart"
+            solver_choices.append(SolverChoice(partition_index, solver, num_eliminated, rationale))
+        return solver_choices
+    
+    @classmethod
+    def _explain_solver(cls, A: csc_matrix, solver: MatrixSolver,
+                        solver_profile: Optional[SolverProfile] = None) -> str:
+        """Describes why a solver was selected for a matrix. Helper function.
+        
+        :param A: Matrix that the solver was selected for
+        :type A: csc_matrix
+        :param solver: The selected solver
+        :type solver: MatrixSolver
+        :param solver_profile: Calibrated cost model of the solvers, defaults to None
+        :type solver_profile: Optional[SolverProfile]
+        :return: Why the solver was selected
+        :rtype: str
+        """
+        
+        dim = A.shape[0]
+        if solver_profile is not None:
+            estimated_times = solver_profile.estimate_times(dim, np.count_nonzero(A.data))
+            estimates = ", ".join(f"{estimated_solver.name} {estimated_time:.2e} s"
+                                  for estimated_solver, estimated_time in estimated_times.items())
+            if solver == MatrixSolver.ITERATIVE:
+                return f"no direct solver fits in memory by the profile (estimated {estimates})"
+            return f"fastest direct solver by the profile (estimated {estimates})"
+        
+        if dim < cls._DENSE_DOMAIN_SIZE:
+            return f"fewer than {cls._DENSE_DOMAIN_SIZE} states"
+        if dim > cls._ITERATIVE_DOMAIN_SIZE:
+            return f"more than {cls._ITERATIVE_DOMAIN_SIZE} states"
+        if solver == MatrixSolver.SPARSE and ((dim ** 2) * cls._COMPLEX_SIZE_BYTES) / cls._GB_TO_BYTES \
+                > cls._MEMORY_LIMIT_GB:
+            return f"a dense factorization would exceed {cls._MEMORY_LIMIT_GB} GB"
+        density = A.getnnz() / (dim ** 2)
+        if solver == MatrixSolver.SPARSE:
+            return f"density {density:.2e} is below {cls._LIMITING_DENSITY}"
+        return f"density {density:.2e} is at least {cls._LIMITING_DENSITY}"
     
     def _check_coherence(self, photonic_circuit: PhotonicCircuit) -> Coherence:
         """Checks if the light in the circuit is coherent or incoherent.
@@ -806,50 +1538,3 @@ class Simulation:
             return Coherence.COHERENT
         
         return Coherence.INCOHERENT
-    
-    def _condense_circuit(self, photonic_circuit: PhotonicCircuit) -> MutableSequence[Component]:
-        """Simplifies the inputted circuit. Removes completely disconnected components and simplifies sequential chains using
-        redheffer star products.
-        
-        :param photonic_circuit: The photonic circuit to simplify
-        :type photonic_circuit: PhotonicCircuit
-        :return: Sequential chains of components, for later use in simulation
-        :rtype: MutableSequence[Component]
-        """
-        
-        # remove completely disconnected components
-        for component in photonic_circuit.components:
-            if self._is_disconnected(component):
-                photonic_circuit.components.remove(component)
-        
-        # find all anchor components (where in-degree != 1 or out-degree != 1)
-        anchor_components = []
-        for component in photonic_circuit.components:
-            if component._in_degree != 1 or component._out_degree != 1:
-                anchor_components.append(component)
-                
-        # find all sequential paths
-        sequential_paths = []
-        # iterate through starting at outputs of anchor components
-        for anchor_component in anchor_components:
-            for port in anchor_component._ports:
-                if port._port_type == PortType.OUTPUT:
-                    connection = port.connection
-                    if isinstance(connection, PortConnection):
-                        component = connection.port._component
-                        sequential_path = self._find_sequential_chain(component, anchor_components)
-                        if len(sequential_path) >= 2:
-                            sequential_paths.append(sequential_path)
-        # iterate through starting at circuit inputs              
-        for circuit_input in photonic_circuit._circuit_inputs:
-            sequential_path = self._find_sequential_chain(circuit_input._component, anchor_components)
-            if len(sequential_path) >= 2:
-                sequential_paths.append(sequential_path)
-                
-        # collapse each sequential path initial to get basic structure of simplified circuit
-        for sequential_path in sequential_paths:
-            self._condense_sequential_chain_coherent(photonic_circuit, sequential_path, self._DUMMY_WAVELENGTH)
-            
-        return sequential_paths
-    
-    
\ No newline at end of file
@@ -1,6 +1,10 @@
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 from ..circuit.photonic_circuit import PhotonicCircuit
 
+# avoids circular import errors from type hinting
+if TYPE_CHECKING:
+    from .simulation import MatrixSolver
+
 
 class EmptyInterfaceException(Exception):
     """Exception thrown when a circuit has no inputs or outputs.
@@ -32,4 +36,63 @@ class EmptyInterfaceException(Exception):
         
 
     def __repr__(self):
-        return f"{self.__class__.__name__}(port_type={self.port_type!r}, message={self.message!r})"
\ No newline at end of file
+        return f"{self.__class__.__name__}(port_type={self.port_type!r}, message={self.message!r})"
+
+class ConvergenceException(Exception):
+    """Exception thrown when an iterative solver does not reach its tolerance.
+    
+    :param method: Name of the iterative method
+    :type method: str
+    :param residual: Relative residual that the method reached
+    :type residual: float
+    :param tolerance: Relative residual that the method had to reach
+    :type tolerance: float
+    :param message: A message printed when the exception is thrown. If no message
+        is given, a default message is printed
+    :type message: optional str
+    """
+    
+    __slots__ = "method", "residual", "tolerance", "message"
+    
+    def __init__(self, method: str, residual: float, tolerance: float, message: Optional[str] = None):
+        super().__init__(method, residual, tolerance, message)
+        self.method = method
+        self.residual = residual
+        self.tolerance = tolerance
+        self.message = message
+        
+    def __str__(self):
+        if self.message:
+            return self.message
+        return (f"{self.method} reached a relative residual of {self.residual:.2e}, "
+                f"above the tolerance of {self.tolerance:.2e}")
+        
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(method={self.method!r}, residual={self.residual!r}, "
+                f"tolerance={self.tolerance!r}, message={self.message!r})")
+
+
+class InapplicableSolverException(Exception):
+    """Exception thrown when a matrix solver is forced on a circuit that it cannot solve.
+    
+    :param solver: The forced solver
+    :type solver: MatrixSolver
+    :param message: A message printed when the exception is thrown. If no message
+        is given, a default message is printed
+    :type message: optional str
+    """
+    
+    __slots__ = "solver", "message"
+    
+    def __init__(self, solver: "MatrixSolver", message: Optional[str] = None):
+        super().__init__(solver, message)
+        self.solver = solver
+        self.message = message
+        
+    def __str__(self):
+        if self.message:
+            return self.message
+        return f"{self.solver} cannot solve a circuit with loops or reflections"
+        
+    def __repr__(self):
+        return f"{self.__class__.__name__}(solver={self.solver!r}, message={self.message!r})"
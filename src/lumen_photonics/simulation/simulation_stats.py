@@ -0,0 +1,238 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Mapping, Optional
+
+class SimulationPhase(Enum):
+    """Represents the phases that a simulation's time is spent in. COMPILE builds or refreshes
+    the simulation plan, which condenses chains of components. INPUTS samples the lasers, and
+    COMPONENT_MATRICES evaluates the components' S matrices. ASSEMBLY fills the blocks of the
+    global system, FACTORIZATION factorizes its eliminated block and SOLVE solves for the external
+    S matrix. FEED_FORWARD propagates the inputs through circuits that need no solve instead.
+    OUTPUTS computes the output light states from the external S matrices.
+    """
+
+    COMPILE = 0
+    INPUTS = 1
+    COMPONENT_MATRICES = 2
+    ASSEMBLY = 3
+    FACTORIZATION = 4
+    SOLVE = 5
+    FEED_FORWARD = 6
+    OUTPUTS = 7
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}.{self.name}"
+
+    def __str__(self):
+        return self.name.replace("_", " ").lower()
+
+@dataclass(frozen=True, slots=True)
+class SimulationEvent:
+    """One measured step of a simulation phase, as it is streamed to an event callback.
+
+    :param phase: The phase that the step belongs to
+    :type phase: SimulationPhase
+    :param wall_time: Wall time of the step [s]
+    :type wall_time: float
+    :param dim: Dimension of the step's matrix, or 0 if it has none
+    :type dim: int
+    :param nnz: Amount of nonzero entries of the step's matrix, or 0 if it has none
+    :type nnz: int
+    :param fill_in: Amount of entries that a factorization added to the matrix, or 0 if it
+        factorized none
+    :type fill_in: int
+    :param memory_bytes: Estimated memory of the arrays that the step allocated [bytes]
+    :type memory_bytes: int
+    """
+
+    phase: SimulationPhase
+    wall_time: float
+    dim: int = 0
+    nnz: int = 0
+    fill_in: int = 0
+    memory_bytes: int = 0
+
+class PhaseStats:
+    """The totals of one simulation phase over every step measured in it. Sizes are the largest
+    of any step, so that they describe the hardest system that the phase handled.
+    """
+
+    __slots__ = "_calls", "_wall_time", "_max_dim", "_max_nnz", "_max_fill_in", "_peak_memory_bytes"
+
+    def __init__(self):
+        self._calls = 0
+        self._wall_time = 0.0
+        self._max_dim = 0
+        self._max_nnz = 0
+        self._max_fill_in = 0
+        self._peak_memory_bytes = 0
+
+    def __repr__(self):
+        return (f"PhaseStats(calls={self._calls!r}, wall_time={self._wall_time!r}, max_dim={self._max_dim!r}, "
+                f"max_nnz={self._max_nnz!r}, max_fill_in={self._max_fill_in!r}, "
+                f"peak_memory_bytes={self._peak_memory_bytes!r})")
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    @property
+    def wall_time(self) -> float:
+        return self._wall_time
+
+    @property
+    def max_dim(self) -> int:
+        return self._max_dim
+
+    @property
+    def max_nnz(self) -> int:
+        return self._max_nnz
+
+    @property
+    def max_fill_in(self) -> int:
+        return self._max_fill_in
+
+    @property
+    def peak_memory_bytes(self) -> int:
+        return self._peak_memory_bytes
+
+    def _add(self, calls: int, wall_time: float, dim: int, nnz: int, fill_in: int, memory_bytes: int) -> None:
+        """Adds steps to the totals. Helper function.
+
+        :param calls: Amount of steps
+        :type calls: int
+        :param wall_time: Wall time of the steps [s]
+        :type wall_time: float
+        :param dim: Largest dimension of the steps' matrices
+        :type dim: int
+        :param nnz: Largest amount of nonzero entries of the steps' matrices
+        :type nnz: int
+        :param fill_in: Largest fill-in of the steps' factorizations
+        :type fill_in: int
+        :param memory_bytes: Largest estimated memory of the steps [bytes]
+        :type memory_bytes: int
+        """
+
+        self._calls += calls
+        self._wall_time += wall_time
+        self._max_dim = max(self._max_dim, dim)
+        self._max_nnz = max(self._max_nnz, nnz)
+        self._max_fill_in = max(self._max_fill_in, fill_in)
+        self._peak_memory_bytes = max(self._peak_memory_bytes, memory_bytes)
+
+class SimulationStats:
+    """Wall times, call counts, matrix sizes and memory estimates of every phase of one
+    simulation call. Memory is estimated from the sizes of the arrays that each phase allocates,
+    so measuring it costs nothing. Steps solved on an executor's workers are measured there and
+    merged in once their chunk is done.
+
+    :param event_callback: Function called with every measured step, on the thread that made the
+        simulation call, defaults to None
+    :type event_callback: Optional[Callable[[SimulationEvent], None]]
+    :param keeps_events: Whether the events are kept until the stats are merged into others, as
+        on the workers of an executor, defaults to False
+    :type keeps_events: bool
+    """
+
+    __slots__ = "_phases", "_event_callback", "_events"
+
+    def __init__(self, event_callback: Optional[Callable[[SimulationEvent], None]] = None,
+                 keeps_events: bool = False):
+        self._phases = {}
+        self._event_callback = event_callback
+        self._events = [] if keeps_events else None
+
+    def __getitem__(self, phase: SimulationPhase) -> PhaseStats:
+        return self._phases.get(phase, PhaseStats())
+
+    def __repr__(self):
+        return f"SimulationStats(phases={self._phases!r})"
+
+    def __str__(self):
+        rows = [f"  {str(phase):<20s}{phase_stats.calls:>9d}{phase_stats.wall_time:>12.4f}{phase_stats.max_dim:>10d}"
+                f"{phase_stats.max_nnz:>12d}{phase_stats.max_fill_in:>12d}"
+                f"{phase_stats.peak_memory_bytes / 2**20:>12.2f}"
+                for phase, phase_stats in sorted(self._phases.items(), key=lambda item: item[0].value)]
+        return (
+            f"--- Simulation Stats [{self.total_time:.4f} s] ---\n"
+            f"  {'phase':<20s}{'calls':>9s}{'time [s]':>12s}{'max dim':>10s}{'max nnz':>12s}"
+            f"{'max fill':>12s}{'peak [MiB]':>12s}\n" + "\n".join(rows)
+        )
+
+    @property
+    def phases(self) -> Mapping[SimulationPhase, PhaseStats]:
+        return self._phases
+
+    @property
+    def total_time(self) -> float:
+        """The wall time of every phase, added up. Steps solved in parallel are each counted, so
+        it can be longer than the call.
+        """
+
+        return sum(phase_stats.wall_time for phase_stats in self._phases.values())
+
+    @property
+    def peak_memory_bytes(self) -> int:
+        """The largest memory estimate of any phase [bytes]."""
+
+        return max((phase_stats.peak_memory_bytes for phase_stats in self._phases.values()), default=0)
+
+    def record(self, phase: SimulationPhase, wall_time: float, *, dim: int = 0, nnz: int = 0,
+               fill_in: int = 0, memory_bytes: int = 0) -> None:
+        """Records one measured step of a phase, and streams it to the event callback.
+
+        :param phase: The phase that the step belongs to
+        :type phase: SimulationPhase
+        :param wall_time: Wall time of the step [s]
+        :type wall_time: float
+        :param dim: Dimension of the step's matrix, defaults to 0
+        :type dim: int
+        :param nnz: Amount of nonzero entries of the step's matrix, defaults to 0
+        :type nnz: int
+        :param fill_in: Amount of entries that a factorization added to the matrix, defaults to 0
+        :type fill_in: int
+        :param memory_bytes: Estimated memory of the arrays that the step allocated, defaults to 0
+        :type memory_bytes: int
+        """
+
+        if phase not in self._phases:
+            self._phases[phase] = PhaseStats()
+        self._phases[phase]._add(1, wall_time, dim, nnz, fill_in, memory_bytes)
+
+        # events are only created when something consumes them
+        if self._event_callback is not None or self._events is not None:
+            event = SimulationEvent(phase, wall_time, dim, nnz, fill_in, memory_bytes)
+            if self._events is not None:
+                self._events.append(event)
+            if self._event_callback is not None:
+                self._event_callback(event)
+
+    def merge(self, stats: "SimulationStats") -> None:
+        """Adds the phases of other stats, such as those measured on a worker, to these ones. The
+        events that the other stats kept are streamed to the event callback.
+
+        :param stats: The stats that are merged in
+        :type stats: SimulationStats
+        """
+
+        for phase, phase_stats in stats._phases.items():
+            if phase not in self._phases:
+                self._phases[phase] = PhaseStats()
+            self._phases[phase]._add(phase_stats.calls, phase_stats.wall_time, phase_stats.max_dim,
+                                     phase_stats.max_nnz, phase_stats.max_fill_in, phase_stats.peak_memory_bytes)
+
+        for event in stats._events or ():
+            if self._events is not None:
+                self._events.append(event)
+            if self._event_callback is not None:
+                self._event_callback(event)
+
+    def _get_worker_stats(self) -> "SimulationStats":
+        """Creates the stats of a worker's chunk, which keep their events if these stats stream
+        them. Helper function.
+
+        :return: Empty stats for the worker
+        :rtype: SimulationStats
+        """
+
+        return SimulationStats(keeps_events=self._event_callback is not None or self._events is not None)
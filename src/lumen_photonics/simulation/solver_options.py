@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+from typing import Literal, Optional, TYPE_CHECKING
+from .solver_profile import SolverProfile
+
+# avoids circular import errors from type hinting
+if TYPE_CHECKING:
+    from .simulation import MatrixSolver
+
+@dataclass(frozen=True, slots=True)
+class SolverOptions:
+    """Options of the matrix solvers for one call of Simulation.simulate, simulate_iter or
+    get_s_parameters.
+
+    :param solver: The solver of every partition of the circuit, defaults to None, which selects
+        it for every partition and wavelength
+    :type solver: Optional[MatrixSolver]
+    :param rtol: Relative tolerance of the residual of the iterative solver, defaults to 1e-10
+    :type rtol: float
+    :param max_iterations: Maximum amount of iterations of the iterative solver for every
+        right-hand side, defaults to 1000
+    :type max_iterations: int
+    :param iterative_method: The Krylov method of the iterative solver, defaults to 'gmres'
+    :type iterative_method: Literal['gmres', 'bicgstab']
+    :param drop_tolerance: Drop tolerance of the iterative solver's incomplete LU
+        preconditioner, defaults to 1e-4
+    :type drop_tolerance: float
+    :param fill_factor: Maximum fill-in of the iterative solver's incomplete LU preconditioner,
+        defaults to 10
+    :type fill_factor: float
+    :param num_threads: Amount of threads that the partitions and chunks of wavelengths are
+        solved on, instead of the simulation's executor, defaults to None, which uses the executor
+    :type num_threads: Optional[int]
+    :param profile: Cost model that selects the solvers, defaults to None, which uses the
+        simulation's profile
+    :type profile: Optional[SolverProfile]
+    """
+
+    solver: Optional["MatrixSolver"] = None
+    rtol: float = 1e-10
+    max_iterations: int = 1000
+    iterative_method: Literal["gmres", "bicgstab"] = "gmres"
+    drop_tolerance: float = 1e-4
+    fill_factor: float = 10
+    num_threads: Optional[int] = None
+    profile: Optional[SolverProfile] = None
+
+    def __post_init__(self):
+        from .simulation import MatrixSolver
+
+        if self.solver is not None and not isinstance(self.solver, MatrixSolver):
+            raise TypeError(f"'solver' must be a MatrixSolver or None, got {self.solver!r}.")
+        if self.iterative_method not in ("gmres", "bicgstab"):
+            raise ValueError(f"'iterative_method' must be 'gmres' or 'bicgstab', got {self.iterative_method!r}.")
+        if self.rtol <= 0:
+            raise ValueError(f"'rtol' must be positive, got {self.rtol}.")
+        if self.max_iterations < 1:
+            raise ValueError(f"'max_iterations' must be positive, got {self.max_iterations}.")
+        if self.num_threads is not None and self.num_threads < 1:
+            raise ValueError(f"'num_threads' must be positive, got {self.num_threads}.")
+
+@dataclass(frozen=True, slots=True)
+class SolverChoice:
+    """The solver that one partition of a circuit was solved with at the first wavelength of a
+    simulation, and why it was chosen.
+
+    :param partition: Index of the partition in the simulation plan
+    :type partition: int
+    :param solver: The solver of the partition
+    :type solver: MatrixSolver
+    :param num_states: Amount of states of the partition's eliminated block
+    :type num_states: int
+    :param rationale: Why the solver was chosen
+    :type rationale: str
+    """
+
+    partition: int
+    solver: "MatrixSolver"
+    num_states: int
+    rationale: str
+
+    def __str__(self):
+        return f"Partition {self.partition}: {self.solver} ({self.num_states} states), {self.rationale}"
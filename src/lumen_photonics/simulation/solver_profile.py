@@ -0,0 +1,383 @@
+from collections.abc import Callable, Sequence
+from dataclasses import asdict, dataclass
+import json
+import os
+from pathlib import Path
+import tempfile
+from time import perf_counter
+from typing import MutableMapping, MutableSequence, Optional, TYPE_CHECKING
+import warnings
+import numpy as np
+from numpy.typing import NDArray
+from scipy.sparse import csc_matrix, linalg
+
+# avoids circular import errors from type hinting
+if TYPE_CHECKING:
+    from .simulation import MatrixSolver
+
+@dataclass(frozen=True, slots=True)
+class SolverProfile:
+    """Cost model of the matrix solvers on one machine, which selects the solver that factorizes
+    the eliminated block of (I - SC) in the least time within the memory limit. The iterative
+    solver can fail to converge, so it is only selected when neither direct solver fits. The
+    model is calibrated by timing every solver on representative systems, and saved to a profile
+    file that later simulations load.
+
+    The time of the dense solver is modeled as a + b*n^3 for n states, and the times of the sparse
+    and iterative solvers, as well as the amount of entries in the sparse LU factors, as c*nnz^p
+    for nnz entries in the block.
+
+    The profile file is read from the path in the LUMEN_SOLVER_PROFILE environment variable, or
+    from ~/.lumen_photonics/solver_profile.json.
+
+    :param dense_overhead: Time of the dense solver that does not depend on the size [s]
+    :type dense_overhead: float
+    :param dense_coefficient: Time of the dense solver per cubed state [s]
+    :type dense_coefficient: float
+    :param sparse_coefficient: Coefficient of the time of the sparse solver [s]
+    :type sparse_coefficient: float
+    :param sparse_exponent: Exponent of the time of the sparse solver
+    :type sparse_exponent: float
+    :param fill_coefficient: Coefficient of the amount of entries in the sparse LU factors
+    :type fill_coefficient: float
+    :param fill_exponent: Exponent of the amount of entries in the sparse LU factors
+    :type fill_exponent: float
+    :param iterative_coefficient: Coefficient of the time of the iterative solver, or infinity if
+        it did not converge on the calibration systems [s]
+    :type iterative_coefficient: float
+    :param iterative_exponent: Exponent of the time of the iterative solver
+    :type iterative_exponent: float
+    :param memory_limit_bytes: Memory that the factors of one block may take up [B]
+    :type memory_limit_bytes: int
+    """
+
+    dense_overhead: float
+    dense_coefficient: float
+    sparse_coefficient: float
+    sparse_exponent: float
+    fill_coefficient: float
+    fill_exponent: float
+    iterative_coefficient: float
+    iterative_exponent: float
+    memory_limit_bytes: int
+
+    _VERSION = 1
+    _PATH_VARIABLE = "LUMEN_SOLVER_PROFILE"
+    _DEFAULT_PATH = Path("~/.lumen_photonics/solver_profile.json")
+    _COMPLEX_SIZE_BYTES = 16
+    # bytes of one entry of the sparse LU factors, its value and its row index
+    _SPARSE_ENTRY_BYTES = 20
+    _CALIBRATION_WAVELENGTH = 1550e-9
+
+    # profiles loaded from their files, keyed by path
+    _loaded_profiles = {}
+
+    def __str__(self):
+        return (
+            f"--- Solver Profile ---\n"
+            f"  Dense:        {self.dense_overhead:.2e} s + {self.dense_coefficient:.2e} s * n^3\n"
+            f"  Sparse:       {self.sparse_coefficient:.2e} s * nnz^{self.sparse_exponent:.2f}\n"
+            f"  Sparse Fill:  {self.fill_coefficient:.2e} * nnz^{self.fill_exponent:.2f}\n"
+            f"  Iterative:    {self.iterative_coefficient:.2e} s * nnz^{self.iterative_exponent:.2f}\n"
+            f"  Memory Limit: {self.memory_limit_bytes / 1024**3:.1f} GB"
+        )
+
+    @classmethod
+    def calibrate(cls, lattice_sizes: Sequence[int] = (4, 8, 12, 16, 24, 32, 48), *,
+                  max_dense_states: int = 2048, repeats: int = 3, memory_fraction: float = 0.5
+                  ) -> "SolverProfile":
+        """Times every solver on the eliminated blocks of lossy square lattices of couplers,
+        whose rows and columns wrap around, and fits the cost model to the timings.
+
+        :param lattice_sizes: Amount of couplers along each side of every lattice, at least two,
+            defaults to (4, 8, 12, 16, 24, 32, 48)
+        :type lattice_sizes: Sequence[int]
+        :param max_dense_states: Largest block that the dense solver is timed on, defaults to 2048
+        :type max_dense_states: int
+        :param repeats: Amount of times that every solver is timed on every block, of which the
+            fastest is kept, defaults to 3
+        :type repeats: int
+        :param memory_fraction: Fraction of the machine's memory that the factors of one block
+            may take up, defaults to 0.5
+        :type memory_fraction: float
+        :raises ValueError: The dense or sparse solver is timed on fewer than two blocks
+        :return: The calibrated profile
+        :rtype: SolverProfile
+        """
+
+        from .iterative_solver import _IterativeSolver
+        from .simulation import MatrixSolver, Simulation
+        from .simulation_exceptions import ConvergenceException
+
+        dense_timings = []
+        sparse_timings = []
+        fill_sizes = []
+        iterative_timings = []
+        for lattice_size in lattice_sizes:
+            A, right_hand_sides = cls._get_calibration_system(lattice_size)
+            A.eliminate_zeros()
+            dim = A.shape[0]
+
+            if dim <= max_dense_states:
+                dense_timings.append((dim, cls._time_solve(
+                    lambda: Simulation._factorize(A, MatrixSolver.DENSE)(right_hand_sides), repeats)))
+
+            sparse_timings.append((A.nnz, cls._time_solve(
+                lambda: Simulation._factorize(A, MatrixSolver.SPARSE)(right_hand_sides), repeats)))
+            factors = linalg.splu(A, permc_spec="NATURAL")
+            fill_sizes.append((A.nnz, factors.L.nnz + factors.U.nnz))
+
+            try:
+                iterative_timings.append((A.nnz, cls._time_solve(
+                    lambda: _IterativeSolver().solve(A, right_hand_sides), repeats)))
+            except ConvergenceException:
+                pass
+
+        if len(dense_timings) < 2 or len(sparse_timings) < 2:
+            raise ValueError("The dense and sparse solvers must each be timed on at least two blocks")
+
+        # the dense model is fitted to the relative errors, so that the small blocks weigh as
+        # much as the large ones
+        dims, dense_times = np.array(dense_timings).T
+        dense_overhead, dense_coefficient = np.linalg.lstsq(
+            np.column_stack((np.ones(len(dims)), dims**3)) / dense_times[:, None], np.ones(len(dims)),
+            rcond=None)[0]
+        sparse_coefficient, sparse_exponent = cls._fit_power_law(sparse_timings)
+        fill_coefficient, fill_exponent = cls._fit_power_law(fill_sizes)
+        if len(iterative_timings) >= 2:
+            iterative_coefficient, iterative_exponent = cls._fit_power_law(iterative_timings)
+        else:
+            iterative_coefficient, iterative_exponent = np.inf, 1.0
+
+        return cls(dense_overhead=max(float(dense_overhead), 0.0),
+                   dense_coefficient=max(float(dense_coefficient), 0.0),
+                   sparse_coefficient=sparse_coefficient, sparse_exponent=sparse_exponent,
+                   fill_coefficient=fill_coefficient, fill_exponent=fill_exponent,
+                   iterative_coefficient=iterative_coefficient, iterative_exponent=iterative_exponent,
+                   memory_limit_bytes=int(memory_fraction*cls._get_physical_memory()))
+
+    @classmethod
+    def load(cls, path: Optional[str | os.PathLike] = None) -> "SolverProfile":
+        """Loads a profile from a profile file.
+
+        :param path: Path of the profile file, defaults to None, which loads the default profile file
+        :type path: Optional[str | os.PathLike]
+        :raises ValueError: The file is not a valid profile of this version
+        :return: The profile
+        :rtype: SolverProfile
+        """
+
+        path = cls._get_path(path)
+        with open(path) as file:
+            try:
+                data = json.load(file)
+            except json.JSONDecodeError as error:
+                raise ValueError(f"{path} is not a valid solver profile: {error}") from error
+        if not isinstance(data, dict) or data.pop("version", None) != cls._VERSION:
+            raise ValueError(f"{path} is not a version {cls._VERSION} solver profile")
+        try:
+            return cls(**data)
+        except TypeError as error:
+            raise ValueError(f"{path} is not a valid solver profile: {error}") from error
+
+    @classmethod
+    def get_default(cls) -> Optional["SolverProfile"]:
+        """Gets the profile in the default profile file, which is only read once. A default
+        profile file that cannot be loaded raises a warning, and is treated as missing so that
+        the solvers are selected from fixed thresholds.
+
+        :return: The profile, or None if there is no valid default profile file
+        :rtype: Optional[SolverProfile]
+        """
+
+        path = cls._get_path()
+        if path not in cls._loaded_profiles:
+            solver_profile = None
+            if path.is_file():
+                try:
+                    solver_profile = cls.load(path)
+                except (OSError, ValueError) as error:
+                    warnings.warn(f"{error}. The solvers are selected from fixed thresholds instead.",
+                                  RuntimeWarning, stacklevel=2)
+            cls._loaded_profiles[path] = solver_profile
+        return cls._loaded_profiles[path]
+
+    def save(self, path: Optional[str | os.PathLike] = None) -> None:
+        """Saves the profile to a profile file, which later simulations load if it is the default one.
+
+        :param path: Path of the profile file, defaults to None, which saves to the default profile file
+        :type path: Optional[str | os.PathLike]
+        """
+
+        path = self._get_path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # the profile is written to a temporary file that replaces the profile file once it is
+        # complete, so that an interrupted save never leaves a partial profile file behind
+        with tempfile.NamedTemporaryFile("w", dir=path.parent, prefix=f".{path.name}.", suffix=".tmp",
+                                         delete=False) as file:
+            try:
+                json.dump({"version": self._VERSION, **asdict(self)}, file, indent=4)
+            except BaseException:
+                file.close()
+                os.remove(file.name)
+                raise
+        os.replace(file.name, path)
+        self._loaded_profiles[path] = self
+
+    def estimate_times(self, dim: int, nnz: int) -> MutableMapping["MatrixSolver", float]:
+        """Estimates the time that every solver whose factors fit within the memory limit takes
+        to solve a block.
+
+        :param dim: Amount of states of the block
+        :type dim: int
+        :param nnz: Amount of entries in the block
+        :type nnz: int
+        :return: The estimated time of every solver that fits [s]
+        :rtype: MutableMapping[MatrixSolver, float]
+        """
+
+        from .simulation import MatrixSolver
+
+        estimated_times = {}
+        if self._COMPLEX_SIZE_BYTES*dim**2 <= self.memory_limit_bytes:
+            estimated_times[MatrixSolver.DENSE] = self.dense_overhead + self.dense_coefficient*dim**3
+        # the factors cannot hold more entries than a dense matrix
+        estimated_fill = min(self.fill_coefficient*nnz**self.fill_exponent, dim**2)
+        if self._SPARSE_ENTRY_BYTES*estimated_fill <= self.memory_limit_bytes:
+            estimated_times[MatrixSolver.SPARSE] = self.sparse_coefficient*nnz**self.sparse_exponent
+        estimated_times[MatrixSolver.ITERATIVE] = self.iterative_coefficient*nnz**self.iterative_exponent
+        return estimated_times
+
+    def select_solver(self, A: csc_matrix | NDArray[np.complex128]) -> "MatrixSolver":
+        """Selects the direct solver that is estimated to solve a block the fastest within the
+        memory limit. The iterative solver is the only one whose memory does not grow with
+        fill-in, so it is selected when no direct solver fits.
+
+        :param A: The block
+        :type A: csc_matrix | NDArray[np.complex128]
+        :return: The type of solver to be used
+        :rtype: MatrixSolver
+        """
+
+        from .simulation import MatrixSolver
+
+        # the assembled pattern holds every entry that a component could fill, so only the
+        # entries that are nonzero are counted, as in the calibration
+        nnz = np.count_nonzero(A.data) if isinstance(A, csc_matrix) else np.count_nonzero(A)
+        estimated_times = self.estimate_times(A.shape[0], nnz)
+        del estimated_times[MatrixSolver.ITERATIVE]
+        if not estimated_times:
+            return MatrixSolver.ITERATIVE
+        return min(estimated_times, key=estimated_times.get)
+
+    @classmethod
+    def _get_calibration_system(cls, lattice_size: int) -> tuple[csc_matrix, NDArray[np.complex128]]:
+        """Builds a square lattice of lossy couplers, whose rows and columns wrap around, and
+        assembles the eliminated block of its global system with the right-hand sides that it is
+        solved for. The lattice is cut open at one coupler for its input and output. Helper function.
+
+        :param lattice_size: Amount of couplers along each side of the lattice
+        :type lattice_size: int
+        :return: The eliminated block, and its right-hand sides
+        :rtype: tuple[csc_matrix, NDArray[np.complex128]]
+        """
+
+        from .compiled_circuit import CompiledCircuit
+        from ..circuit.photonic_circuit import PhotonicCircuit
+        from ..circuit.component import PortRef
+        from ..circuit.components.coupler import Coupler
+        from ..models.light import CoherentLight
+
+        photonic_circuit = PhotonicCircuit()
+        for row in range(lattice_size):
+            for column in range(lattice_size):
+                photonic_circuit.add(Coupler(name=f"coupler_{row}_{column}",
+                                             central_wavelength_H=cls._CALIBRATION_WAVELENGTH,
+                                             central_wavelength_V=cls._CALIBRATION_WAVELENGTH,
+                                             central_coupling_strength_H=1e4, central_coupling_strength_V=2e4,
+                                             length=5e-5, insertion_loss_db=1))
+
+        # port 3 feeds port 1 of the next coupler in the row, and port 4 feeds port 2 of the next
+        # coupler in the column
+        for row in range(lattice_size):
+            for column in range(lattice_size):
+                next_row, next_column = (row + 1) % lattice_size, (column + 1) % lattice_size
+                if (row, next_column) != (0, 0):
+                    photonic_circuit.connect(source=PortRef(f"coupler_{row}_{column}", 3),
+                                             destination=PortRef(f"coupler_{row}_{next_column}", 1))
+                photonic_circuit.connect(source=PortRef(f"coupler_{row}_{column}", 4),
+                                         destination=PortRef(f"coupler_{next_row}_{column}", 2))
+        photonic_circuit.set_circuit_input(
+            laser=lambda t: CoherentLight.from_jones(eh=1, ev=0, wavelength=cls._CALIBRATION_WAVELENGTH),
+            port_ref=PortRef("coupler_0_0", 1))
+        photonic_circuit.set_circuit_output(port_ref=PortRef(f"coupler_0_{lattice_size - 1}", 3))
+
+        compiled_circuit = CompiledCircuit(photonic_circuit)
+        s_matrix_data = np.concatenate([component.get_s_matrix(cls._CALIBRATION_WAVELENGTH).ravel()
+                                        for component in compiled_circuit._components])
+        system_assembly = compiled_circuit._system_assembly
+        right_hand_sides = np.hstack((system_assembly.M_RK.assemble(s_matrix_data),
+                                      system_assembly.B_R.assemble(s_matrix_data)))
+        return csc_matrix(system_assembly.M_RR.assemble(s_matrix_data)), right_hand_sides
+
+    @classmethod
+    def _time_solve(cls, solve: Callable[[], NDArray], repeats: int) -> float:
+        """Times a solve several times and keeps the fastest. Helper function.
+
+        :param solve: Function that factorizes a block and solves it
+        :type solve: Callable[[], NDArray]
+        :param repeats: Amount of times that the solve is timed
+        :type repeats: int
+        :return: The time of the fastest solve [s]
+        :rtype: float
+        """
+
+        fastest_time = np.inf
+        for _ in range(repeats):
+            start = perf_counter()
+            solve()
+            fastest_time = min(fastest_time, perf_counter() - start)
+        return fastest_time
+
+    @classmethod
+    def _fit_power_law(cls, points: MutableSequence[tuple[float, float]]) -> tuple[float, float]:
+        """Fits y = c*x^p to points by least squares on a log-log scale. Helper function.
+
+        :param points: The (x, y) points
+        :type points: MutableSequence[tuple[float, float]]
+        :return: The coefficient c and the exponent p
+        :rtype: tuple[float, float]
+        """
+
+        x, y = np.array(points, dtype=float).T
+        exponent, log_coefficient = np.polyfit(np.log(x), np.log(y), 1)
+        return float(np.exp(log_coefficient)), float(exponent)
+
+    @classmethod
+    def _get_path(cls, path: Optional[str | os.PathLike] = None) -> Path:
+        """Gets the path of a profile file, or of the default profile file. Helper function.
+
+        :param path: Path of the profile file, or None for the default profile file
+        :type path: Optional[str | os.PathLike]
+        :return: The path
+        :rtype: Path
+        """
+
+        if path is None:
+            path = os.environ.get(cls._PATH_VARIABLE, cls._DEFAULT_PATH)
+        return Path(path).expanduser()
+
+    @classmethod
+    def _get_physical_memory(cls) -> int:
+        """Gets the amount of physical memory of the machine, or 16 GB where it is not
+        available. Helper function.
+
+        :return: The amount of physical memory [B]
+        :rtype: int
+        """
+
+        try:
+            return os.sysconf("SC_PAGE_SIZE")*os.sysconf("SC_PHYS_PAGES")
+        except (AttributeError, ValueError, OSError):
+            return 16*1024**3
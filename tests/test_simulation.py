@@ -0,0 +1,152 @@
+import numpy as np
+import pytest
+from lumen_photonics import (BeamSplitter, CoherentLight, MonteCarloAnalysis, NormalVariation, PhaseShifter,
+                             PhotonicCircuit, PortRef, SensitivityAnalysis, Simulation)
+from lumen_photonics.circuit.component import Component
+
+class _Terminator(Component):
+    """A sink with one input and no outputs, which reflects a fraction of the light."""
+    
+    __slots__ = ("_reflection",)
+    
+    def __init__(self, name, reflection):
+        super().__init__(name, 1, 0)
+        self._reflection = reflection
+    
+    def get_s_matrix(self, wavelength):
+        return self._reflection*np.eye(2, dtype=complex)
+
+def _get_mach_zehnder(wavelength_func, num_lasers):
+    photonic_circuit = PhotonicCircuit()
+    for component in (BeamSplitter(name="bs1"), BeamSplitter(name="bs2"),
+                      PhaseShifter(name="ps", nH=2, nV=2.1, central_wavelength_H=1550e-9,
+                                   central_wavelength_V=1550e-9, length=1e-3)):
+        photonic_circuit.add(component)
+    photonic_circuit.connect(source=PortRef("bs1", 3), destination=PortRef("bs2", 1))
+    photonic_circuit.connect(source=PortRef("bs1", 4), destination=PortRef("ps", 1))
+    photonic_circuit.connect(source=PortRef("ps", 2), destination=PortRef("bs2", 2))
+    
+    photonic_circuit.set_circuit_input(
+        laser=lambda t: CoherentLight.from_jones(eh=1, ev=1j, wavelength=wavelength_func(t)), port_ref=PortRef("bs1", 1))
+    if num_lasers == 2:
+        photonic_circuit.set_circuit_input(
+            laser=lambda t: CoherentLight.from_jones(eh=1, ev=0, wavelength=1550e-9 + 3e-9*t),
+            port_ref=PortRef("bs1", 2))
+    photonic_circuit.set_circuit_output(port_ref=PortRef("bs2", 3))
+    return photonic_circuit
+
+def _get_ring_cascade(num_rings):
+    """Beam splitters in series, each with a loop of two phase shifters from its output 4 back to its input 2."""
+    photonic_circuit = PhotonicCircuit()
+    for ring_index in range(num_rings):
+        photonic_circuit.add(BeamSplitter(name=f"bs{ring_index}"))
+        photonic_circuit.add(PhaseShifter(name=f"ps{ring_index}", nH=2.3, nV=2.2, central_wavelength_H=1550e-9,
+                                          central_wavelength_V=1550e-9, length=(3 + ring_index)*1e-5,
+                                          power_ratio_H=50, power_ratio_V=80))
+        photonic_circuit.add(PhaseShifter(name=f"wg{ring_index}", nH=2.1, nV=2.4, central_wavelength_H=1550e-9,
+                                          central_wavelength_V=1550e-9, length=2e-5))
+        photonic_circuit.connect(source=PortRef(f"bs{ring_index}", 4), destination=PortRef(f"ps{ring_index}", 1))
+        photonic_circuit.connect(source=PortRef(f"ps{ring_index}", 2), destination=PortRef(f"wg{ring_index}", 1))
+        photonic_circuit.connect(source=PortRef(f"wg{ring_index}", 2), destination=PortRef(f"bs{ring_index}", 2))
+    for ring_index in range(num_rings - 1):
+        photonic_circuit.connect(source=PortRef(f"bs{ring_index}", 3), destination=PortRef(f"bs{ring_index + 1}", 1))
+    
+    photonic_circuit.set_circuit_input(
+        laser=lambda t: CoherentLight.from_jones(eh=1, ev=0.5j, wavelength=1550e-9), port_ref=PortRef("bs0", 1))
+    photonic_circuit.set_circuit_output(port_ref=PortRef(f"bs{num_rings - 1}", 3))
+    return photonic_circuit
+
+def _get_parameter(photonic_circuit, label):
+    component_name, name = label.rsplit(".", 1)
+    return photonic_circuit._names_to_components[component_name], name
+
+@pytest.mark.parametrize("num_lasers", [1, 2])
+@pytest.mark.parametrize("wavelength_func", [lambda t: 1550e-9 + 5e-9*t,
+                                             lambda t: 1550e-9 + (5e-9 if t > 0.5 else 0)],
+                         ids=["chirped", "stepped"])
+def test_simulate_iter_does_not_depend_on_chunk_size(wavelength_func, num_lasers):
+    simulation = Simulation(photonic_circuit=_get_mach_zehnder(wavelength_func, num_lasers))
+    times = np.linspace(0, 1, 50)
+    expected = simulation.simulate(times).get_power(PortRef("bs2", 3))
+    
+    for chunk_size in (1, 7, 16, 50):
+        powers = np.concatenate([simulation_result.get_power(PortRef("bs2", 3))
+                                 for simulation_result in simulation.simulate_iter(times, chunk_size=chunk_size)])
+        np.testing.assert_array_equal(powers, expected)
+
+@pytest.mark.parametrize("reflection", [0, 0.5])
+def test_get_s_parameters_with_a_component_without_outputs(reflection):
+    photonic_circuit = PhotonicCircuit()
+    photonic_circuit.add(BeamSplitter(name="bs"))
+    photonic_circuit.add(_Terminator("sink", reflection))
+    photonic_circuit.connect(source=PortRef("bs", 4), destination=PortRef("sink", 1))
+    photonic_circuit.set_circuit_input(
+        laser=lambda t: CoherentLight.from_jones(eh=1, ev=0, wavelength=1550e-9), port_ref=PortRef("bs", 1))
+    photonic_circuit.set_circuit_output(port_ref=PortRef("bs", 3))
+    
+    s_parameters = Simulation(photonic_circuit=photonic_circuit).get_s_parameters(np.array([1550e-9]))
+    np.testing.assert_allclose(s_parameters[0], np.eye(2)/np.sqrt(2), atol=1e-12)
+
+def test_get_sensitivities_matches_finite_differences():
+    photonic_circuit = _get_ring_cascade(3)
+    simulation = Simulation(photonic_circuit=photonic_circuit)
+    wavelengths = np.linspace(1549e-9, 1551e-9, 5)
+    labels = ["ps0.length", "wg1.nH", "ps2.nV"]
+    sensitivity_result = SensitivityAnalysis(simulation).get_sensitivities(wavelengths, labels)
+    np.testing.assert_allclose(sensitivity_result.s_parameters, simulation.get_s_parameters(wavelengths), atol=1e-12)
+    
+    for label in labels:
+        component, name = _get_parameter(photonic_circuit, label)
+        value = component.get_parameter(name)
+        step = 1e-7*value
+        component.set_parameter(name, value + step)
+        forward = np.array(simulation.get_s_parameters(wavelengths))
+        component.set_parameter(name, value - step)
+        backward = np.array(simulation.get_s_parameters(wavelengths))
+        component.set_parameter(name, value)
+        
+        derivatives = sensitivity_result.get_derivatives(label)
+        np.testing.assert_allclose(derivatives, (forward - backward)/(2*step),
+                                   atol=1e-6*np.abs(derivatives).max())
+
+@pytest.mark.parametrize("max_update_rank", [Simulation._MAX_SWEEP_UPDATE_RANK, 0], ids=["updates", "solves"])
+def test_sweep_matches_simulations_at_every_grid_point(monkeypatch, max_update_rank):
+    monkeypatch.setattr(Simulation, "_MAX_SWEEP_UPDATE_RANK", max_update_rank)
+    photonic_circuit = _get_ring_cascade(3)
+    simulation = Simulation(photonic_circuit=photonic_circuit)
+    wavelengths = np.linspace(1549e-9, 1551e-9, 4)
+    parameters = {"ps0.length": [3e-5, 3.5e-5, 4e-5], "wg0.nV": [2.3, 2.4], "wg2.length": [2e-5, 2.2e-5]}
+    nominal_s_parameters = np.array(simulation.get_s_parameters(wavelengths))
+    sweep_result = simulation.sweep(parameters, wavelengths)
+    np.testing.assert_array_equal(simulation.get_s_parameters(wavelengths), nominal_s_parameters)
+    
+    parameter_refs = [_get_parameter(photonic_circuit, label) for label in parameters]
+    nominal_values = [component.get_parameter(name) for component, name in parameter_refs]
+    for key in np.ndindex(sweep_result.s_parameters.shape[:len(parameters)]):
+        for (component, name), values, value_index in zip(parameter_refs, parameters.values(), key):
+            component.set_parameter(name, values[value_index])
+        np.testing.assert_allclose(sweep_result.s_parameters[key], simulation.get_s_parameters(wavelengths),
+                                   atol=1e-12)
+    for (component, name), value in zip(parameter_refs, nominal_values):
+        component.set_parameter(name, value)
+
+def test_sweep_with_a_parameter_without_values():
+    simulation = Simulation(photonic_circuit=_get_ring_cascade(2))
+    sweep_result = simulation.sweep({"ps0.length": [], "wg1.nH": [2.0, 2.1]}, np.array([1550e-9]))
+    assert sweep_result.s_parameters.shape == (0, 2, 1, 2, 2)
+
+def test_monte_carlo_samples_only_depend_on_the_seed():
+    photonic_circuit = _get_ring_cascade(2)
+    nominal_length = photonic_circuit._names_to_components["ps0"].get_parameter("length")
+    monte_carlo_analysis = MonteCarloAnalysis(Simulation(photonic_circuit=photonic_circuit),
+                                              {"ps0.length": NormalVariation(std=0.01, relative=True),
+                                               "wg1.nH": NormalVariation(std=0.001)})
+    wavelengths = np.linspace(1549e-9, 1551e-9, 3)
+    result = monte_carlo_analysis.run(20, wavelengths, seed=7, batch_size=8)
+    repeated_result = monte_carlo_analysis.run(20, wavelengths, seed=7, batch_size=8)
+    np.testing.assert_array_equal(result.samples, repeated_result.samples)
+    np.testing.assert_array_equal(result.powers, repeated_result.powers)
+    
+    other_result = monte_carlo_analysis.run(20, wavelengths, seed=8, batch_size=8)
+    assert not np.array_equal(result.samples, other_result.samples)
+    assert photonic_circuit._names_to_components["ps0"].get_parameter("length") == nominal_length